@@ -1,29 +1,29 @@
-import pyodbc
 import pandas as pd
 import os
 import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+from decimal import Decimal
+
+from data_files import (
+    COMPRESSION_SUFFIXES, MANIFEST_FILE, base_name, compression_available, compression_of, csv_name,
+    file_digest, open_csv, parquet_available, publish_snapshot, read_manifest, stage_snapshot,
+)
+from summaries import SummaryBuilder, summaries_for
 
 # ✅ Define Export Path
 EXPORT_PATH = r"C:\Users\v_rroberson\Report RLG\gdp-dashboard\data"
 
-# ✅ Database Connection
-try:
-    conn = pyodbc.connect(
-        "DRIVER={SQL Server};"
-        "SERVER=RLGOKC-DB01;"
-        "DATABASE=DW;"
-        "Trusted_Connection=yes;",
-        autocommit=True
-    )
-    cursor = conn.cursor()
-    print("Connected to SQL Server")
-    # ✅ Set Lock Timeout (10 seconds) to prevent hanging
-    cursor.execute("SET LOCK_TIMEOUT 10000;") 
-    print("Lock Timeout set to 10 seconds.")
+# ✅ Rows fetched per round trip; peak memory is bounded by one chunk
+CHUNK_SIZE = 5000
 
-except Exception as e:
-    print(f"Connection Failed: {e}")
-    exit(1)
+# ✅ Column kind by the Python type the driver reports in cursor.description
+SQL_TYPE_KINDS = {
+    bool: "bool", int: "int", float: "float", Decimal: "float",
+    datetime: "datetime", date: "datetime", str: "string",
+}
 
 # ✅ Stored Procedures to Run (update tables before export)
 STORED_PROCS = {
@@ -49,8 +49,75 @@ TABLES = {
     "StaffGoalsSettings": "DW.dim.StaffGoalsSettings"
 }
 
-# ✅ Ensure Export Directory Exists
-os.makedirs(EXPORT_PATH, exist_ok=True)
+# ✅ Views that support incremental export: (merge key, last-updated column)
+INCREMENTAL_TABLES = {
+    "vTimeEntries": ("TimeEntryID", "TimeEntryUpdatedDatetime"),
+    "vwTimeEntriesType1": ("TimeEntryID", "TimeEntryUpdatedDatetime"),
+    "vwTimeEntriesType2": ("TimeEntryID", "TimeEntryUpdatedDatetime"),
+    "vwTimeEntriesType3": ("TimeEntryID", "TimeEntryUpdatedDatetime"),
+}
+
+# ✅ Columns the dashboards read from each view; views not listed export
+#    every column. Keys and watermark columns must stay in the list.
+TIME_ENTRY_COLUMNS = [
+    "TimeEntryID", "TimeEntryDate", "TimeEntryQuarter", "TimeEntryYear", "TimeEntryAmount",
+    "TimeEntryRate", "TimeEntryGross", "TimeEntryBilledAmount", "TimeEntryUpdatedDatetime", "Staff",
+]
+EXPORT_COLUMNS = {
+    "vwTimeEntriesType1": TIME_ENTRY_COLUMNS,
+    "vwTimeEntriesType2": TIME_ENTRY_COLUMNS,
+    "vwTimeEntriesType3": TIME_ENTRY_COLUMNS,
+}
+
+# ✅ Wide text columns only detail views need, exported to "<name>Detail"
+#    (first column is the key to join back on)
+TIME_ENTRY_DETAIL_COLUMNS = ["TimeEntryID", "TimeEntryName"]
+DETAIL_COLUMNS = {
+    "vwTimeEntriesType1": TIME_ENTRY_DETAIL_COLUMNS,
+    "vwTimeEntriesType2": TIME_ENTRY_DETAIL_COLUMNS,
+    "vwTimeEntriesType3": TIME_ENTRY_DETAIL_COLUMNS,
+}
+
+# ✅ Incremental runs fall back to a full export this often (picks up deletes)
+FULL_REFRESH_DAYS = 7
+
+# ✅ Per-table watermarks, kept next to the exported files
+STATE_FILE = "export_state.json"
+
+# ✅ One line per table per run (rows, bytes, duration), appended
+HISTORY_FILE = "export_history.jsonl"
+
+# ✅ Tables finished by a run that did not complete; a re-run within
+#    CHECKPOINT_MAX_AGE_HOURS only exports the rest
+CHECKPOINT_FILE = "export_checkpoint.json"
+CHECKPOINT_MAX_AGE_HOURS = 12
+
+# ✅ A failed table (lock timeout, dropped connection) is retried this many
+#    times, waiting RETRY_BACKOFF_SECONDS, then twice as long each time
+RETRIES = 2
+RETRY_BACKOFF_SECONDS = 5
+
+
+# --------------------------------------------------------------------
+# Connection
+# --------------------------------------------------------------------
+def connect():
+    """Open the SQL Server connection used for exports."""
+    import pyodbc  # only needed against SQL Server; tests pass a sqlite3 connection
+
+    conn = pyodbc.connect(
+        "DRIVER={SQL Server};"
+        "SERVER=RLGOKC-DB01;"
+        "DATABASE=DW;"
+        "Trusted_Connection=yes;",
+        autocommit=True
+    )
+    cursor = conn.cursor()
+    # ✅ Set Lock Timeout (10 seconds) to prevent hanging
+    cursor.execute("SET LOCK_TIMEOUT 10000;")
+    cursor.close()
+    return conn
+
 
 # --------------------------------------------------------------------
 # STEP 1: Run all stored procedures
@@ -71,27 +138,621 @@ for proc_key, proc_name in STORED_PROCS.items():
         if "1222" in str(e): # SQL Error 1222 is Lock Timeout
             print("ALERT: Execution timed out due to a TABLE LOCK. Please check for open sessions blocking this table.")
 """
-print("Skipping SP execution - handled by SQL Agent Job 'TimeSolv_Data_Load'")
+
 
 # --------------------------------------------------------------------
 # STEP 2: Export tables/views to CSV
 # --------------------------------------------------------------------
-print("\nExporting tables/views to CSV...")
-for file_name, table_name in TABLES.items():
-    print(f"Exporting {table_name}...")
+def _infer_kind(values):
+    """Kind of a column the driver reports no type for (e.g. sqlite), from its values."""
+    return {
+        "integer": "int", "floating": "float", "mixed-integer-float": "float", "decimal": "float",
+        "boolean": "bool", "datetime": "datetime", "datetime64": "datetime", "date": "datetime",
+    }.get(pd.api.types.infer_dtype(values, skipna=True), "string")
+
+
+def column_kinds(description, rows):
+    """{column: "int" | "float" | "bool" | "datetime" | "string"} for a result set."""
+    kinds = {}
+    for i, col in enumerate(description):
+        kind = SQL_TYPE_KINDS.get(col[1])
+        kinds[col[0]] = kind or _infer_kind([r[i] for r in rows])
+    return kinds
+
+
+def _kinds_of(frame):
+    """Column kinds of an already typed DataFrame."""
+    kinds = {}
+    for col, dtype in frame.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype):
+            kinds[col] = "bool"
+        elif pd.api.types.is_integer_dtype(dtype):
+            kinds[col] = "int"
+        elif pd.api.types.is_float_dtype(dtype):
+            kinds[col] = "float"
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            kinds[col] = "datetime"
+        else:
+            kinds[col] = "string"
+    return kinds
+
+
+def _apply_types(frame, kinds):
+    """Cast `frame` to the dtypes for `kinds`, so every chunk agrees on them
+    whatever values it happens to hold. Also parses the plain strings read
+    back from CSV; empty strings become missing, as read_csv treats them."""
+    for col, kind in kinds.items():
+        s = frame[col]
+        if kind == "int":
+            frame[col] = pd.to_numeric(s, errors="coerce").astype("Int64")
+        elif kind == "float":
+            frame[col] = pd.to_numeric(s, errors="coerce").astype("float64")
+        elif kind == "bool":
+            frame[col] = s.map({True: True, False: False, "True": True, "False": False,
+                                "1": True, "0": False}).astype("boolean")
+        elif kind == "datetime":
+            frame[col] = pd.to_datetime(s, errors="coerce")
+        else:
+            s = s.astype(object)
+            frame[col] = s.where(s.notna() & (s != ""), None).map(lambda v: v if v is None else str(v))
+    return frame
+
+
+def read_chunks(conn, query, params=(), chunksize=CHUNK_SIZE):
+    """Run `query` and yield the result as typed DataFrames of at most
+    `chunksize` rows.
+
+    Works with any DB-API connection (pyodbc, sqlite3). Column types come
+    from the cursor description, or from the first chunk's values when the
+    driver does not report them. An empty result still yields one empty
+    frame so callers can write the header.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        columns = [col[0] for col in cursor.description]
+        kinds = None
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            if kinds is None:
+                kinds = column_kinds(cursor.description, rows)
+            frame = pd.DataFrame.from_records([tuple(r) for r in rows], columns=columns)
+            yield _apply_types(frame, kinds)
+        if kinds is None:
+            yield _apply_types(pd.DataFrame(columns=columns), column_kinds(cursor.description, []))
+    finally:
+        cursor.close()
+
+
+def _max_updated(chunk, column, current):
+    """Running max of `column` across chunks (None if absent/empty)."""
+    if not column or column not in chunk.columns or chunk.empty:
+        return current
+    latest = pd.to_datetime(chunk[column], errors="coerce").max()
+    if pd.isna(latest):
+        return current
+    return latest if current is None or latest > current else current
+
+
+def _arrow_schema(kinds):
+    import pyarrow as pa
+
+    types = {"int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(),
+             "datetime": pa.timestamp("us"), "string": pa.string()}
+    return pa.schema([(col, types[kind]) for col, kind in kinds.items()])
+
+
+def parquet_path_for(file_path):
+    """"data/vMatters.csv" (or .csv.gz) -> "data/vMatters.parquet"."""
+    return os.path.join(os.path.dirname(file_path), f"{base_name(os.path.basename(file_path))}.parquet")
+
+
+def _write_chunks(chunks, file_path, watermark_column=None, parquet=False, tap=None):
+    """Write DataFrame chunks to `file_path` via a `.part` file that replaces
+    it only on success, so a failed export leaves the previous file intact.
+    A `.csv.gz` / `.csv.zst` path is written compressed.
+
+    With `parquet`, the same chunks also go to a zstd Parquet file next to
+    the CSV, typed from the first chunk's dtypes. It is promoted after the
+    CSV so it is never older than the CSV it mirrors. `tap`, if given, is
+    called with every chunk written (e.g. to fold it into summaries).
+
+    Returns {"rows", "max_updated", "kinds"}.
+    """
+    stats = {"rows": 0, "max_updated": None, "kinds": None}
+    part_path = f"{file_path}.part"
+    parquet_part = f"{parquet_path_for(file_path)}.part" if parquet else None
+    writer = None
+    try:
+        with open_csv(part_path, compression_of(file_path)) as f:
+            for i, chunk in enumerate(chunks):
+                if i == 0:
+                    stats["kinds"] = _kinds_of(chunk)
+                    if parquet:
+                        import pyarrow.parquet as pq
+
+                        writer = pq.ParquetWriter(parquet_part, _arrow_schema(stats["kinds"]), compression="zstd")
+                chunk.to_csv(f, index=False, header=(i == 0), quoting=1)  # 1 = quote all
+                if writer is not None:
+                    import pyarrow as pa
+
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False))
+                if tap is not None:
+                    tap(chunk)
+                stats["rows"] += len(chunk)
+                stats["max_updated"] = _max_updated(chunk, watermark_column, stats["max_updated"])
+        if writer is not None:
+            writer.close()
+            writer = None
+        os.replace(part_path, file_path)
+        if parquet_part and os.path.exists(parquet_part):
+            os.replace(parquet_part, parquet_path_for(file_path))
+    finally:
+        if writer is not None:
+            writer.close()
+        for path in (part_path, parquet_part):
+            if path and os.path.exists(path):
+                os.remove(path)
+    return stats
+
+
+def _parquet_kinds(file_path):
+    """Column kinds of the Parquet copy of `file_path`, or None."""
+    try:
+        import pyarrow.parquet as pq
+
+        return _kinds_of(pq.read_schema(parquet_path_for(file_path)).empty_table().to_pandas())
+    except (ImportError, OSError):
+        return None
+
+
+def select_query(table_name, columns=None):
+    """SELECT for `columns` of `table_name` (all columns if None)."""
+    return f"SELECT {', '.join(columns) if columns else '*'} FROM {table_name}"
+
+
+def export_table(conn, table_name, file_path, chunksize=CHUNK_SIZE, watermark_column=None, parquet=False,
+                 columns=None, tap=None):
+    """Stream `columns` (default all) of `table_name` into `file_path` (and
+    its Parquet copy with `parquet`).
+
+    Returns {"rows", "max_updated", "kinds"}; max_updated is the latest
+    `watermark_column` value seen, if one is given.
+    """
+    chunks = read_chunks(conn, select_query(table_name, columns), chunksize=chunksize)
+    return _write_chunks(chunks, file_path, watermark_column, parquet, tap)
+
+
+def export_incremental(conn, table_name, file_path, key_column, watermark_column, since, chunksize=CHUNK_SIZE,
+                       parquet=False, columns=None, tap=None):
+    """Pull rows updated at/after `since` and merge them by `key_column` into
+    the existing `file_path`, streaming both sides in chunks.
+
+    Returns {"rows", "max_updated", "changed"}, or None when the source
+    columns no longer match the local file (caller does a full refresh).
+    """
+    delta_path = f"{file_path}.delta"
+    try:
+        # 1) Stage the changed rows; keep only their keys in memory
+        query = f"{select_query(table_name, columns)} WHERE {watermark_column} >= ?"
+        delta = _write_chunks(read_chunks(conn, query, (since.to_pydatetime(),), chunksize), delta_path, watermark_column)
+        changed_keys = set()
+        for chunk in pd.read_csv(delta_path, dtype=str, keep_default_na=False, chunksize=chunksize):
+            changed_keys.update(chunk[key_column])
+
+        existing_columns = list(pd.read_csv(file_path, nrows=0).columns)
+        delta_columns = list(pd.read_csv(delta_path, nrows=0).columns)
+        if delta_columns != existing_columns:
+            return None
+
+        # 2) Existing rows minus the changed keys, then the changed rows,
+        # re-typed so the Parquet copy keeps the source types. An empty
+        # delta from an untyped driver says nothing, so keep the old types.
+        kinds = delta["kinds"]
+        if not delta["rows"]:
+            kinds = _parquet_kinds(file_path) or kinds
+
+        def merged():
+            for chunk in pd.read_csv(file_path, dtype=str, keep_default_na=False, chunksize=chunksize):
+                yield _apply_types(chunk[~chunk[key_column].isin(changed_keys)].copy(), kinds)
+            for chunk in pd.read_csv(delta_path, dtype=str, keep_default_na=False, chunksize=chunksize):
+                yield _apply_types(chunk, kinds)
+
+        stats = _write_chunks(merged(), file_path, parquet=parquet, tap=tap)
+        stats["max_updated"] = delta["max_updated"] or since
+        stats["changed"] = delta["rows"]
+        return stats
+    finally:
+        if os.path.exists(delta_path):
+            os.remove(delta_path)
 
-    query = f"SELECT * FROM {table_name}"
 
+def _needs_full_refresh(entry, file_path, full_refresh_days):
+    if not entry or not entry.get("watermark") or not os.path.exists(file_path):
+        return True
+    last_full = pd.to_datetime(entry.get("last_full_refresh"), errors="coerce")
+    return pd.isna(last_full) or pd.Timestamp.now() - last_full > pd.Timedelta(days=full_refresh_days)
+
+
+def _remove_other_csvs(export_path, name, keep):
+    """Drop copies of `name` in other CSV compressions than the one just written."""
+    for compression in (None, *COMPRESSION_SUFFIXES):
+        path = os.path.join(export_path, csv_name(name, compression))
+        if os.path.basename(path) != keep and os.path.exists(path):
+            os.remove(path)
+
+
+def _export_attempt(connect, file_name, table_name, export_path, chunksize, state, full_refresh_days,
+                    parquet, detail, summaries, compression):
+    """One try at export_one's work; raises on failure. Every file is
+    written to a `.part` file first and only replaces the previous export
+    once complete, so a failed attempt leaves the last good files in place."""
+    result = {
+        "table": file_name, "file": csv_name(file_name, compression), "status": "success", "mode": "full",
+        "rows": 0, "error": None, "watermark": None, "last_full_refresh": None, "files": {},
+    }
+    key_column, watermark_column = INCREMENTAL_TABLES.get(file_name, (None, None))
+    outputs = [(file_name, EXPORT_COLUMNS.get(file_name))]
+    if detail and file_name in DETAIL_COLUMNS:
+        outputs.append((f"{file_name}Detail", DETAIL_COLUMNS[file_name]))
+    conn = connect()
+    try:
+        incremental = (
+            state is not None and watermark_column
+            and not _needs_full_refresh(state, os.path.join(export_path, result["file"]), full_refresh_days)
+        )
+        for out_name, columns in outputs:
+            file_path = os.path.join(export_path, csv_name(out_name, compression))
+            main = out_name == file_name
+            builder = SummaryBuilder(file_name) if main and summaries and summaries_for(file_name) else None
+            tap = builder.add if builder else None
+            stats = None
+            if incremental and os.path.exists(file_path):
+                stats = export_incremental(
+                    conn, table_name, file_path, key_column, watermark_column,
+                    pd.Timestamp(state["watermark"]), chunksize, parquet, columns, tap,
+                )
+                if stats is not None and main:
+                    result["mode"] = "incremental"
+                    result["last_full_refresh"] = state.get("last_full_refresh")
+            if stats is None:
+                stats = export_table(conn, table_name, file_path, chunksize, watermark_column, parquet, columns, tap)
+                if main:
+                    result["last_full_refresh"] = datetime.now().isoformat(timespec="seconds")
+            _remove_other_csvs(export_path, out_name, os.path.basename(file_path))
+            for path in (file_path, parquet_path_for(file_path) if parquet else None):
+                if path and os.path.exists(path):
+                    result["files"][os.path.basename(path)] = {
+                        "rows": stats["rows"], "sha256": file_digest(path), "bytes": os.path.getsize(path),
+                    }
+            if builder:
+                source = {"source": os.path.basename(file_path), "source_sha256": file_digest(file_path)}
+                for name, frame in builder.results().items():
+                    summary_path = os.path.join(export_path, csv_name(name, compression))
+                    summary_stats = _write_chunks([frame], summary_path, parquet=parquet)
+                    _remove_other_csvs(export_path, name, os.path.basename(summary_path))
+                    for path in (summary_path, parquet_path_for(summary_path) if parquet else None):
+                        if path and os.path.exists(path):
+                            result["files"][os.path.basename(path)] = {
+                                "rows": summary_stats["rows"], "sha256": file_digest(path),
+                                "bytes": os.path.getsize(path), **source,
+                            }
+            if main:
+                result["rows"] = stats["rows"]
+                if stats["max_updated"] is not None:
+                    result["watermark"] = pd.Timestamp(stats["max_updated"]).isoformat()
+    finally:
+        conn.close()
+    return result
+
+
+def export_one(connect, file_name, table_name, export_path, chunksize=CHUNK_SIZE,
+               state=None, full_refresh_days=FULL_REFRESH_DAYS, parquet=False, detail=True, summaries=True,
+               compression=None, retries=RETRIES, backoff=RETRY_BACKOFF_SECONDS):
+    """Export a single table on its own connection; never raises.
+
+    Only the EXPORT_COLUMNS of the view are written to `<file_name>.csv`;
+    with `detail`, its DETAIL_COLUMNS go to `<file_name>Detail.csv` from
+    the same connection. With `summaries`, the rows are also folded into
+    the pre-aggregated summaries built from this view (see summaries.py),
+    each written as `<summary name>.csv`. With `compression` ("gzip" or
+    "zstd") every CSV is written compressed (`.csv.gz` / `.csv.zst`) and
+    copies in other compressions are removed.
+
+    With `state` (this table's entry from the export state file) a table in
+    INCREMENTAL_TABLES only pulls rows updated since its watermark, falling
+    back to a full export when there is no usable watermark or the last
+    full refresh (which also picks up deletes) is older than
+    `full_refresh_days`. With `parquet`, a typed `.parquet` copy is
+    written next to each CSV.
+
+    A failed attempt is retried up to `retries` times on a new connection,
+    waiting `backoff` seconds and doubling the wait each time.
+
+    Returns {"table", "file", "status", "mode", "rows", "seconds", "error",
+    "attempts", "watermark", "last_full_refresh", "files"}; "files" maps
+    each file written to its {"rows", "sha256", "bytes"}, plus "source" and
+    "source_sha256" (the CSV it was aggregated from) for summaries.
+    """
+    start = time.perf_counter()
+    for attempt in range(1, retries + 2):
+        try:
+            result = _export_attempt(
+                connect, file_name, table_name, export_path, chunksize, state, full_refresh_days,
+                parquet, detail, summaries, compression,
+            )
+            break
+        except Exception as e:
+            result = {
+                "table": file_name, "file": csv_name(file_name, compression), "status": "failed",
+                "mode": "full", "rows": 0, "error": str(e), "watermark": None, "last_full_refresh": None,
+                "files": {},
+            }
+            # Detect Lock Timeout Error
+            if "1222" in str(e):  # SQL Error 1222 is Lock Timeout
+                result["error"] += " (TABLE LOCK - check for open sessions blocking this table)"
+            if attempt <= retries:
+                wait = backoff * 2 ** (attempt - 1)
+                print(f"Attempt {attempt} for {file_name} failed ({result['error']}); retrying in {wait:g}s")
+                time.sleep(wait)
+    result["attempts"] = attempt
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def load_state(export_path):
+    """Per-table watermarks from previous runs ({} if none)."""
     try:
-        df = pd.read_sql_query(query, conn)
-        file_path = os.path.join(EXPORT_PATH, f"{file_name}.csv")
-        df.to_csv(file_path, index=False, encoding="utf-8", quoting=1)  # 1 = quote non-numeric
-        print(f" Successfully exported {file_name}.csv")
+        with open(os.path.join(export_path, STATE_FILE), "r", encoding="utf-8") as f:
+            return json.load(f).get("tables", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path, data):
+    with open(f"{path}.part", "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+    os.replace(f"{path}.part", path)
+
+
+def save_state(export_path, tables_state):
+    _write_json(os.path.join(export_path, STATE_FILE), {"tables": tables_state})
+
+
+def write_manifest(export_path, manifest):
+    _write_json(os.path.join(export_path, MANIFEST_FILE), manifest)
+
+
+def append_history(export_path, run, results):
+    with open(os.path.join(export_path, HISTORY_FILE), "a", encoding="utf-8") as f:
+        for r in results:
+            if r["status"] == "skipped":
+                continue
+            f.write(json.dumps({
+                "run": run, "table": r["table"], "status": r["status"], "mode": r["mode"], "rows": r["rows"],
+                "bytes": sum(entry["bytes"] for entry in r["files"].values()), "seconds": r["seconds"],
+                "attempts": r.get("attempts", 1),
+            }) + "\n")
+
+
+def load_checkpoint(export_path, options, max_age_hours=CHECKPOINT_MAX_AGE_HOURS):
+    """Checkpoint of an unfinished run with the same `options`: {"started_at",
+    "completed" ({table: finished_at}), "state" (their watermarks),
+    "staging" (its unpublished snapshot, if the run was cut short)}. {} when
+    there is no such run, it is older than `max_age_hours`, its staging
+    directory is gone, or it is unreadable."""
+    try:
+        with open(os.path.join(export_path, CHECKPOINT_FILE), "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        age = datetime.now() - datetime.fromisoformat(checkpoint["started_at"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+    if checkpoint.get("options") != options or age.total_seconds() > max_age_hours * 3600:
+        return {}
+    if checkpoint.get("staging") and not os.path.isdir(checkpoint["staging"]):
+        return {}
+    return checkpoint
+
+
+def save_checkpoint(export_path, started_at, options, completed, state, staging=None):
+    _write_json(os.path.join(export_path, CHECKPOINT_FILE), {
+        "started_at": started_at, "options": options, "completed": completed, "state": state,
+        "staging": str(staging) if staging else None,
+    })
+
+
+def clear_checkpoint(export_path):
+    try:
+        os.remove(os.path.join(export_path, CHECKPOINT_FILE))
+    except FileNotFoundError:
+        pass
+
+
+def run_export(connect, tables=TABLES, export_path=EXPORT_PATH, chunksize=CHUNK_SIZE, workers=1,
+               incremental=False, full_refresh_days=FULL_REFRESH_DAYS, parquet=None, detail=True,
+               summaries=True, compression=None, retries=RETRIES, backoff=RETRY_BACKOFF_SECONDS, resume=True):
+    """Export `tables` ({file name: source table}) to CSV, plus typed Parquet
+    when `parquet` is true (default: whenever pyarrow is installed). Views
+    in DETAIL_COLUMNS also get a `<name>Detail` export unless `detail` is off,
+    and sources of summaries.SUMMARIES their summaries unless `summaries` is.
+    `compression` ("gzip" / "zstd") writes the CSVs compressed.
+
+    The files are written to a staging copy of the current snapshot (see
+    data_files), published as a new snapshot when the run ends; readers
+    keep using the previous one until then. Tables that fail keep their
+    previous files.
+
+    Each table runs as its own task on its own connection from `connect`,
+    with at most `workers` running at once, so a failed table does not
+    affect the others; it is retried `retries` times with exponential
+    `backoff` (see export_one). With `incremental`, time-entry views only
+    pull rows changed since the watermark kept in STATE_FILE. The run is
+    recorded in MANIFEST_FILE (per-file rows, hash, size, timings) and
+    HISTORY_FILE.
+
+    Tables are checkpointed in CHECKPOINT_FILE as they finish. While any
+    table is still failing the checkpoint stays, and with `resume` a
+    re-run with the same options skips the tables it lists (result status
+    "skipped"), continuing in the staging directory if the run was cut
+    short before publishing; once every table has been exported it is
+    removed. Returns one result dict per table, in `tables` order.
+    """
+    if parquet is None:
+        parquet = parquet_available()
+    os.makedirs(export_path, exist_ok=True)
+    state = load_state(export_path)
+
+    options = {
+        "incremental": incremental, "parquet": parquet, "detail": detail, "summaries": summaries,
+        "compression": compression,
+    }
+    checkpoint = load_checkpoint(export_path, options) if resume else {}
+    completed = {name: at for name, at in checkpoint.get("completed", {}).items() if name in tables}
+    state.update(checkpoint.get("state", {}))
+    run = datetime.now().isoformat(timespec="seconds")
+    started_at = checkpoint.get("started_at", run)
+    staged = checkpoint.get("staging") or stage_snapshot(export_path)
+
+    manifest = {
+        "status": "in_progress", "started_at": run, "finished_at": None, "seconds": None,
+        "files": (read_manifest(staged) or {}).get("files", {}),
+    }
+    write_manifest(staged, manifest)
+    start = time.perf_counter()
+
+    pending = {name: table for name, table in tables.items() if name not in completed}
+    if completed:
+        print(f"\nResuming: skipping {len(completed)} table(s) already exported: {', '.join(completed)}")
+    print(f"\nExporting {len(pending)} tables/views to CSV ({workers} worker(s))...")
+    by_table = {
+        name: {
+            "table": name, "file": csv_name(name, compression), "status": "skipped", "mode": "resumed",
+            "rows": 0, "seconds": 0.0, "error": None, "attempts": 0, "watermark": None,
+            "last_full_refresh": None, "files": {},
+        }
+        for name in completed
+    }
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {
+                pool.submit(
+                    export_one, connect, file_name, table_name, staged, chunksize,
+                    state.get(file_name, {}) if incremental else None, full_refresh_days, parquet, detail,
+                    summaries, compression, retries, backoff,
+                ): file_name
+                for file_name, table_name in pending.items()
+            }
+            # Record each table as soon as it finishes, so an interrupted
+            # run still checkpoints everything done so far
+            for future in as_completed(futures):
+                file_name = futures[future]
+                result = by_table[file_name] = future.result()
+                if result["status"] == "success":
+                    print(f" Successfully exported {result['file']} ({result['mode']}, {result['rows']} rows, {result['seconds']:.1f}s)")
+                    if result["watermark"]:
+                        state[file_name] = {
+                            "watermark": result["watermark"],
+                            "last_full_refresh": result["last_full_refresh"],
+                        }
+                    for name, entry in result["files"].items():
+                        manifest["files"][name] = {
+                            "table": file_name, **entry, "mode": result["mode"], "seconds": result["seconds"],
+                            "max_updated": result["watermark"], "exported_at": run,
+                        }
+                    completed[file_name] = datetime.now().isoformat(timespec="seconds")
+                    save_checkpoint(export_path, started_at, options, completed,
+                                    {name: state[name] for name in completed if name in state}, staged)
+                else:
+                    print(f"Failed to export {file_name} after {result['attempts']} attempt(s), "
+                          f"{result['seconds']:.1f}s: {result['error']}")
+    finally:
+        results = [by_table[name] for name in tables if name in by_table]
+        # Forget files that a change of format removed
+        manifest["files"] = {
+            name: entry for name, entry in manifest["files"].items()
+            if os.path.exists(os.path.join(staged, name))
+        }
+        manifest.update(
+            status="complete",
+            finished_at=datetime.now().isoformat(timespec="seconds"),
+            seconds=round(time.perf_counter() - start, 3),
+            failed=[r["table"] for r in results if r["status"] == "failed"],
+        )
+        write_manifest(staged, manifest)
+        version = publish_snapshot(staged, export_path)
+        print(f"Published data snapshot {version}")
+        # Watermarks only advance once the rows they cover are published
+        save_state(export_path, state)
+        if len(completed) == len(tables):
+            clear_checkpoint(export_path)
+        else:
+            save_checkpoint(export_path, started_at, options, completed,
+                            {name: state[name] for name in completed if name in state})
+        append_history(export_path, run, results)
+    return results
+
+
+def parse_tables(value):
+    """--tables "vMatters,vTimeEntries" -> {file name: source table}."""
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in TABLES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown table(s): {', '.join(unknown)}; choose from {', '.join(TABLES)}")
+    return {name: TABLES[name] for name in names}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export DW views to CSV for the dashboards.")
+    parser.add_argument("--export-path", default=EXPORT_PATH)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="rows fetched per round trip")
+    parser.add_argument("--workers", type=int, default=4, help="tables exported in parallel (1 = serial)")
+    parser.add_argument("--tables", type=parse_tables, default=TABLES, help="comma-separated subset of tables to export")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only pull time entries updated since the last run's watermark")
+    parser.add_argument("--full-refresh-days", type=float, default=FULL_REFRESH_DAYS,
+                        help="with --incremental, force a full export when the last one is older than this")
+    parser.add_argument("--no-detail", dest="detail", action="store_false",
+                        help="skip the <view>Detail exports of wide text columns")
+    parser.add_argument("--no-summaries", dest="summaries", action="store_false",
+                        help="skip the pre-aggregated summary exports (hours/matters per staff per period)")
+    parser.add_argument("--compress", choices=sorted(COMPRESSION_SUFFIXES), default=None,
+                        help="write the CSVs gzip/zstd compressed (.csv.gz / .csv.zst) instead of plain")
+    parser.add_argument("--retries", type=int, default=RETRIES, help="times a failed table is retried")
+    parser.add_argument("--restart", dest="resume", action="store_false",
+                        help="export every table, ignoring the tables a failed run already finished")
+    parser.add_argument("--no-parquet", dest="parquet", action="store_false", default=None,
+                        help="write CSV only (Parquet is written by default when pyarrow is installed)")
+    args = parser.parse_args(argv)
+    if not compression_available(args.compress):
+        parser.error(f"--compress {args.compress} needs the zstandard package")
+
+    # ✅ Database Connection check (each export task opens its own)
+    try:
+        connect().close()
+        print("Connected to SQL Server")
+        print("Lock Timeout set to 10 seconds.")
     except Exception as e:
-        print(f"Failed to export {file_name}: {e}")
+        print(f"Connection Failed: {e}")
+        exit(1)
+
+    print("Skipping SP execution - handled by SQL Agent Job 'TimeSolv_Data_Load'")
+
+    start = time.perf_counter()
+    results = run_export(
+        connect, args.tables, args.export_path, args.chunksize, args.workers,
+        incremental=args.incremental, full_refresh_days=args.full_refresh_days, parquet=args.parquet,
+        detail=args.detail, summaries=args.summaries, compression=args.compress, retries=args.retries,
+        resume=args.resume,
+    )
+    failed = [r["table"] for r in results if r["status"] == "failed"]
+    print(f"\nExport finished in {time.perf_counter() - start:.1f}s")
+    if failed:
+        print(f"Failed tables: {', '.join(failed)}")
+        exit(1)
+    print("\n All Stored Procedures Executed and Exports Completed!")
 
-# ✅ Close Connection
-cursor.close()
-conn.close()
-print("\n All Stored Procedures Executed and Exports Completed!")
 
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,13 @@ from pathlib import Path
 import datetime
 import numpy as np
 import json
+import hashlib
 from Tabs import Settings
 import pytz
-from data_loader import load_data
+from data_files import snapshot_dir
+from data_loader import dataset_version, date_indexes
+from summaries import choose_bucket, period_start
+from prebills import MONTHS, PrebillsMatrix
 
 
 local_tz = pytz.timezone("America/Chicago") 
@@ -38,41 +42,47 @@ custom_palette = [
     "#F0E68C",  # khaki yellow (softer)
 ]
 
-# Load data
-revenue, billable_hours, matters,_  = load_data()
-
-def run_rlg_dashboard(start_date, end_date, show_goals):
-
-
-    treshold_hours = st.session_state["treshold_hours"]
-    treshold_revenue = st.session_state["treshold_revenue"]
-
-    custom_staff_list = st.session_state["custom_staff_list"]
-    if "custom_staff_list" not in st.session_state:
-        st.session_state["custom_staff_list"] = ["AEZ","BPL","CAJ","JER","JRJ","RAW","TGF","KWD","JMG"]
-    treshold_revenue_staff = treshold_revenue / float(len(custom_staff_list))
-    treshold_hours_staff_monthly = treshold_hours * 4
-    treshold_hours_staff_weekly = treshold_hours
-    # Fixed monthly goal from annual target (optional overlay)
-
-    # Apply date filter to all datasets
-    filtered_revenue = revenue[(revenue["RevShareDate"] >= start_date) & (revenue["RevShareDate"] <= end_date)]
-    filtered_team_hours = billable_hours[(billable_hours["BillableHoursDate"] >= start_date) & (billable_hours["BillableHoursDate"] <= end_date)]
-    filtered_matters = matters[(matters["MatterCreationDate"] >= start_date) & (matters["MatterCreationDate"] <= end_date)]
-    # ✅ Filter matters created within the selected year-to-date range
-    
-    filtered_matters_ytd = filtered_matters[
-        (filtered_matters["MatterCreationDate"] >= pd.Timestamp(start_date.year, 1, 1)) &
-        (filtered_matters["MatterCreationDate"] <= end_date)
-    ]
-    
-    # ✅ Ensure Correct Column Naming (Rename StaffAbbreviation to Staff)
-    filtered_team_hours = filtered_team_hours.rename(columns={"StaffAbbreviation": "Staff"})
-    #filtered_revenue = filtered_revenue.rename(columns={"StaffAbbreviation": "Staff"})
-    
-    # ✅ Filter Data to Include Only Predefined Staff
-    filtered_team_hours = filtered_team_hours[filtered_team_hours["Staff"].isin(custom_staff_list)]
-    filtered_revenue = filtered_revenue[filtered_revenue["Staff"].isin(custom_staff_list)]
+# Aggregations for one set of filters and data version, shared across
+# sessions; the oldest are evicted past max_entries
+AGGREGATE_CACHE_ENTRIES = 32
+# Most bars a team hours chart plots: the weekly chart shows the latest
+# weeks of longer ranges, the monthly one switches to quarters
+TEAM_HOURS_POINT_BUDGET = 60
+# Per monthly-chart bucket (see summaries.choose_bucket): title word and
+# length in weeks (team goals are weekly; a month counts as 4 weeks)
+BUCKET_LABELS = {"Month": "Monthly", "Quarter": "Quarterly"}
+BUCKET_WEEKS = {"Month": 4, "Quarter": 12}
+# Finished Plotly JSON per chart, aggregation, goals toggle and palette
+FIGURE_CACHE_ENTRIES = 256
+
+
+@st.cache_data(max_entries=AGGREGATE_CACHE_ENTRIES)
+def aggregate_rlg_dashboard(start_date, end_date, staff, treshold_revenue, weekly_goals, version, root):
+    """Every frame and figure the RLG dashboard plots, for the date range,
+    the staff list (tuple), the revenue goal and the staff weekly goals
+    (tuple of (staff, goal) pairs) at data version `version` of snapshot
+    directory `root` (both read once by the caller, so a snapshot published
+    meanwhile is never cached under an older version). Rendering
+    (including the goal lines) only reads the result, so toggling goals or
+    returning to a date range does no pandas work.
+
+    Returns None when there is no revenue in the range.
+    """
+    custom_staff_list = list(staff)
+    indexes = date_indexes(root)
+
+    # ✅ Apply date filter to all datasets, only Predefined Staff (sorted
+    #    indexes: binary search, per-staff sub-indexes)
+    filtered_revenue = indexes["revenue"].between(start_date, end_date, custom_staff_list).copy()
+    # Hours come pre-aggregated per staff per day (summary export)
+    filtered_team_hours = (
+        indexes["hours_by_staff_daily"].between(start_date, end_date, custom_staff_list)
+        .rename(columns={"Date": "BillableHoursDate"})
+    )
+    # ✅ Originations of matters created within the selected year-to-date
+    #    range (the range never starts before January 1 of its own year):
+    #    one row per (matter, originating staff), only predefined staff
+    staff_matter_data = indexes["matter_origination"].between(start_date, end_date, custom_staff_list)
     
     # ----------------------------------------------------------------------------
     ## Transformating data 
@@ -86,33 +96,27 @@ def run_rlg_dashboard(start_date, end_date, show_goals):
     filtered_revenue["WeekDate"] = filtered_revenue["RevShareDate"] - pd.to_timedelta(filtered_revenue["RevShareDate"].dt.dayofweek, unit="D")
     filtered_team_hours["Week"] = filtered_team_hours["BillableHoursDate"] - pd.to_timedelta(filtered_team_hours["BillableHoursDate"].dt.dayofweek, unit="D")
     filtered_revenue["Total"]=filtered_revenue["TotalRevShareMonth"] + filtered_revenue["OriginationFees"]
-    # ✅ Identify the Last Selected Month from Date Slider
     if filtered_revenue.empty or filtered_revenue["MonthDate"].isna().all():
-        st.warning("⚠️ No revenue data found for the selected date range.")
-        return  # or handle gracefully (e.g., display empty chart)
-    
-    last_selected_month = filtered_revenue["MonthDate"].max()
+        return None
 
     # ✅ 1️⃣ Revenue Per Staff (Monthly)
     revenue_per_staff_monthly = (
         filtered_revenue.groupby(["MonthDate", "Staff"], as_index=False)["Total"].sum()
     )
-    # # ✅ Multiply by 0.8 to account for 20% commission
-    # revenue_per_staff_monthly.loc[:, "TimeEntryBilledAmount"] *= 1 #0.8
     
     # ✅ 2️⃣ Total Team Revenue (Monthly)
     total_team_revenue_monthly = revenue_per_staff_monthly.groupby("MonthDate", as_index=False)["Total"].sum()
-    # Multiply for the 0.8 to account for 20% commission
-    total_team_revenue_monthly.loc[:, "Total"] *= 1 #
-    
-    # ✅ 3️⃣ Billable Hours Per Staff (Weekly)
-    billable_hours_per_staff_weekly = filtered_team_hours.groupby(["Week", "Staff"], as_index=False)["BillableHoursAmount"].sum()
     
     # ✅ 4️⃣ Billable Hours Per Staff (Monthly)
     billable_hours_per_staff_monthly = filtered_team_hours.groupby(["Month", "Staff"], as_index=False)["BillableHoursAmount"].sum()
     
-    # ✅ 5️⃣ Total Team Billable Hours (Weekly)
-    total_team_hours_weekly = billable_hours_per_staff_weekly.groupby("Week", as_index=False)["BillableHoursAmount"].sum()
+    # ✅ 5️⃣ Total Team Billable Hours (Weekly), over the latest
+    #    TEAM_HOURS_POINT_BUDGET weeks of the range (the monthly chart
+    #    below covers all of it)
+    first_week = period_start(pd.Series([end_date]), "Week").iloc[0] - pd.Timedelta(weeks=TEAM_HOURS_POINT_BUDGET - 1)
+    team_hours_weeks_capped = period_start(pd.Series([start_date]), "Week").iloc[0] < first_week
+    recent_team_hours = filtered_team_hours[filtered_team_hours["Week"] >= first_week]
+    total_team_hours_weekly = recent_team_hours.groupby("Week", as_index=False)["BillableHoursAmount"].sum()
     
     # ✅ 6️⃣ Total Team Billable Hours (Monthly)
     total_team_hours_monthly = billable_hours_per_staff_monthly.groupby("Month", as_index=False)["BillableHoursAmount"].sum()
@@ -123,13 +127,6 @@ def run_rlg_dashboard(start_date, end_date, show_goals):
     # ✅ Compute the cumulative sum
     total_team_revenue_monthly["CumulativeRevenue"] = total_team_revenue_monthly["Total"].cumsum()
     
-    # ✅ Convert MatterCreationDate to Weekly Period
-    filtered_matters_ytd["Week"] = filtered_matters_ytd["MatterCreationDate"] - pd.to_timedelta(filtered_matters_ytd["MatterCreationDate"].dt.dayofweek, unit="D")
-    
-    # ✅ Get current and prior month based on the latest selected month
-    current_month = pd.Timestamp.today().to_period("M").strftime("%Y-%m")
-    prior_month = (pd.Timestamp.today() - pd.DateOffset(months=1)).to_period("M").strftime("%Y-%m")
-    
     #------------------------------------------YTD CALCULATIONS-------------------------------------------- 
     # ✅ Step 1: Get the selected year from `end_date`
     selected_year = end_date.year
@@ -142,9 +139,6 @@ def run_rlg_dashboard(start_date, end_date, show_goals):
     # ✅ Step 3: Create a DataFrame with all 12 months
     all_months_df = pd.DataFrame({"MonthDate": all_months, "Year": selected_year})
     
-    ytd_revenue = total_team_revenue_monthly[
-    total_team_revenue_monthly["MonthDate"].dt.year == selected_year
-]
     # ✅ Step 4: Filter `total_team_revenue_monthly` for the selected year only
     ytd_revenue = total_team_revenue_monthly[
         total_team_revenue_monthly["MonthDate"].dt.year == selected_year
@@ -174,12 +168,15 @@ def run_rlg_dashboard(start_date, end_date, show_goals):
     ytd_revenue["MonthLabel"] = ytd_revenue["MonthDate"].dt.strftime("%b %Y")  # Example: "Jan 2025"
     
     # ✅ Step 12: Create a goal line based on the goal set up on the settings for the year
-    # ytd_revenue["GoalRevenue"] = np.linspace(0, treshold_revenue, num=12) 
     ytd_revenue["MonthNumber"] = ytd_revenue["MonthDate"].dt.month
 
     # Example: if current month = October (10/12 = 0.83 or 83%)
     months_in_year = 12
     ytd_revenue["GoalRevenue"] = (ytd_revenue["MonthNumber"] / months_in_year) * treshold_revenue
+
+    # ✅ Round to avoid float precision noise
+    ytd_revenue["Total"] = ytd_revenue["Total"].round(2)
+    ytd_revenue["CumulativeRevenue"] = ytd_revenue["CumulativeRevenue"].round(2)
     
     # ----Month Filtering --------------------------------------------------
 
@@ -206,156 +203,25 @@ def run_rlg_dashboard(start_date, end_date, show_goals):
     else:
         current_month_hours = 0
         prior_month_hours = 0
-        
-    # ✅ KPI METRICS (Dynamically Updating)
-    total_revenue = filtered_revenue["Total"].sum()
-    col1, col2, col3 = st.columns(3)
-    col1.metric("Total Revenue", f"${total_revenue:,.0f}")
-    col2.metric("Current Month Hours", f"{current_month_hours:,.0f} hours")
-    col3.metric("Prior Month Hours", f"{prior_month_hours:,.0f} hours")
 
-    st.markdown("---")
-
-    # ----------------------------------------------------------------------------
-    # ✅ WEEKLY TEAM HOURS & YTD REVENUE CHARTS
-    st.subheader("Weekly Team Hours & YTD Revenue", divider="gray")
-    col1, col2 = st.columns(2)
-    # Filter only prior months
-    total_team_hours_monthly["MonthDate"] = pd.to_datetime(total_team_hours_monthly["Month"])
-    prior_months_team_hours = total_team_hours_monthly[total_team_hours_monthly["MonthDate"] < last_selected_month]
-    # ✅ Convert BillableHoursDate to Weekly Period & Aggregate
-    # 🎯 PLOT 1: Cumulative Revenue (Bar Chart)
-    with col1:
     # ✅ Aggregate total YTD revenue per staff
-        revenue_per_staff_total = (
-            filtered_revenue.groupby("Staff", as_index=False)["Total"].sum()
-        )
-        fig1 = px.bar(
-            revenue_per_staff_total,
-            x="Staff",
-            y="Total",
-            color="Staff",
-            title=f"{selected_year} Individual YTD Revenue (Total)",
-            labels={"Total": "Revenue ($)"},
-            color_discrete_sequence=[PRIMARY_COLOR],
-            hover_data={"Total": ":,.0f"},
-        )
-
-        # ✅ Add a horizontal line for the threshold revenue per staff
-        if show_goals:
-            fig1.add_hline(
-                y=treshold_revenue_staff,
-                line_dash="dash",
-                line_color="red",
-            )
-            fig1.add_annotation(
-                x=revenue_per_staff_total["Staff"].max(),
-                y=treshold_revenue_staff,
-                text=f"Goal: ${treshold_revenue_staff:,.0f}",
-                showarrow=False,
-                font=dict(color="red", size=12),
-                align="left",
-                bgcolor="white",
-                bordercolor="red",
-                borderwidth=1,
-                borderpad=4,
-                xanchor="left",
-                yanchor="bottom"
-            )
-
-        fig1.update_layout(
-            xaxis_title="",
-            yaxis_title="Total Revenue ($)",
-            showlegend=False,
-            yaxis_tickformat=",",
-            uniformtext_minsize=10,
-            uniformtext_mode='hide'
-        )
-        fig1.update_traces(hovertemplate="<b>%{x}</b><br>Total Revenue: $%{y:,.0f}<extra></extra>")
-        st.plotly_chart(fig1, use_container_width=True)
-
-
-    # 🎯 PLOT 2: CumulativeRevenue (Bar Chart)
-    with col2:
-    # ✅ Round to avoid float precision noise
-        ytd_revenue["Total"] = ytd_revenue["Total"].round(2)
-        ytd_revenue["CumulativeRevenue"] = ytd_revenue["CumulativeRevenue"].round(2)
-
-        # ✅ Prepare data and custom hover text
-        fig_ytd_revenue = px.bar(
-            ytd_revenue,
-            x="MonthLabel",
-            y="CumulativeRevenue",
-            title=f"YTD Revenue ({selected_year})",
-            labels={
-                "CumulativeRevenue": "Cumulative Revenue ($)",
-                "Total": "Monthly Revenue ($)",
-                "MonthLabel": "Month"
-            },
-            color_discrete_sequence=[PRIMARY_COLOR]
-        )
-
-        # ✅ Use custom hover template for perfect formatting
-        fig_ytd_revenue.update_traces(
-            hovertemplate=(
-                "<b>%{x}</b><br>"
-                "Monthly Revenue ($): %{customdata[0]:,.2f}<br>"
-                "Cumulative Revenue ($): %{y:,.2f}<extra></extra>"
-            ),
-            customdata=ytd_revenue[["Total"]].to_numpy()
-        )
-
-        # ✅ Add goal line
-        if show_goals:
-            fig_ytd_revenue.add_scatter(
-                x=ytd_revenue["MonthLabel"],
-                y=ytd_revenue["GoalRevenue"],
-                mode="lines",
-                name="Goal Revenue",
-                line=dict(color="red", dash="dash")
-            )
-
-        # ✅ Layout
-        fig_ytd_revenue.update_layout(
-            xaxis_title="Month",
-            yaxis_title="Cumulative Revenue ($)",
-            xaxis=dict(
-                tickmode="array",
-                tickvals=ytd_revenue["MonthLabel"],
-                ticktext=ytd_revenue["MonthLabel"]
-            )
-        )
-
-        st.plotly_chart(fig_ytd_revenue, use_container_width=True)
-
-
-   # ----------------------------------------------------------------------------
-    # ✅ WEEKLY INDIVIDUAL HOURS (Grouped Bar Chart) — with guaranteed gray goal bars
-    st.subheader("Weekly Individual Hours", divider="gray")
-    cutoff_date = pd.to_datetime("2025-10-20")
+    revenue_per_staff_total = (
+        filtered_revenue.groupby("Staff", as_index=False)["Total"].sum()
+    )
 
+    # ----------------------------------------------------------------------------
+    # ✅ WEEKLY INDIVIDUAL HOURS — with guaranteed gray goal bars
     # 1) Normalize Staff codes safely (fixes AttributeError)
     filtered_team_hours["Staff"] = (
         filtered_team_hours["Staff"].astype(str).str.strip().str.upper()
     )
 
-    # 2) Compute Monday-of-week for each row
-    filtered_team_hours["Week"] = (
-        filtered_team_hours["BillableHoursDate"]
-        - pd.to_timedelta(filtered_team_hours["BillableHoursDate"].dt.dayofweek, unit="D")
-    )
-
-    # 3) Aggregate actual hours
-    weekly_individual_hours = (
-        filtered_team_hours.groupby(["Week", "Staff"], as_index=False)["BillableHoursAmount"].sum()
-    )
+    # 2) Aggregate actual hours
+    weekly_individual_hours = filtered_team_hours.groupby(["Week", "Staff"])["BillableHoursAmount"].sum()
 
     # ✅ Include the week of Oct 20 and all future weeks
     cutoff_date = pd.to_datetime("2025-10-20")
 
-    # Compute all recent weeks (same logic)
-    end_week = pd.to_datetime(end_date) - pd.to_timedelta(pd.to_datetime(end_date).weekday(), unit="D")
-
     # Get all weeks that actually exist in the filtered data
     all_weeks_in_data = sorted(filtered_team_hours["Week"].unique())
 
@@ -370,33 +236,194 @@ def run_rlg_dashboard(start_date, end_date, show_goals):
     # fallback to the last 6 actual weeks in the dataset
         recent_weeks = sorted(all_weeks_in_data)[-6:]
 
-    # 5) Cross product: (recent weeks × all staff in settings)
-    custom_staff_list = st.session_state["custom_staff_list"]
-    frame = pd.MultiIndex.from_product([recent_weeks, custom_staff_list], names=["Week", "Staff"]).to_frame(index=False)
+    # 3) Grid of (recent weeks × all staff in settings); reindexing onto it
+    #    fills the weeks a staff member has no hours with 0
+    grid = pd.MultiIndex.from_product([recent_weeks, custom_staff_list], names=["Week", "Staff"])
+    weekly_individual_hours = weekly_individual_hours.reindex(grid, fill_value=0).reset_index()
 
-    # 6) Left-join actual data onto the full frame; fill missing hours with 0
-    weekly_individual_hours = frame.merge(
-        weekly_individual_hours, on=["Week", "Staff"], how="left"
-    ).fillna({"BillableHoursAmount": 0})
+    # 4) Map weekly goals per staff (0 if not defined)
+    weekly_individual_hours["WeeklyGoal"] = weekly_individual_hours["Staff"].map(dict(weekly_goals)).fillna(0)
 
-    # 7) Map weekly goals per staff (0 if not defined)
-    goals = st.session_state.get("staff_weekly_goals", {})
-    weekly_individual_hours["WeeklyGoal"] = weekly_individual_hours["Staff"].map(lambda s: goals.get(s, 0))
-
-    # 8) Derived columns for labels
+    # 5) Derived columns for labels
     weekly_individual_hours["AvgDailyHours"] = weekly_individual_hours["BillableHoursAmount"] / 5
-    weekly_individual_hours["AvgDailyText"] = weekly_individual_hours["AvgDailyHours"].apply(lambda x: f"{x:.1f} h/d")
+    weekly_individual_hours["AvgDailyText"] = np.char.mod("%.1f h/d", weekly_individual_hours["AvgDailyHours"].to_numpy())
     weekly_individual_hours["GroupLabel"] = (
         weekly_individual_hours["Week"].dt.strftime("%Y-%m-%d") + " - " + weekly_individual_hours["Staff"]
     )
 
-    # 9) Colors per staff
-    staff_list = custom_staff_list  # keep order consistent with Settings
-    palette = custom_palette
+    # ----------------------------------------------------------------------------
+    # ✅ MONTHLY TEAM HOURS: every month of the range, in order (quarters
+    #    for ranges with more months than the point budget)
+    months_bucket = choose_bucket(start_date, end_date, TEAM_HOURS_POINT_BUDGET, finest="Month")
+    freq = months_bucket[0]  # "M" or "Q"
+    months = pd.period_range(
+        start=start_date.to_period(freq),
+        end=end_date.to_period(freq),
+        freq=freq
+    ).astype(str).tolist()  # e.g. ['2025-01','2025-02',...] or ['2025Q1',...]
+
+    if months_bucket == "Month":
+        prior_months_team_hours = total_team_hours_monthly[["Month", "BillableHoursAmount"]]
+    else:
+        prior_months_team_hours = (
+            filtered_team_hours.groupby(filtered_team_hours["BillableHoursDate"].dt.to_period(freq).astype(str))
+            ["BillableHoursAmount"].sum().rename_axis("Month").reset_index()
+        )
+    prior_months_team_hours = prior_months_team_hours[
+        prior_months_team_hours["Month"].isin(months)
+    ].copy()
+
+    # Turn Month into an ordered Categorical
+    prior_months_team_hours["Month"] = pd.Categorical(
+        prior_months_team_hours["Month"],
+        categories=months,
+        ordered=True
+    )
+
+    # ----------------------------------------------------------------------------
+    # ✅ NEW MATTERS per originating staff (staff_matter_data, above)
+    new_matters_per_staff = staff_matter_data["Staff"].value_counts().sort_index().rename("size").reset_index()
+
+    # ✅ Count new matters per staff per week, latest two weeks: the rows
+    #    are sorted by date, so those are the tail from the second-last week
+    weeks = staff_matter_data["Week"].unique()
+    latest_matters = staff_matter_data.iloc[staff_matter_data["Week"].searchsorted(weeks[-2:][0]):] if len(weeks) else staff_matter_data
+    weekly_new_matters_per_staff = (
+        latest_matters.value_counts(["Week", "Staff"]).sort_index().rename("size").reset_index()
+    )
+
+    return {
+        # Identifies this aggregation in the figure cache
+        "data_hash": hashlib.sha1(
+            repr((start_date, end_date, staff, treshold_revenue, weekly_goals, version)).encode()
+        ).hexdigest()[:16],
+        "staff": custom_staff_list,
+        "selected_year": selected_year,
+        "total_revenue": filtered_revenue["Total"].sum(),
+        "current_month_hours": current_month_hours,
+        "prior_month_hours": prior_month_hours,
+        "revenue_per_staff_total": revenue_per_staff_total,
+        "ytd_revenue": ytd_revenue,
+        "weekly_individual_hours": weekly_individual_hours,
+        "team_hours_weeks_capped": team_hours_weeks_capped,
+        "total_team_hours_weekly": total_team_hours_weekly,
+        "months_bucket": months_bucket,
+        "months": months,
+        "prior_months_team_hours": prior_months_team_hours,
+        "new_matters_per_staff": new_matters_per_staff,
+        "weekly_new_matters_per_staff": weekly_new_matters_per_staff,
+    }
+
+
+def revenue_per_staff_figure(data, show_goals, palette, goals):
+    """Individual YTD revenue per staff, with the per-staff revenue goal."""
+    revenue_per_staff_total = data["revenue_per_staff_total"]
+    treshold_revenue_staff = goals["revenue_staff"]
+    fig1 = px.bar(
+        revenue_per_staff_total,
+        x="Staff",
+        y="Total",
+        color="Staff",
+        title=f"{data['selected_year']} Individual YTD Revenue (Total)",
+        labels={"Total": "Revenue ($)"},
+        color_discrete_sequence=[PRIMARY_COLOR],
+        hover_data={"Total": ":,.0f"},
+    )
+
+    # ✅ Add a horizontal line for the threshold revenue per staff
+    if show_goals:
+        fig1.add_hline(
+            y=treshold_revenue_staff,
+            line_dash="dash",
+            line_color="red",
+        )
+        fig1.add_annotation(
+            x=revenue_per_staff_total["Staff"].max(),
+            y=treshold_revenue_staff,
+            text=f"Goal: ${treshold_revenue_staff:,.0f}",
+            showarrow=False,
+            font=dict(color="red", size=12),
+            align="left",
+            bgcolor="white",
+            bordercolor="red",
+            borderwidth=1,
+            borderpad=4,
+            xanchor="left",
+            yanchor="bottom"
+        )
+
+    fig1.update_layout(
+        xaxis_title="",
+        yaxis_title="Total Revenue ($)",
+        showlegend=False,
+        yaxis_tickformat=",",
+        uniformtext_minsize=10,
+        uniformtext_mode='hide'
+    )
+    fig1.update_traces(hovertemplate="<b>%{x}</b><br>Total Revenue: $%{y:,.0f}<extra></extra>")
+    return fig1
+
+
+def ytd_revenue_figure(data, show_goals, palette, goals):
+    """Cumulative revenue per month of the selected year, with the goal line."""
+    ytd_revenue = data["ytd_revenue"]
+    # ✅ Prepare data and custom hover text
+    fig_ytd_revenue = px.bar(
+        ytd_revenue,
+        x="MonthLabel",
+        y="CumulativeRevenue",
+        title=f"YTD Revenue ({data['selected_year']})",
+        labels={
+            "CumulativeRevenue": "Cumulative Revenue ($)",
+            "Total": "Monthly Revenue ($)",
+            "MonthLabel": "Month"
+        },
+        color_discrete_sequence=[PRIMARY_COLOR]
+    )
+
+    # ✅ Use custom hover template for perfect formatting
+    fig_ytd_revenue.update_traces(
+        hovertemplate=(
+            "<b>%{x}</b><br>"
+            "Monthly Revenue ($): %{customdata[0]:,.2f}<br>"
+            "Cumulative Revenue ($): %{y:,.2f}<extra></extra>"
+        ),
+        customdata=ytd_revenue[["Total"]].to_numpy()
+    )
+
+    # ✅ Add goal line
+    if show_goals:
+        fig_ytd_revenue.add_scatter(
+            x=ytd_revenue["MonthLabel"],
+            y=ytd_revenue["GoalRevenue"],
+            mode="lines",
+            name="Goal Revenue",
+            line=dict(color="red", dash="dash")
+        )
+
+    # ✅ Layout
+    fig_ytd_revenue.update_layout(
+        xaxis_title="Month",
+        yaxis_title="Cumulative Revenue ($)",
+        xaxis=dict(
+            tickmode="array",
+            tickvals=ytd_revenue["MonthLabel"],
+            ticktext=ytd_revenue["MonthLabel"]
+        )
+    )
+    return fig_ytd_revenue
+
+
+def weekly_individual_hours_figure(data, show_goals, palette, goals):
+    """Weekly hours per staff over gray goal bars, grouped by week."""
+    weekly_individual_hours = data["weekly_individual_hours"]
+
+    # Colors per staff
+    staff_list = data["staff"]  # keep order consistent with Settings
     color_map = {staff: palette[i % len(palette)] for i, staff in enumerate(staff_list)}
 
-    # 10) Plot
-    fig = go.Figure()
+    # Plot (built once per cache entry, so Plotly's property validation is skipped)
+    fig = go.Figure(_validate=False)
 
     # Bar 1: Weekly goal (light gray) — always present for all x positions
     fig.add_trace(go.Bar(
@@ -405,20 +432,26 @@ def run_rlg_dashboard(start_date, end_date, show_goals):
         name="Weekly Goal",
         showlegend=False,
         marker_color="rgba(128,128,128,0.3)",
-        hoverinfo="skip"
+        hoverinfo="skip",
+        _validate=False,
     ))
 
-    # Bar 2: Actual hours by staff (stacked visually over the gray bar via overlay)
+    # Bar 2: Actual hours, one trace colored per staff (over the gray bar via overlay)
+    fig.add_trace(go.Bar(
+        x=weekly_individual_hours["GroupLabel"],
+        y=weekly_individual_hours["BillableHoursAmount"],
+        name="Hours",
+        showlegend=False,
+        marker_color=weekly_individual_hours["Staff"].map(color_map).to_numpy(),
+        text=weekly_individual_hours["AvgDailyText"],
+        textposition="outside",
+        hovertext=weekly_individual_hours["Staff"],
+        _validate=False,
+    ))
+
+    # Legend: one entry per staff color, without data
     for staff in staff_list:
-        df = weekly_individual_hours[weekly_individual_hours["Staff"] == staff]
-        fig.add_trace(go.Bar(
-            x=df["GroupLabel"],
-            y=df["BillableHoursAmount"],
-            name=staff,
-            marker_color=color_map[staff],
-            text=df["AvgDailyText"],
-            textposition="outside"
-        ))
+        fig.add_trace(go.Bar(x=[None], y=[None], name=staff, marker_color=color_map[staff], _validate=False))
 
     # Optional: transparent bar to print staff initials inside bars
     fig.add_trace(go.Bar(
@@ -431,6 +464,7 @@ def run_rlg_dashboard(start_date, end_date, show_goals):
         textangle=0,
         insidetextanchor="middle",
         textfont=dict(color="white", size=11),
+        _validate=False,
     ))
 
     fig.update_layout(
@@ -442,264 +476,253 @@ def run_rlg_dashboard(start_date, end_date, show_goals):
         legend=dict(orientation="h", yanchor="top", y=-.45, xanchor="center", x=0.5),
         margin=dict(b=0, t=0, l=0, r=0)
     )
+    return fig
+
+
+def weekly_team_hours_figure(data, show_goals, palette, goals):
+    """Team hours per week (the latest weeks of long ranges), with the
+    weekly goal line."""
+    team_weekly_goal = goals["team_weekly"]
+    title = "Weekly Team Hours"
+    if data["team_hours_weeks_capped"]:
+        title += f" (last {TEAM_HOURS_POINT_BUDGET} weeks)"
+    # Weekly Team Hours Chart
+    fig_weekly_hours = px.bar(
+        data["total_team_hours_weekly"],  # ✅ Use the correct dataset
+        x="Week",
+        y="BillableHoursAmount",
+        title=title,
+        labels={"Week": "Week Start", "BillableHoursAmount": "Hours Worked"},
+        color_discrete_sequence=[DARK_BLUE]
+    )
 
-    st.plotly_chart(fig, use_container_width=True)
-    # ----------------------------------------------------------------------------
-    team_monthly_goal = treshold_hours_staff_monthly
-    team_weekly_goal = treshold_hours_staff_weekly
+    # ✅ Add Weekly Goal Line
+    if show_goals:
+        fig_weekly_hours.add_hline(
+            y=team_weekly_goal,
+            line_dash="dash",
+            line_color="red",
+            annotation_text=f"Weekly Goal: {team_weekly_goal:,.0f}",
+            annotation_position="top left",
+        )
 
-    col11, col22 = st.columns(2)
+    fig_weekly_hours.update_layout(
+        xaxis_title="Week",
+        yaxis_title="Hours Worked",
+        xaxis=dict(tickformat="%Y-%m-%d")  # Format dates for better readability
+    )
+    return fig_weekly_hours
+
+
+def monthly_team_hours_figure(data, show_goals, palette, goals):
+    """Team hours per month (quarter, for long ranges) of the range, with
+    the goal line for that bucket."""
+    bucket = data["months_bucket"]
+    team_monthly_goal = goals["team_weekly"] * BUCKET_WEEKS[bucket]
+
+    # Month is an ordered Categorical, so Plotly includes every category
+    fig_prior_team_hours = px.bar(
+        data["prior_months_team_hours"],
+        x="Month",
+        y="BillableHoursAmount",
+        title=f"{BUCKET_LABELS[bucket]} Team Hours",
+        labels={"Month": bucket, "BillableHoursAmount": "Hours Worked"},
+        color_discrete_sequence=[DARK_BLUE],
+        category_orders={"Month": data["months"]}
+    )
 
-    with col11:
-        # Weekly Team Hours Chart
-        fig_weekly_hours = px.bar(
-            total_team_hours_weekly,  # ✅ Use the correct dataset
-            x="Week",
-            y="BillableHoursAmount",
-            title="Weekly Team Hours",
-            labels={"Week": "Week Start", "BillableHoursAmount": "Hours Worked"},
-            color_discrete_sequence=[DARK_BLUE]
+    # ✅ Add Monthly Goal Line
+    if show_goals:
+        fig_prior_team_hours.add_hline(
+            y=team_monthly_goal,
+            line_dash="dash",
+            line_color="red",
+            annotation_text=f"{BUCKET_LABELS[bucket]} Goal: {team_monthly_goal:,.0f}",
+            annotation_position="top left",
         )
 
-        # ✅ Add Weekly Goal Line
-        if show_goals:
-            fig_weekly_hours.add_hline(
-                y=team_weekly_goal,
-                line_dash="dash",
-                line_color="red",
-                annotation_text=f"Weekly Goal: {team_weekly_goal:,.0f}",
-                annotation_position="top left",
-            )
-
-        fig_weekly_hours.update_layout(
-            xaxis_title="Week",
-            yaxis_title="Hours Worked",
-            xaxis=dict(tickformat="%Y-%m-%d")  # Format dates for better readability
-        )
+    fig_prior_team_hours.update_layout(
+        xaxis_title=bucket,
+        yaxis_title="Hours Worked",
+        bargap=0.2
+    )
+    return fig_prior_team_hours
+
+
+def ytd_matters_figure(data, show_goals, palette, goals):
+    """New matters per staff in the range."""
+    # ✅ Create Bar Chart
+    fig_ytd_matters = px.bar(
+        data["new_matters_per_staff"],
+        x="Staff",
+        y="size",
+        title="YTD New Matters",
+        labels={"size": "New Matters", "Staff": "Staff"},
+        color="Staff",
+        color_discrete_sequence=palette
+    )
 
-        st.plotly_chart(fig_weekly_hours, use_container_width=True)
+    fig_ytd_matters.update_layout(
+        xaxis_title="Staff",
+        yaxis_title="New Matters",
+    )
+    return fig_ytd_matters
+
+
+def weekly_new_matters_figure(data, show_goals, palette, goals):
+    """New matters per staff in the latest two weeks."""
+    # ✅ Create Bar Chart
+    fig_weekly_new_matters = px.bar(
+        data["weekly_new_matters_per_staff"],
+        x="Week",
+        y="size",
+        color="Staff",
+        title="Weekly New Matters",
+        labels={"size": "New Matters", "Week": "Week Start", "Staff": "Staff"},
+        color_discrete_sequence=palette,
+        barmode="group"
+    )
 
-    with col22:
-        # 🎯 Step 9: PLOT Team Hours
-        months = pd.period_range(
-            start=start_date.to_period("M"),
-            end=end_date.to_period("M"),
-            freq="M"
-        ).astype(str).tolist()  # e.g. ['2025-01','2025-02',...]
-
-        # 2) Filter & aggregate as before
-        prior_months_team_hours = total_team_hours_monthly[
-            total_team_hours_monthly["Month"].isin(months)
-        ].copy()
-
-        # 3) Turn Month into an ordered Categorical
-        prior_months_team_hours["Month"] = pd.Categorical(
-            prior_months_team_hours["Month"],
-            categories=months,
-            ordered=True
-        )
+    fig_weekly_new_matters.update_layout(
+        xaxis_title="Week",
+        yaxis_title="New Matters",
+        xaxis=dict(tickformat="%Y-%m-%d"),
+        bargap=0.05,         # ← reduces space between group sets
+        bargroupgap=0.05     # ← reduces space between bars within a group
+    )
+    return fig_weekly_new_matters
+
+
+FIGURE_BUILDERS = {
+    "revenue_per_staff": revenue_per_staff_figure,
+    "ytd_revenue": ytd_revenue_figure,
+    "weekly_individual_hours": weekly_individual_hours_figure,
+    "weekly_team_hours": weekly_team_hours_figure,
+    "monthly_team_hours": monthly_team_hours_figure,
+    "ytd_matters": ytd_matters_figure,
+    "weekly_new_matters": weekly_new_matters_figure,
+}
+
+
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES)
+def figure_spec(chart_id, data_hash, show_goals, palette, goals, _data):
+    """Plotly JSON of chart `chart_id` for the aggregation `_data`.
+
+    `data_hash` identifies `_data` (which is not hashed itself), `palette`
+    is a tuple of colors and `goals` a tuple of (name, value) pairs for the
+    goal lines; the cached JSON is reused by every session that plots the
+    same chart for the same inputs.
+    """
+    fig = FIGURE_BUILDERS[chart_id](_data, show_goals, list(palette), dict(goals))
+    return fig.to_json(validate=False)
+
+
+def plot_chart(chart_id, data, show_goals, goals):
+    """Render chart `chart_id` from its cached spec. The spec came out of a
+    figure already, so it is not validated again."""
+    spec = figure_spec(
+        chart_id, data["data_hash"], show_goals, tuple(custom_palette), tuple(sorted(goals.items())), data,
+    )
+    st.plotly_chart(go.Figure(json.loads(spec), _validate=False), use_container_width=True)
 
-        # 4) Now plot, and Plotly will automatically include every category
-        fig_prior_team_hours = px.bar(
-            prior_months_team_hours,
-            x="Month",
-            y="BillableHoursAmount",
-            title="Monthly Team Hours",
-            labels={"Month": "Month", "BillableHoursAmount": "Hours Worked"},
-            color_discrete_sequence=[DARK_BLUE],
-            category_orders={"Month": months}
-        )
 
-        # ✅ Add Monthly Goal Line
-        if show_goals:
-            fig_prior_team_hours.add_hline(
-                y=team_monthly_goal,
-                line_dash="dash",
-                line_color="red",
-                annotation_text=f"Monthly Goal: {team_monthly_goal:,.0f}",
-                annotation_position="top left",
-            )
-
-        fig_prior_team_hours.update_layout(
-            xaxis_title="Month",
-            yaxis_title="Hours Worked",
-            bargap=0.2
-        )
+@st.fragment
+def rlg_charts(data, goals):
+    """The dashboard charts and their goal-lines toggle. A fragment: toggling
+    the goal lines reruns only this, with the same `data` and `goals`."""
+    show_goals = st.toggle("Show Goal Lines", value=True, key="show_goals")
+
+    # ----------------------------------------------------------------------------
+    # ✅ WEEKLY TEAM HOURS & YTD REVENUE CHARTS
+    st.subheader("Weekly Team Hours & YTD Revenue", divider="gray")
+    col1, col2 = st.columns(2)
+    # 🎯 PLOT 1: Cumulative Revenue (Bar Chart)
+    with col1:
+        plot_chart("revenue_per_staff", data, show_goals, goals)
+
+    # 🎯 PLOT 2: CumulativeRevenue (Bar Chart)
+    with col2:
+        plot_chart("ytd_revenue", data, show_goals, goals)
+
+   # ----------------------------------------------------------------------------
+    # ✅ WEEKLY INDIVIDUAL HOURS (Grouped Bar Chart) — with guaranteed gray goal bars
+    st.subheader("Weekly Individual Hours", divider="gray")
+    plot_chart("weekly_individual_hours", data, show_goals, goals)
+    # ----------------------------------------------------------------------------
+
+    col11, col22 = st.columns(2)
+
+    with col11:
+        plot_chart("weekly_team_hours", data, show_goals, goals)
 
-        st.plotly_chart(fig_prior_team_hours, use_container_width=True)
+    with col22:
+        # 🎯 Step 9: PLOT Team Hours
+        plot_chart("monthly_team_hours", data, show_goals, goals)
     #-----------------------------------------------------------------------------------
     
     col111, col222 = st.columns(2)
 
     # ----------------------------------------------------------------------------
     with col111:
-    
-        # ✅ List of staff assignment columns
-        staff_columns = ["orig_staff1", "orig_staff2", "orig_staff3"]
-
-        # ✅ Unpivot staff columns to have a single "Staff" column
-        staff_matter_data = filtered_matters_ytd.melt(
-            id_vars=["MatterCreationDate"], 
-            value_vars=staff_columns,  # ✅ Uses correct column names
-            var_name="Orig_Staff_Role", 
-            value_name="Staff"
-        )
+        plot_chart("ytd_matters", data, show_goals, goals)
+    with col222:
+        plot_chart("weekly_new_matters", data, show_goals, goals)
 
-        # ✅ Remove empty staff assignments & filter only predefined staff list
-        staff_matter_data = staff_matter_data.dropna()
-        staff_matter_data = staff_matter_data[staff_matter_data["Staff"].isin(custom_staff_list)]
-
-        # ✅ Count new matters per staff
-        new_matters_per_staff = staff_matter_data.groupby("Staff", as_index=False).size()
-
-        # ✅ Create Bar Chart
-        fig_ytd_matters = px.bar(
-            new_matters_per_staff,
-            x="Staff",
-            y="size",
-            title="YTD New Matters",
-            labels={"size": "New Matters", "Staff": "Staff"},
-            color="Staff",
-            color_discrete_sequence=custom_palette
-        )
 
-        fig_ytd_matters.update_layout(
-            xaxis_title="Staff",
-            yaxis_title="New Matters",
-        )
+def run_rlg_dashboard(start_date, end_date):
 
-        st.plotly_chart(fig_ytd_matters, use_container_width=True)
-    with col222:
-    
-    
-        # ✅ Unpivot staff columns to have a single "Staff" column
-        weekly_staff_matter_data = filtered_matters_ytd.melt(
-            id_vars=["Week"], 
-            value_vars=staff_columns,  # ✅ Uses correct column names
-            var_name="Orig_Staff_Role", 
-            value_name="Staff"
-        )
 
-        # ✅ Remove empty staff assignments & filter only predefined staff list
-        weekly_staff_matter_data = weekly_staff_matter_data.dropna()
-        weekly_staff_matter_data = weekly_staff_matter_data[weekly_staff_matter_data["Staff"].isin(custom_staff_list)]
-
-        # ✅ Count new matters per staff per week
-        weekly_new_matters_per_staff = weekly_staff_matter_data.groupby(["Week", "Staff"], as_index=False).size()
-        latest_weeks = sorted(weekly_new_matters_per_staff["Week"].unique())[-2:]
-        weekly_new_matters_per_staff = weekly_new_matters_per_staff[weekly_new_matters_per_staff["Week"].isin(latest_weeks)]
-        # ✅ Create Bar Chart
-        fig_weekly_new_matters = px.bar(
-            weekly_new_matters_per_staff,
-            x="Week",
-            y="size",
-            color="Staff",
-            title="Weekly New Matters",
-            labels={"size": "New Matters", "Week": "Week Start", "Staff": "Staff"},
-            color_discrete_sequence=custom_palette,
-            barmode="group"
-        )
+    treshold_hours = st.session_state["treshold_hours"]
+    treshold_revenue = st.session_state["treshold_revenue"]
 
-        fig_weekly_new_matters.update_layout(
-            xaxis_title="Week",
-            yaxis_title="New Matters",
-            xaxis=dict(tickformat="%Y-%m-%d"),
-            bargap=0.05,         # ← reduces space between group sets
-            bargroupgap=0.05     # ← reduces space between bars within a group
-        )
+    if "custom_staff_list" not in st.session_state:
+        st.session_state["custom_staff_list"] = ["AEZ","BPL","CAJ","JER","JRJ","RAW","TGF","KWD","JMG"]
+    custom_staff_list = st.session_state["custom_staff_list"]
+    goals = {
+        "revenue_staff": treshold_revenue / float(len(custom_staff_list)),
+        "team_weekly": treshold_hours,
+    }
+
+    weekly_goals = st.session_state.get("staff_weekly_goals", {})
+    root = snapshot_dir()
+    data = aggregate_rlg_dashboard(
+        start_date, end_date, tuple(custom_staff_list), treshold_revenue, tuple(sorted(weekly_goals.items())),
+        dataset_version(root), root,
+    )
+    # ✅ Identify the Last Selected Month from Date Slider
+    if data is None:
+        st.warning("⚠️ No revenue data found for the selected date range.")
+        return  # or handle gracefully (e.g., display empty chart)
+        
+    # ✅ KPI METRICS (Dynamically Updating)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total Revenue", f"${data['total_revenue']:,.0f}")
+    col2.metric("Current Month Hours", f"{data['current_month_hours']:,.0f} hours")
+    col3.metric("Prior Month Hours", f"{data['prior_month_hours']:,.0f} hours")
 
-        st.plotly_chart(fig_weekly_new_matters, use_container_width=True)
-
-    # ✅ Matrix for Prebills
-    # Define 12 months based on today
-    # ✅ Custom CSS to align selectboxes and labels
-    st.markdown("""
-    <style>
-        .matrix-container {
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            width: 100%;
-            overflow-x: auto;
-        }
-        .matrix-table {
-            border-collapse: collapse;
-            width: 95%;
-            margin-top: 0.5rem;
-            text-align: center;
-            font-size: 0.9rem;
-        }
-        .matrix-table th {
-            background-color: #f0f2f6;
-            padding: 0.5rem;
-            border-bottom: 1px solid #dcdcdc;
-            font-weight: 600;
-        }
-        .matrix-table td {
-            padding: 0.4rem;
-            border-bottom: 1px solid #eee;
-        }
-        .matrix-yes {
-            background-color: #2ca02c;
-            color: white;
-            border-radius: 4px;
-            display: inline-block;
-            width: 16px;
-            height: 16px;
-            margin: auto;
-        }
-        .matrix-no {
-            background-color: #d62728;
-            color: white;
-            border-radius: 4px;
-            display: inline-block;
-            width: 16px;
-            height: 16px;
-            margin: auto;
-        }
-        .staff-name {
-            text-align: left;
-            font-weight: 600;
-            padding-left: 0.6rem;
-        }
-    </style>
-    """, unsafe_allow_html=True)
-    # ✅ Define months
-    months = pd.date_range(
-        start=pd.Timestamp.today().replace(month=1, day=1),
-        periods=12,
-        freq="MS"
-    ).strftime("%b").tolist()
-    
-    # ✅ Load JSON data
-    prebills_data = {}
-    if PREBILLS_FILE.exists():
-        try:
-            with open(PREBILLS_FILE, "r") as f:
-                prebills_data = json.load(f)
-        except json.JSONDecodeError:
-            st.error("⚠️ The prebills file is corrupted or empty.")
-    else:
+    st.markdown("---")
+
+    rlg_charts(data, goals)
+
+    # ✅ Matrix for Prebills (file reread only when it changes, HTML
+    #    rendered once per version; see prebills.py)
+    prebills_matrix_section(get_prebills_matrix())
+
+
+@st.cache_resource
+def get_prebills_matrix():
+    """One prebills matrix shared by all sessions."""
+    return PrebillsMatrix(PREBILLS_FILE)
+
+
+def prebills_matrix_section(matrix):
+    _, _, error = matrix.load()
+    if error == "corrupt":
+        st.error("⚠️ The prebills file is corrupted or empty.")
+    elif error == "missing":
         st.warning("⚠️ No prebills file found.")
-        prebills_data = {}
-    
+
     # ✅ Render
     st.subheader("Prebills Back On Time", divider="gray")
     st.write("Visual summary of prebills status per staff and month:")
-    
-    # ✅ Build full-width HTML table
-    html = "<div class='matrix-container'><table class='matrix-table'>"
-    html += "<tr><th>Name</th>" + "".join([f"<th>{m}</th>" for m in months]) + "</tr>"
-    
-    for staff, months_data in prebills_data.items():
-        html += f"<tr><td class='staff-name'>{staff}</td>"
-        for month in months:
-            value = months_data.get(month, "No")
-            color_class = "matrix-yes" if value == "Yes" else "matrix-no"
-            html += f"<td><div class='{color_class}'></div></td>"
-        html += "</tr>"
-    
-    html += "</table></div>"
-    
-    st.markdown(html, unsafe_allow_html=True)
-
+    st.markdown(matrix.html(MONTHS), unsafe_allow_html=True)
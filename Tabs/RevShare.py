@@ -6,6 +6,8 @@ from pathlib import Path
 import datetime
 import numpy as np
 import json
+from data_files import data_version, read_table, snapshot_dir
+from date_index import DateIndex
 
 
 # ✅ Load Data Function
@@ -15,27 +17,40 @@ def format_as_money(df, columns):
             df[col] = df[col].apply(lambda x: f"${x:,.0f}" if pd.notnull(x) else "")
     return df
 
-def load_data():
-    """Load datasets from the /data folder and preprocess dates."""
-    data_path = Path(__file__).parents[1] / "data"
+DATA_PATH = Path(__file__).parents[1] / "data"
+REVSHARE_FILES = ["RevShareNewLogic", "vwTimeEntriesType1", "vwTimeEntriesType2", "vwTimeEntriesType3"]
 
-    # Load CSVs
-    revshare = pd.read_csv(data_path / "RevShareNewLogic.csv")
+
+def load_data(data_path):
+    """Load datasets from snapshot directory `data_path` and preprocess dates."""
+    # Load Parquet when exported, else CSV
+    revshare = read_table("RevShareNewLogic", data_path)
     revshare["RevShareDate"] = pd.to_datetime(revshare["RevShareDate"], errors="coerce")
-    TETypeI= pd.read_csv(data_path / "vwTimeEntriesType1.csv")
+    TETypeI= read_table("vwTimeEntriesType1", data_path)
     TETypeI["TimeEntryDate"] = pd.to_datetime(TETypeI["TimeEntryDate"], errors="coerce")
-    TETypeII= pd.read_csv(data_path / "vwTimeEntriesType2.csv")
+    TETypeII= read_table("vwTimeEntriesType2", data_path)
     TETypeII["TimeEntryDate"] = pd.to_datetime(TETypeII["TimeEntryDate"], errors="coerce")
-    TETypeIII= pd.read_csv(data_path / "vwTimeEntriesType3.csv")
+    TETypeIII= read_table("vwTimeEntriesType3", data_path)
     TETypeIII["TimeEntryDate"] = pd.to_datetime(TETypeIII["TimeEntryDate"], errors="coerce")
     return revshare, TETypeI, TETypeII, TETypeIII
 
-revshare, TETypeI,TETypeII,TETypeIII =load_data()
+def revshare_indexes():
+    """(revshare index, [time entry indexes]) of the current data snapshot."""
+    # All four from the same data snapshot
+    root = snapshot_dir(DATA_PATH)
+    return _revshare_indexes(data_version(REVSHARE_FILES, root), root)
 
 
+@st.cache_resource(max_entries=2)
+def _revshare_indexes(version, root):
+    revshare, TETypeI, TETypeII, TETypeIII = load_data(root)
+    # Sorted by date with a sub-index per staff, for the range filters below
+    revshare_index = DateIndex(revshare, "RevShareDate", "Staff")
+    te_indexes = [DateIndex(df, "TimeEntryDate", "Staff") for df in (TETypeI, TETypeII, TETypeIII)]
+    return revshare_index, te_indexes
 
 
-def run_revshare(start_date, end_date, revshare=revshare, TETypeI=TETypeI, TETypeII=TETypeII, TETypeIII=TETypeIII):
+def run_revshare(start_date, end_date):
     st.title("Revenue Share Review")
     st.caption("v2.1 - Enhanced Table Formatting")
     custom_staff_list = st.session_state["custom_staff_list"]
@@ -47,40 +62,45 @@ def run_revshare(start_date, end_date, revshare=revshare, TETypeI=TETypeI, TETyp
     # RAW = Russell, DLB = Donna. You can also check if "Settings" is in allowed_tabs as a proxy for admin.
     is_admin = (staff_code in ["RAW", "DLB", "admin"]) or ("Settings" in allowed_tabs)
 
-    # Set up top KPIs with placeholders
-    col1, col2, col3 = st.columns(3)
-    kpi_revenue = col1.empty()
-    kpi_hours = col2.empty()
-    kpi_share = col3.empty()
-
-
-    st.markdown("---")
-
     #  Step 1: Staff dropdown logic
     if is_admin:
         # Admins see everyone
-        staff_selected = st.selectbox("Select Staff", custom_staff_list)
+        staff_options, selector_disabled = custom_staff_list, False
     else:
         # Restrict to their own code
         # If their staff_code is not in the list (e.g. data missing), default to it anyway or handle error
         if staff_code in custom_staff_list:
             # We can show a disabled selectbox or just a markdown
             # st.markdown(f"**Viewing data for:** {staff_code}")
-            staff_selected = st.selectbox("Select Staff", [staff_code], disabled=True)
+            staff_options, selector_disabled = [staff_code], True
         else:
             st.error(f"Staff code '{staff_code}' not found in configuration.")
             st.stop()
 
+    revshare_index, te_indexes = revshare_indexes()
+    revshare_section(start_date, end_date, staff_options, selector_disabled, revshare_index, te_indexes)
+
+
+@st.fragment
+def revshare_section(start_date, end_date, staff_options, selector_disabled, revshare_index, te_indexes):
+    """KPIs, tables and payout chart for the staff member picked here. A
+    fragment: changing the staff selector reruns only this section."""
+    # Set up top KPIs with placeholders
+    col1, col2, col3 = st.columns(3)
+    kpi_revenue = col1.empty()
+    kpi_hours = col2.empty()
+    kpi_share = col3.empty()
+
+
+    st.markdown("---")
+
+    staff_selected = st.selectbox("Select Staff", staff_options, disabled=selector_disabled)
+
 
     # Step 2: Filter and RevShare table
     filtered_rev = (
-        revshare[
-            (revshare["RevShareDate"] >= pd.to_datetime(start_date)) &
-            (revshare["RevShareDate"] <= pd.to_datetime(end_date)) &
-            (revshare["Staff"] == staff_selected)
-        ]
-        .drop(columns=[col for col in revshare.columns if col.startswith("Unnamed")])
-        .sort_values("RevShareDate")
+        revshare_index.between(pd.to_datetime(start_date), pd.to_datetime(end_date), staff_selected)
+        .drop(columns=[col for col in revshare_index.frame.columns if col.startswith("Unnamed")])
     )
 
     # Calculate new columns
@@ -186,24 +206,20 @@ def run_revshare(start_date, end_date, revshare=revshare, TETypeI=TETypeI, TETyp
         "Type III": "Hourly"
     }
 
-    entry_datasets = [TETypeI, TETypeII, TETypeIII]
+    entry_datasets = te_indexes
     entry_labels = ["Type I", "Type II", "Type III"]
     summary_frames = []
 
-    for df, label in zip(entry_datasets, entry_labels):
+    for index, label in zip(entry_datasets, entry_labels):
         # Filter and rename
         filtered_te = (
-            df[
-                (df["TimeEntryDate"] >= pd.to_datetime(start_date)) &
-                (df["TimeEntryDate"] <= pd.to_datetime(end_date)) &
-                (df["Staff"] == staff_selected)
-            ]
+            index.between(pd.to_datetime(start_date), pd.to_datetime(end_date), staff_selected)
             .copy()
             .rename(columns=col_renames)
         )
 
-        # Keep only relevant columns
-        filtered_te = filtered_te[selected_cols]
+        # Keep only relevant columns (Time Entry Name now lives in the detail export)
+        filtered_te = filtered_te.reindex(columns=selected_cols)
         # display_te = format_as_money(filtered_te.copy(), ["Rate", "Gross", "Billed Amount", "Total Payout"])
         # Display - HIDDEN
         friendly_label = label_map[label]
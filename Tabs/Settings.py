@@ -2,23 +2,15 @@ import streamlit as st
 import json
 from pathlib import Path
 import pandas as pd
-import base64
-import requests
 from datetime import datetime
-import time
+from data_loader import dataset_metadata
+from persistence import GitHubBackend, WriteBehindStore, dump_json, write_atomic
 # ----------------------And---------------------------------------
 # 📁 File paths
 # -------------------------------------------------------------
 SETTINGS_FILE = Path(__file__).parents[1] / "data" / "settings.json"
-DATA_PATH = Path(__file__).parents[1] / "data" / "vBillableHoursStaff.csv"
 PREBILLS_FILE = Path(__file__).parents[1] / "data" / "prebills.json"
 #Change 
-# -------------------------------------------------------------
-# 📊 Data preparation
-# -------------------------------------------------------------
-df_time_entries = pd.read_csv(DATA_PATH)
-unique_staff_list = sorted(df_time_entries["StaffAbbreviation"].dropna().unique().tolist())
-
 def load_default_staff_goals():
     """Load staff goals dynamically from settings.json"""
     if SETTINGS_FILE.exists():
@@ -32,18 +24,31 @@ def load_default_staff_goals():
             "JRJ": 20, "RAW": 20, "TGF": 20, "KWD": 20, "JMG": 20,
         }
 
-def push_to_github_serialized(push_func, *args, **kwargs):
-    if st.session_state.get("is_committing", False):
-        st.warning("⏳ Another GitHub commit is in progress, please wait...")
-        return
-
-    st.session_state["is_committing"] = True
+def _secret(key, default=None):
+    """Read a Streamlit secret, tolerating a missing secrets.toml."""
     try:
-        push_func(*args, **kwargs)
-    finally:
-        # small buffer to ensure GitHub commit finishes indexing
-        time.sleep(2)
-        st.session_state["is_committing"] = False
+        return st.secrets.get(key, default)
+    except Exception:
+        return default
+
+@st.cache_resource
+def get_settings_store():
+    """One write-behind store shared by all sessions.
+
+    Saves land in data/ immediately; edits made within the debounce window
+    are pushed to GitHub together as a single commit in the background.
+    Set GITHUB_API_URL in secrets to point at a local stub instead of GitHub.
+    """
+    backend = None
+    if _secret("GITHUB_TOKEN") and _secret("GITHUB_REPO"):
+        backend = GitHubBackend(
+            token=_secret("GITHUB_TOKEN"),
+            repo=_secret("GITHUB_REPO"),
+            branch=_secret("GITHUB_BRANCH", "main"),
+            api_url=_secret("GITHUB_API_URL", "https://api.github.com"),
+            committer={"name": "Streamlit Bot", "email": "bot@streamlit.app"},
+        )
+    return WriteBehindStore(backend, source="Streamlit")
 
 DEFAULT_STAFF_WEEKLY_GOALS = load_default_staff_goals()
 # -------------------------------------------------------------
@@ -51,45 +56,9 @@ DEFAULT_STAFF_WEEKLY_GOALS = load_default_staff_goals()
 # -------------------------------------------------------------
 
 def save_prebills_to_github(prebills_data: dict):
-    """Push prebills.json to GitHub when updated."""
-    import base64, requests, json
-    from datetime import datetime
-
-    # --- Save locally first
-    PREBILLS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(PREBILLS_FILE, "w") as f:
-        json.dump(prebills_data, f, indent=4)
-
-    # --- GitHub settings from secrets ---
-    token = st.secrets["GITHUB_TOKEN"]
-    repo = st.secrets["GITHUB_REPO"]
-    branch = st.secrets.get("GITHUB_BRANCH", "main")
-    path = "data/prebills.json"
-
-    url = f"https://api.github.com/repos/{repo}/contents/{path}"
-    headers = {"Authorization": f"token {token}", "Accept": "application/vnd.github+json"}
-
-    # --- Get current file SHA ---
-    response = requests.get(url, headers=headers, params={"ref": branch})
-    sha = response.json().get("sha") if response.status_code == 200 else None
-
-    # --- Prepare content ---
-    encoded_content = base64.b64encode(json.dumps(prebills_data, indent=4).encode()).decode()
-    data = {
-        "message": f"Auto-update prebills.json from Streamlit ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})",
-        "content": encoded_content,
-        "branch": branch,
-    }
-    if sha:
-        data["sha"] = sha
-
-    # --- Commit to GitHub ---
-    put_response = requests.put(url, headers=headers, data=json.dumps(data))
-    if put_response.status_code in (200, 201):
-        st.toast("Prebills updated in GitHub", icon="💾")
-    else:
-        st.error(f"Failed to update prebills.json: {put_response.status_code}")
-        st.write(put_response.text)
+    """Save prebills.json locally and queue it for the next GitHub commit."""
+    if get_settings_store().save(PREBILLS_FILE, prebills_data, repo_path="data/prebills.json"):
+        st.toast("Prebills saved — syncing to GitHub", icon="💾")
 
 def auto_save_settings(updated_staff_list, updated_goals, new_revenue):
     """Automatically save whenever an input value changes."""
@@ -107,7 +76,7 @@ def auto_save_settings(updated_staff_list, updated_goals, new_revenue):
         "staff_weekly_goals": goals_to_save,
     }
 
-    push_to_github_serialized(save_threshold_settings, updated_settings)
+    save_threshold_settings(updated_settings)
     st.session_state.update(updated_settings)
     st.toast("Auto-saved settings", icon="💾")
 
@@ -152,85 +121,37 @@ def load_threshold_settings():
         "staff_weekly_goals": DEFAULT_STAFF_WEEKLY_GOALS.copy(),
     }
 
-    SETTINGS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-        json.dump(defaults, f, indent=4)
+    write_atomic(SETTINGS_FILE, dump_json(defaults))
 
     st.session_state["last_valid_settings"] = defaults
     return defaults
 
 def save_threshold_settings(thresholds: dict):
     """
-    Save settings.json locally and push to GitHub only if there are real changes.
+    Save settings.json locally and queue a GitHub commit only if there are real changes.
     """
 
     # --- Recalculate and enrich metadata ---
     staff_goals = thresholds.get("staff_weekly_goals", {})
     thresholds["treshold_hours"] = sum(staff_goals.values()) if staff_goals else thresholds.get("treshold_hours", 910)
-    thresholds["last_updated_at"] = datetime.now().isoformat()
 
-    # --- Always save locally for immediate use ---
-    SETTINGS_FILE = Path(__file__).parents[1] / "data" / "settings.json"
-    SETTINGS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-        json.dump(thresholds, f, indent=4)
-
-    # --- GitHub API setup ---
-    token = st.secrets["GITHUB_TOKEN"]
-    repo = st.secrets["GITHUB_REPO"]
-    path = st.secrets["GITHUB_FILE_PATH"]
-    branch = st.secrets.get("GITHUB_BRANCH", "main")
-
-    url = f"https://api.github.com/repos/{repo}/contents/{path}"
-    headers = {"Authorization": f"token {token}"}
-
-    # --- Fetch current file from GitHub ---
-    response = requests.get(url, headers=headers, params={"ref": branch})
-    if response.status_code == 200:
-        sha = response.json().get("sha")
-        current_content = base64.b64decode(response.json()["content"]).decode()
+    # --- Compare old vs new content (ignoring the timestamp) ---
+    current_json = {}
+    if SETTINGS_FILE.exists():
         try:
-            current_json = json.loads(current_content)
+            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
+                current_json = json.load(f)
         except json.JSONDecodeError:
             current_json = {}
-    else:
-        sha = None
-        current_json = {}
-
-    # --- Compare old vs new content ---
-    if current_json == thresholds:
-        st.toast("No changes detected — skipping GitHub commit")
+    current_json.pop("last_updated_at", None)
+    if current_json == {k: v for k, v in thresholds.items() if k != "last_updated_at"}:
         return
 
-    # --- Prepare content for GitHub commit ---
-    new_content = json.dumps(thresholds, indent=4)
-    encoded_content = base64.b64encode(new_content.encode()).decode()
+    thresholds["last_updated_at"] = datetime.now().isoformat()
 
-    data = {
-        "message": f"Auto-update settings.json from Streamlit ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})",
-        "content": encoded_content,
-        "branch": branch,
-        "committer": {"name": "Streamlit Bot", "email": "bot@streamlit.app"},
-    }
-    if sha:
-        data["sha"] = sha
-
-    # --- Push to GitHub (with conflict retry) ---
-    res = requests.put(url, headers=headers, data=json.dumps(data))
-
-    if res.status_code == 409:
-        st.warning("GitHub conflict detected, retrying with latest SHA...")
-        latest = requests.get(url, headers=headers, params={"ref": branch})
-        if latest.status_code == 200:
-            data["sha"] = latest.json().get("sha")
-            res = requests.put(url, headers=headers, data=json.dumps(data))
-
-    # --- Final status ---
-    if res.status_code in (200, 201):
-        st.toast("settings.json updated on GitHub!")
-    else:
-        st.error(f"Failed to update GitHub file: {res.status_code}")
-        st.code(res.text)
+    # --- Save locally now; the store batches the GitHub commit ---
+    repo_path = _secret("GITHUB_FILE_PATH", "data/settings.json")
+    get_settings_store().save(SETTINGS_FILE, thresholds, repo_path=repo_path)
 
 def _ensure_session_defaults():
     """Always refresh Streamlit session state with the latest settings."""
@@ -261,7 +182,7 @@ def run_settings():
     st.markdown("### Select Staff for the Dashboard")
     updated_staff_list = st.multiselect(
         "Choose the staff to include:",
-        options=unique_staff_list,
+        options=dataset_metadata()["staff"],
         default=current_staff_list
     )
 
@@ -405,5 +326,5 @@ def run_settings():
                 )
 
         if st.form_submit_button("Save"):
-            push_to_github_serialized(save_prebills_to_github, updated_data)
-            st.success("Prebills matrix saved and synced to GitHub!")
+            save_prebills_to_github(updated_data)
+            st.success("Prebills matrix saved! GitHub sync runs in the background.")
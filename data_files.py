@@ -0,0 +1,366 @@
+"""Where the exported datasets live on disk and how to read them.
+
+The exporter writes every table as CSV (plain, or gzip/zstd compressed as
+`.csv.gz` / `.csv.zst`) and, when pyarrow is installed, as typed Parquet
+next to it. Readers call `read_table("vMatters")` and get the Parquet copy
+when it exists (dates already dates, amounts already floats), falling back
+to whichever CSV is there.
+
+Each export run also writes `manifest.json`: per file row count, content
+hash, size and timings, plus a status that stays "in_progress" while the
+run is rewriting files. `data_version` turns it into a cache key that only
+changes when content does.
+
+Exports and syncs build a complete set of files in a staging directory and
+publish it as `snapshots/<version>/`, the version being a hash of its
+content; the `current` file names the version readers should use and is
+switched in one step. Every function here taking `data_path` reads from
+the current snapshot when there is one (else from the flat directory), but
+a loader reading several files should resolve `snapshot_dir()` once and
+pass that, so a switch halfway through cannot mix two versions.
+"""
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+DATA_PATH = Path(__file__).parent / "data"
+MANIFEST_FILE = "manifest.json"
+SNAPSHOTS_DIR = "snapshots"
+CURRENT_FILE = "current"
+
+# Published snapshots kept, the current one included, so readers still on
+# a previous version can finish
+KEEP_SNAPSHOTS = 3
+# Staging directories left behind by a crashed run are removed after this
+STALE_STAGING_SECONDS = 24 * 3600
+
+# CSV compression -> file suffix after ".csv"
+COMPRESSION_SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+
+
+class SnapshotInProgress(RuntimeError):
+    """An export run is rewriting the data files; they may not agree yet."""
+
+
+def current_version(data_path=DATA_PATH):
+    """Id of the snapshot `current` points at, or None (flat layout)."""
+    try:
+        version = (Path(data_path) / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    if version and (Path(data_path) / SNAPSHOTS_DIR / version).is_dir():
+        return version
+    return None
+
+
+def snapshot_dir(data_path=DATA_PATH):
+    """Directory to read data files from: the current snapshot, or
+    `data_path` itself when it has none (or already is a snapshot)."""
+    version = current_version(data_path)
+    return Path(data_path) / SNAPSHOTS_DIR / version if version else Path(data_path)
+
+
+def is_snapshot_file(name):
+    """Whether file `name` belongs in a snapshot (datasets and manifest, not
+    settings, users or images)."""
+    return name == MANIFEST_FILE or name.endswith(
+        (".parquet", ".csv", *(f".csv{s}" for s in COMPRESSION_SUFFIXES.values()))
+    )
+
+
+def stage_snapshot(data_path=DATA_PATH, keep=is_snapshot_file):
+    """New staging directory under `snapshots/` holding the current
+    snapshot's files (or, for a flat directory, its files `keep` accepts).
+
+    Files are hard links where the filesystem allows, so writers must
+    replace files (write elsewhere, then os.replace), never modify them.
+    """
+    snapshots = Path(data_path) / SNAPSHOTS_DIR
+    snapshots.mkdir(parents=True, exist_ok=True)
+    staged = Path(tempfile.mkdtemp(dir=snapshots, prefix=".staging-"))
+    base = snapshot_dir(data_path)
+    flat = base == Path(data_path)
+    for path in base.iterdir():
+        if not path.is_file() or (flat and not keep(path.name)):
+            continue
+        try:
+            os.link(path, staged / path.name)
+        except OSError:
+            shutil.copy2(path, staged / path.name)
+    return staged
+
+
+def content_version(path):
+    """Version id of the files in directory `path` (manifest excluded)."""
+    digest = hashlib.sha256()
+    for file in sorted(Path(path).iterdir()):
+        if file.is_file() and file.name != MANIFEST_FILE:
+            digest.update(f"{file.name}\0{file_digest(file)}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def publish_snapshot(staged, data_path=DATA_PATH):
+    """Publish staging directory `staged` as a snapshot and make it current.
+
+    Returns its version id. Content identical to an existing snapshot keeps
+    that one (and its version), so caches keyed on the version stay valid;
+    it takes the new manifest (run timings, failed tables) though, which
+    the version does not cover.
+    """
+    staged = Path(staged)
+    for part in staged.glob("*.part"):
+        part.unlink()
+    version = content_version(staged)
+    target = Path(data_path) / SNAPSHOTS_DIR / version
+    if target.exists():
+        if (staged / MANIFEST_FILE).exists():
+            os.replace(staged / MANIFEST_FILE, target / MANIFEST_FILE)
+        shutil.rmtree(staged)
+        os.utime(target)
+    else:
+        os.replace(staged, target)
+    if current_version(data_path) != version:
+        pointer = Path(data_path) / CURRENT_FILE
+        with open(f"{pointer}.part", "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(f"{pointer}.part", pointer)
+    prune_snapshots(data_path)
+    return version
+
+
+def discard_snapshot(staged):
+    shutil.rmtree(staged, ignore_errors=True)
+
+
+def prune_snapshots(data_path=DATA_PATH, keep=KEEP_SNAPSHOTS):
+    """Remove all but the `keep` most recently published snapshots (never
+    the current one) and staging directories of crashed runs."""
+    snapshots = Path(data_path) / SNAPSHOTS_DIR
+    current = current_version(data_path)
+    published = sorted(
+        (path for path in snapshots.iterdir() if path.is_dir() and not path.name.startswith(".")),
+        key=lambda path: path.stat().st_mtime, reverse=True,
+    )
+    stale = [path for path in published[keep:] if path.name != current]
+    stale += [
+        path for path in snapshots.glob(".staging-*")
+        if time.time() - path.stat().st_mtime > STALE_STAGING_SECONDS
+    ]
+    for path in stale:
+        # Readers may still hold files open (fails on Windows); retried next time
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def compression_available(compression):
+    if compression == "zstd":
+        try:
+            import zstandard  # noqa: F401
+            return True
+        except ImportError:
+            return False
+    return compression in (None, "gzip")
+
+
+def base_name(name):
+    """"vMatters.csv.gz" / "vMatters.parquet" / "vMatters" -> "vMatters"."""
+    for suffix in (".parquet", *(f".csv{s}" for s in COMPRESSION_SUFFIXES.values()), ".csv"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def csv_name(name, compression=None):
+    """"vMatters" -> "vMatters.csv", or "vMatters.csv.gz" with gzip."""
+    return f"{base_name(name)}.csv{COMPRESSION_SUFFIXES.get(compression, '')}"
+
+
+def compression_of(path):
+    """"gzip" / "zstd" for a compressed CSV path, else None."""
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if str(path).endswith(f".csv{suffix}"):
+            return compression
+    return None
+
+
+def candidates(name, data_path=DATA_PATH):
+    """Files that may hold dataset `name`, most preferred first."""
+    base = base_name(name)
+    root = snapshot_dir(data_path)
+    files = [root / csv_name(base, c) for c in COMPRESSION_SUFFIXES if compression_available(c)]
+    files.append(root / csv_name(base))
+    if parquet_available():
+        files.insert(0, root / f"{base}.parquet")
+    return files
+
+
+def resolve(name, data_path=DATA_PATH):
+    """Path of the file to load for dataset `name`.
+
+    The most recently written copy wins, ties going to the more preferred
+    format. So a stale Parquet or compressed copy never shadows a CSV that
+    was re-synced on its own. Returns the plain CSV path if none exist.
+    """
+    files = candidates(name, data_path)
+    existing = [(path.stat().st_mtime, -i, path) for i, path in enumerate(files) if path.exists()]
+    return max(existing)[2] if existing else files[-1]
+
+
+@contextmanager
+def open_csv(path, compression=None):
+    """Text handle for writing a CSV, compressed with `compression`.
+
+    Compressed output is deterministic (no timestamp or name in the gzip
+    header), so identical content gives identical bytes and hashes.
+    """
+    with open(path, "wb") as raw:
+        if compression == "gzip":
+            stream = gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0)
+        elif compression == "zstd":
+            import zstandard
+
+            stream = zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=False)
+        else:
+            stream = raw
+        with io.TextIOWrapper(stream, encoding="utf-8", newline="") as f:
+            yield f
+
+
+def read_table(name, data_path=DATA_PATH, columns=None, **csv_kwargs):
+    """Load dataset `name`, preferring typed Parquet over CSV."""
+    path = resolve(name, data_path)
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path, columns=columns)
+    if columns is not None:
+        csv_kwargs["usecols"] = columns
+    return pd.read_csv(path, **csv_kwargs)
+
+
+def detail_name(name):
+    """"vwTimeEntriesType1" -> "vwTimeEntriesType1Detail" (the wide text columns)."""
+    return f"{base_name(name)}Detail"
+
+
+def with_detail(df, name, data_path=DATA_PATH):
+    """Join the detail export of dataset `name` back onto `df`.
+
+    The detail file's first column is the key. Returns `df` unchanged when
+    there is no detail file or `df` already has its columns (an export from
+    before the split).
+    """
+    path = resolve(detail_name(name), data_path)
+    if not path.exists():
+        return df
+    detail = read_table(detail_name(name), data_path)
+    key = detail.columns[0]
+    extra = [col for col in detail.columns[1:] if col not in df.columns]
+    if key not in df.columns or not extra:
+        return df
+    detail = detail[[key, *extra]].drop_duplicates(key)
+    return df.merge(detail, on=key, how="left")
+
+
+def read_summary(name, data_path=DATA_PATH):
+    """Exported summary `name` (see summaries.py), or None when there is
+    none or the source file that would be loaded now is not the one it was
+    built from (same export run, unchanged since)."""
+    files = (read_manifest(data_path) or {}).get("files", {})
+    path = resolve(name, data_path)
+    entry = files.get(path.name)
+    if not path.exists() or not entry or "source" not in entry:
+        return None
+    source_path = resolve(entry["source"], data_path)
+    source = files.get(source_path.name)
+    if (
+        source is None or source.get("exported_at") != entry.get("exported_at")
+        or not source_path.exists() or source_path.stat().st_size != source.get("bytes")
+    ):
+        return None
+    df = read_table(name, data_path)
+    period = df.columns[0]
+    df[period] = pd.to_datetime(df[period], errors="coerce")
+    return df
+
+
+def dates_as_text(df):
+    """Render datetime columns as the CSV export writes them, for callers
+    that pass raw values through (e.g. JSON APIs expecting date strings)."""
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].astype(str).where(df[col].notna(), None)
+    return df
+
+
+def file_digest(path, block_size=1 << 20):
+    """sha256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(data_path=DATA_PATH):
+    """The last export manifest, or None if there is none (or it is unreadable)."""
+    try:
+        with open(snapshot_dir(data_path) / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def export_in_progress(data_path=DATA_PATH):
+    manifest = read_manifest(data_path)
+    return bool(manifest) and manifest.get("status") == "in_progress"
+
+
+def check_snapshot(data_path=DATA_PATH):
+    """Raise SnapshotInProgress rather than parse a half-written export."""
+    if export_in_progress(data_path):
+        raise SnapshotInProgress("Data export in progress; try again shortly")
+
+
+def data_version(names, data_path=DATA_PATH):
+    """Version key for datasets `names`.
+
+    In a snapshot that is just its version id: (version,). In a flat data
+    directory it has one element per file, the manifest hash of the copy that would be loaded, so a file
+    rewritten with identical content keeps its version. While an export is
+    in progress the manifest still describes the previous run, which keeps
+    callers on the data they already have. Files the manifest does not
+    cover, or whose size no longer matches it (copied in by hand), fall
+    back to their mtime; missing files count as None.
+    """
+    root = snapshot_dir(data_path)
+    if root.parent.name == SNAPSHOTS_DIR:
+        return (root.name,)
+    manifest = read_manifest(data_path) or {}
+    entries = manifest.get("files", {})
+    in_progress = manifest.get("status") == "in_progress"
+    key = []
+    for name in names:
+        path = resolve(name, data_path)
+        entry = entries.get(path.name)
+        if not path.exists():
+            key.append(None)
+        elif entry and (in_progress or path.stat().st_size == entry.get("bytes")):
+            key.append(entry["sha256"])
+        else:
+            key.append(path.stat().st_mtime)
+    return tuple(key)
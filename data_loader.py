@@ -1,21 +1,63 @@
 import pandas as pd
-from pathlib import Path
 import streamlit as st
 
-@st.cache_data(ttl=0)
-def load_data():
-    data_path = Path(__file__).parent / "data"
+from data_files import DATA_PATH, check_snapshot, data_version, read_summary, read_table, resolve, snapshot_dir
+from date_index import DateIndex
+from summaries import SUMMARIES, matter_origination, summarize
 
-    # Load with no dtype forcing — let pandas infer
-    revenue = pd.read_csv(data_path / "RevShareNewLogic.csv", encoding="utf-8")
-    billable_hours = pd.read_csv(data_path / "vBillableHoursStaff.csv", encoding="utf-8")
-    matters = pd.read_csv(data_path / "vMatters.csv", encoding="utf-8")
-    flat_matters = pd.read_csv(data_path / "vwFlatMatters.csv", encoding="utf-8")
+# Dates in the exports are wall-clock times in this zone
+LOCAL_TZ = "America/Chicago"
 
-    # --- Parse dates first ---
-    revenue["RevShareDate"] = pd.to_datetime(revenue["RevShareDate"], errors="coerce")
-    billable_hours["BillableHoursDate"] = pd.to_datetime(billable_hours["BillableHoursDate"], errors="coerce")
-    matters["MatterCreationDate"] = pd.to_datetime(matters["MatterCreationDate"], errors="coerce")
+# Files whose modification times identify a version of the core datasets
+CORE_FILES = [
+    "RevShareNewLogic.csv",
+    "vBillableHoursStaff.csv",
+    "vMatters.csv",
+    "vwFlatMatters.csv",
+]
+
+
+def data_mtimes(files=CORE_FILES, data_path=DATA_PATH):
+    """Modification times of a set of data files (no parsing), taken from
+    whichever copy (Parquet or CSV) would actually be loaded."""
+    return tuple(resolve(name, data_path).stat().st_mtime for name in files)
+
+
+def dataset_version(root=None):
+    """Version key of everything `load_data()` and `load_summaries()`
+    return, for caches of results derived from them. `root` pins the
+    snapshot directory (default: the current one)."""
+    return data_version(CORE_FILES + list(SUMMARIES), root or snapshot_dir())
+
+
+def load_data(root=None):
+    """revenue, billable_hours, matters, flat_matters, mtime_key.
+
+    All four come from one data snapshot and are parsed once per snapshot
+    version (export manifest hashes for a flat data directory), so a rerun
+    or an export that rewrote identical files reuses the cached frames.
+    Raises SnapshotInProgress if nothing is cached and an export is
+    still writing the files of a flat data directory. `root` pins the
+    snapshot directory (default: the current one).
+    """
+    root = root or snapshot_dir()
+    return _load_data(data_version(CORE_FILES, root), root)
+
+
+@st.cache_data(max_entries=2)
+def _load_data(version, root):
+    check_snapshot(root)
+
+    # Typed Parquet when the exporter wrote it, else CSV with no dtype forcing
+    revenue = read_table("RevShareNewLogic", root, encoding="utf-8")
+    billable_hours = read_table("vBillableHoursStaff", root, encoding="utf-8")
+    matters = read_table("vMatters", root, encoding="utf-8")
+    flat_matters = read_table("vwFlatMatters", root, encoding="utf-8")
+
+    # --- Parse dates first (naive local times, see LOCAL_TZ) ---
+    revenue["RevShareDate"] = local_times(revenue["RevShareDate"])
+    billable_hours["BillableHoursDate"] = local_times(billable_hours["BillableHoursDate"])
+    matters["MatterCreationDate"] = local_times(matters["MatterCreationDate"])
 
     # --- Define numeric cleaning (excluding date columns) ---
     def clean_numeric(df: pd.DataFrame, exclude_cols=None) -> pd.DataFrame:
@@ -23,7 +65,10 @@ def load_data():
         for col in df.columns:
             if col in exclude_cols:
                 continue
-            
+            # Already typed (Parquet, or inferred by read_csv): nothing to clean
+            if df[col].dtype != object:
+                continue
+
             # Skip columns that are clearly not numeric
             if df[col].dtype == "datetime64[ns]" or df[col].dtype.name.startswith("datetime"):
                 continue
@@ -72,12 +117,111 @@ def load_data():
     )
 
     # --- Modification timestamp tracking ---
-    csv_files = [
-        data_path / "RevShareNewLogic.csv",
-        data_path / "vBillableHoursStaff.csv",
-        data_path / "vMatters.csv",
-        data_path / "vwFlatMatters.csv",
-    ]
-    mtime_key = tuple(f.stat().st_mtime for f in csv_files)
+    mtime_key = data_mtimes(CORE_FILES, root)
 
     return revenue, billable_hours, matters, flat_matters, mtime_key
+
+
+def local_times(values):
+    """Dates parsed as naive LOCAL_TZ wall-clock times. A timezone the
+    source attached is dropped without shifting, the way the dashboards
+    have always read these dates."""
+    dates = pd.to_datetime(values, errors="coerce")
+    return dates.dt.tz_localize(None) if dates.dt.tz is not None else dates
+
+
+def dataset_metadata():
+    """What the sidebar and tabs show about the current data, computed once
+    per data version (a small dict, cheap to hand out on every rerun):
+
+    "dates": {date column: (earliest, latest)} for RevShareDate,
+        BillableHoursDate and MatterCreationDate, as LOCAL_TZ-aware
+        timestamps (the frames themselves keep naive local times, which is
+        what the aggregations, summaries and API compare against)
+    "rows": {dataset: row count} for the `load_data()` frames
+    "last_update": LOCAL_TZ-aware time the newest core file was written
+    "staff": sorted distinct StaffAbbreviation of the billable hours
+    """
+    root = snapshot_dir()
+    return _dataset_metadata(data_version(CORE_FILES, root), root)
+
+
+@st.cache_data(max_entries=2)
+def _dataset_metadata(version, root):
+    revenue, billable_hours, matters, flat_matters, mtime_key = _load_data(version, root)
+    dates = {
+        "RevShareDate": revenue["RevShareDate"],
+        "BillableHoursDate": billable_hours["BillableHoursDate"],
+        "MatterCreationDate": matters["MatterCreationDate"],
+    }
+    return {
+        "dates": {
+            column: (values.min().tz_localize(LOCAL_TZ), values.max().tz_localize(LOCAL_TZ))
+            for column, values in dates.items()
+        },
+        "rows": {
+            "revenue": len(revenue),
+            "billable_hours": len(billable_hours),
+            "matters": len(matters),
+            "flat_matters": len(flat_matters),
+        },
+        "last_update": pd.Timestamp(max(mtime_key), unit="s", tz="UTC").tz_convert(LOCAL_TZ),
+        "staff": sorted(billable_hours["StaffAbbreviation"].dropna().unique().tolist()),
+    }
+
+
+def load_summaries(root=None):
+    """{summary name: frame} for the summaries in summaries.SUMMARIES, e.g.
+    "HoursByStaffDaily" (Date, Staff, BillableHoursAmount).
+
+    Uses the exporter's summary files when they match the raw files on
+    disk, otherwise aggregates the raw rows from `load_data()`.
+    """
+    root = root or snapshot_dir()
+    return _load_summaries(data_version(CORE_FILES + list(SUMMARIES), root), root)
+
+
+@st.cache_data(max_entries=2)
+def _load_summaries(version, root):
+    # Raw rows, if needed, from the same snapshot
+    return summary_frames(lambda: _load_data(data_version(CORE_FILES, root), root), root)
+
+
+def date_indexes(root=None):
+    """DateIndex (see date_index.py) per filtered dataset, built once per
+    data version and shared, not copied, between sessions:
+
+    "revenue" (RevShareDate, per Staff), "matter_origination" (the
+    long-form summaries.matter_origination table, by MatterCreationDate,
+    per Staff) and "hours_by_staff_daily" (Date, per Staff). `root` pins
+    the snapshot directory (default: the current one).
+    """
+    root = root or snapshot_dir()
+    return _date_indexes(data_version(CORE_FILES + list(SUMMARIES), root), root)
+
+
+@st.cache_resource(max_entries=2)
+def _date_indexes(version, root):
+    revenue, _, matters, _, _ = load_data(root)
+    return {
+        "revenue": DateIndex(revenue, "RevShareDate", "Staff"),
+        "matter_origination": DateIndex(matter_origination(matters), "MatterCreationDate", "Staff"),
+        "hours_by_staff_daily": DateIndex(load_summaries(root)["HoursByStaffDaily"], "Date", "Staff"),
+    }
+
+
+def summary_frames(core_data, data_path=DATA_PATH):
+    """Exported summaries, aggregating the raw rows of `core_data()` (a
+    `load_data`-shaped callable, only called if needed) for any that are
+    missing or stale."""
+    check_snapshot(data_path)
+    frames = {name: read_summary(name, data_path) for name in SUMMARIES}
+    missing = {SUMMARIES[name][0] for name, df in frames.items() if df is None}
+    if missing:
+        _, billable_hours, matters, _, _ = core_data()
+        raw = {"vBillableHoursStaff": billable_hours, "vMatters": matters}
+        for source in missing:
+            for name, df in summarize(source, raw[source]).items():
+                if frames[name] is None:
+                    frames[name] = df
+    return frames
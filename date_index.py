@@ -0,0 +1,65 @@
+"""Sorted indexes for the dashboards' date-range and staff filters.
+
+A `DateIndex` keeps a frame sorted by its date column, so a range filter
+is two binary searches and a slice of the sorted frame instead of a
+boolean mask over the whole history. With a staff column it also keeps a
+sub-index per staff member, for filters that add `Staff == x`.
+"""
+import pandas as pd
+
+
+class StaffIndex:
+    """Row positions of `frame` per value of `column`."""
+
+    def __init__(self, frame, column):
+        self.frame = frame
+        self._rows = frame.groupby(column, sort=False).indices if column in frame.columns else None
+
+    def rows(self, staff):
+        """Rows of staff `staff` (same as frame[frame[column] == staff]);
+        the whole frame when it has no such column."""
+        if self._rows is None:
+            return self.frame
+        return self.frame.take(self._rows.get(staff, []))
+
+
+class DateIndex:
+    """`frame` sorted by `date_column`, for date range (and staff) filters.
+
+    Rows without a date are left out: no range filter selects them.
+    """
+
+    def __init__(self, frame, date_column, staff_column=None):
+        frame = frame.dropna(subset=[date_column])
+        if not frame[date_column].is_monotonic_increasing:
+            frame = frame.sort_values(date_column, kind="stable")
+        self.frame = frame.reset_index(drop=True)
+        self.date_column = date_column
+        self.staff_column = staff_column
+        self._dates = pd.DatetimeIndex(self.frame[date_column])
+        self._staff = {}
+        if staff_column is not None:
+            # Positions ascend within each group, so every sub-frame is sorted too
+            for staff, rows in self.frame.groupby(staff_column, sort=False).indices.items():
+                self._staff[staff] = DateIndex(self.frame.take(rows), date_column)
+
+    def _bounds(self, start, end):
+        lo = 0 if start is None else self._dates.searchsorted(pd.Timestamp(start), side="left")
+        hi = len(self._dates) if end is None else self._dates.searchsorted(pd.Timestamp(end), side="right")
+        return lo, max(lo, hi)
+
+    def between(self, start=None, end=None, staff=None):
+        """Rows with start <= date <= end (a missing bound is open).
+
+        `staff` (one value or a list) restricts them to those staff. Without
+        it, or with one staff member (via its sub-index), the result is a
+        slice of a sorted frame; a list filters the slice of the range.
+        """
+        if isinstance(staff, str):
+            sub = self._staff.get(staff)
+            return sub.between(start, end) if sub is not None else self.frame.iloc[:0]
+        lo, hi = self._bounds(start, end)
+        rows = self.frame.iloc[lo:hi]
+        if staff is None:
+            return rows
+        return rows[rows[self.staff_column].isin(list(staff))]
@@ -0,0 +1,265 @@
+"""Write-behind persistence for the small JSON files edited from the apps
+(settings.json, prebills.json).
+
+Saves are written locally and atomically right away. Commits are
+debounced: every file saved within the window goes into one background
+commit, pushed either with the git CLI (any remote, including a local
+bare repo) or through the GitHub git data API (any base URL, so a local
+HTTP stub can stand in for api.github.com).
+"""
+import atexit
+import base64
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+DEBOUNCE_SECONDS = float(os.environ.get("PERSIST_DEBOUNCE_SECONDS", 5))
+MAX_DELAY_SECONDS = float(os.environ.get("PERSIST_MAX_DELAY_SECONDS", 30))
+# Failed commits in a row before the store stops retrying on its own
+MAX_ATTEMPTS = int(os.environ.get("PERSIST_MAX_ATTEMPTS", 5))
+
+logger = logging.getLogger(__name__)
+
+
+def dump_json(data) -> str:
+    return json.dumps(data, indent=4)
+
+
+def write_atomic(path, content: str):
+    """Replace `path` with `content` without readers ever seeing a partial file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+# -------------------------------------------------------------
+# Commit backends
+# -------------------------------------------------------------
+
+class GitCliBackend:
+    """Commit with the local git CLI and push to `remote` (name, URL or path)."""
+
+    def __init__(self, repo_dir, remote="origin", branch="main"):
+        self.repo_dir = Path(repo_dir)
+        self.remote = remote
+        self.branch = branch
+
+    def _git(self, *args, check=True):
+        return subprocess.run(
+            ["git", *args], cwd=self.repo_dir, check=check, capture_output=True, text=True
+        )
+
+    def commit(self, files: dict, message: str):
+        """files: repo path -> local path. Returns False when nothing changed
+        and there was nothing left to push."""
+        paths = list(files)
+        self._git("add", "--", *paths)
+        committed = self._git("diff", "--cached", "--quiet", "--", *paths, check=False).returncode != 0
+        if committed:
+            self._git("commit", "-m", message, "--", *paths)
+        # Also pushes a commit whose push failed on an earlier attempt
+        pushed = self._push_if_ahead()
+        return committed or pushed
+
+    def _is_ancestor(self, ancestor, commit):
+        return self._git("merge-base", "--is-ancestor", ancestor, commit, check=False).returncode == 0
+
+    def _push_if_ahead(self):
+        """Push HEAD unless the remote branch already contains it, first
+        rebasing onto the remote branch if that has moved on."""
+        head = self._git("rev-parse", "HEAD").stdout.strip()
+        listed = self._git("ls-remote", self.remote, f"refs/heads/{self.branch}").stdout.split()
+        remote_head = listed[0] if listed else None
+        if remote_head == head:
+            return False
+        if remote_head:
+            # Fetch so the remote head is known locally before comparing
+            self._git("fetch", "-q", self.remote, self.branch)
+            if self._is_ancestor("HEAD", remote_head):
+                return False
+            if not self._is_ancestor(remote_head, "HEAD"):
+                # Not a fast-forward -> replay our commits on the new head
+                rebase = self._git("rebase", "--autostash", remote_head, check=False)
+                if rebase.returncode != 0:
+                    self._git("rebase", "--abort", check=False)
+                    raise RuntimeError(
+                        f"Could not rebase onto {self.remote}/{self.branch}: {rebase.stderr.strip()}"
+                    )
+        self._git("push", self.remote, f"HEAD:{self.branch}")
+        return True
+
+
+class GitHubBackend:
+    """Create a single commit for several files via the GitHub git data API."""
+
+    def __init__(self, token, repo, branch="main", api_url="https://api.github.com", committer=None):
+        self.repo = repo
+        self.branch = branch
+        self.api_url = api_url.rstrip("/")
+        self.committer = committer
+        self.session = requests.Session()
+        if token:
+            self.session.headers["Authorization"] = f"token {token}"
+        self.session.headers["Accept"] = "application/vnd.github+json"
+
+    def _url(self, path):
+        return f"{self.api_url}/repos/{self.repo}/git/{path}"
+
+    def _call(self, method, path, **kwargs):
+        res = self.session.request(method, self._url(path), timeout=30, **kwargs)
+        res.raise_for_status()
+        return res.json()
+
+    def commit(self, files: dict, message: str, retries=1):
+        """files: repo path -> local path."""
+        tree = [
+            {
+                "path": repo_path,
+                "mode": "100644",
+                "type": "blob",
+                "encoding": "base64",
+                "content": base64.b64encode(Path(local_path).read_bytes()).decode(),
+            }
+            for repo_path, local_path in files.items()
+        ]
+        # Blobs first: inline tree content only supports utf-8 text
+        for entry in tree:
+            blob = self._call("POST", "blobs", json={"content": entry.pop("content"), "encoding": entry.pop("encoding")})
+            entry["sha"] = blob["sha"]
+
+        for attempt in range(retries + 1):
+            head = self._call("GET", f"ref/heads/{self.branch}")["object"]["sha"]
+            base_tree = self._call("GET", f"commits/{head}")["tree"]["sha"]
+            new_tree = self._call("POST", "trees", json={"base_tree": base_tree, "tree": tree})
+            if new_tree["sha"] == base_tree:
+                return False
+            payload = {"message": message, "tree": new_tree["sha"], "parents": [head]}
+            if self.committer:
+                payload["committer"] = self.committer
+            new_commit = self._call("POST", "commits", json=payload)
+            res = self.session.patch(self._url(f"refs/heads/{self.branch}"), json={"sha": new_commit["sha"]}, timeout=30)
+            # 422: branch moved underneath us (not a fast-forward) -> rebuild on new head
+            if res.status_code == 422 and attempt < retries:
+                continue
+            res.raise_for_status()
+            return True
+
+
+# -------------------------------------------------------------
+# Write-behind store
+# -------------------------------------------------------------
+
+class WriteBehindStore:
+    """Atomic local writes now, one batched commit per debounce window."""
+
+    def __init__(self, backend=None, debounce=DEBOUNCE_SECONDS, max_delay=MAX_DELAY_SECONDS, source="app",
+                 max_attempts=MAX_ATTEMPTS):
+        self.backend = backend
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.source = source
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._pending = {}          # repo path -> local path
+        self._first_pending = None
+        self._timer = None
+        self.last_error = None
+        self.last_commit_at = None
+        self.failures = 0           # failed commits in a row
+        atexit.register(self.flush)
+
+    def save(self, local_path, data, repo_path):
+        """Write `data` as JSON to `local_path` and queue it for the next commit.
+
+        Returns False (and queues nothing) when the file content is unchanged.
+        """
+        content = dump_json(data)
+        local_path = Path(local_path)
+        try:
+            if local_path.read_text(encoding="utf-8") == content:
+                return False
+        except OSError:
+            pass
+        write_atomic(local_path, content)
+
+        if self.backend is None:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._pending[repo_path] = local_path
+            if self._first_pending is None:
+                self._first_pending = now
+            # Restart the debounce window, but never hold changes past max_delay
+            self._schedule(min(self.debounce, max(0.0, self._first_pending + self.max_delay - now)))
+        return True
+
+    def _schedule(self, delay):
+        # Caller holds self._lock
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    @property
+    def pending(self):
+        with self._lock:
+            return sorted(self._pending)
+
+    def flush(self):
+        """Commit everything queued so far. Safe to call from any thread."""
+        with self._commit_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                files, self._pending = self._pending, {}
+                self._first_pending = None
+            if not files or self.backend is None:
+                return False
+
+            names = ", ".join(Path(p).name for p in sorted(files))
+            message = f"Auto-update {names} from {self.source} ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})"
+            try:
+                committed = self.backend.commit(files, message)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                # Keep the files queued (newer saves win) and retry later; after
+                # max_attempts only the next save (or flush) tries again
+                retry = self.failures < self.max_attempts
+                if retry:
+                    logger.warning("Write-behind commit failed (attempt %d): %s", self.failures, e)
+                else:
+                    logger.error("Write-behind commit failed %d times, not retrying: %s", self.failures, e)
+                with self._lock:
+                    for repo_path, local_path in files.items():
+                        self._pending.setdefault(repo_path, local_path)
+                    if self._first_pending is None:
+                        self._first_pending = time.monotonic()
+                    if retry:
+                        self._schedule(self.max_delay)
+                return False
+            self.failures = 0
+            self.last_error = None
+            self.last_commit_at = datetime.now()
+            return committed
@@ -0,0 +1,139 @@
+"""The prebills matrix: whether each staff member's prebills came back on
+time, per month (data/prebills.json, edited from Settings).
+
+Both apps read it on every render or request. `PrebillsMatrix` rereads the
+file only when its modification time or size changes, and renders the
+HTML table once per (file version, month list).
+"""
+import json
+import threading
+from html import escape
+from pathlib import Path
+
+PREBILLS_FILE = Path(__file__).parent / "data" / "prebills.json"
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+MATRIX_CSS = """
+<style>
+    .matrix-container {
+        display: flex;
+        flex-direction: column;
+        align-items: center;
+        width: 100%;
+        overflow-x: auto;
+    }
+    .matrix-table {
+        border-collapse: collapse;
+        width: 95%;
+        margin-top: 0.5rem;
+        text-align: center;
+        font-size: 0.9rem;
+    }
+    .matrix-table th {
+        background-color: #f0f2f6;
+        padding: 0.5rem;
+        border-bottom: 1px solid #dcdcdc;
+        font-weight: 600;
+    }
+    .matrix-table td {
+        padding: 0.4rem;
+        border-bottom: 1px solid #eee;
+    }
+    .matrix-yes {
+        background-color: #2ca02c;
+        color: white;
+        border-radius: 4px;
+        display: inline-block;
+        width: 16px;
+        height: 16px;
+        margin: auto;
+    }
+    .matrix-no {
+        background-color: #d62728;
+        color: white;
+        border-radius: 4px;
+        display: inline-block;
+        width: 16px;
+        height: 16px;
+        margin: auto;
+    }
+    .staff-name {
+        text-align: left;
+        font-weight: 600;
+        padding-left: 0.6rem;
+    }
+</style>
+"""
+
+CELLS = {True: "<td><div class='matrix-yes'></div></td>", False: "<td><div class='matrix-no'></div></td>"}
+
+
+def render_matrix(prebills, months=MONTHS):
+    """HTML table (with its CSS) of `prebills` ({staff: {month: "Yes"/"No"}})
+    over `months`; a month without a value counts as "No"."""
+    parts = [MATRIX_CSS, "<div class='matrix-container'><table class='matrix-table'><tr><th>Name</th>"]
+    parts.extend(f"<th>{escape(month)}</th>" for month in months)
+    parts.append("</tr>")
+    for staff, months_data in prebills.items():
+        parts.append(f"<tr><td class='staff-name'>{escape(staff)}</td>")
+        parts.extend(CELLS[months_data.get(month, "No") == "Yes"] for month in months)
+        parts.append("</tr>")
+    parts.append("</table></div>")
+    return "".join(parts)
+
+
+class PrebillsMatrix:
+    """prebills.json, reloaded when the file changes, and its rendered matrix.
+
+    Safe to share between threads and sessions; the returned data is shared
+    too and must not be modified.
+    """
+
+    def __init__(self, path=PREBILLS_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._version = self._data = self._error = None
+        self._html = {}
+
+    def _stat(self):
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        """(version, data, error): the file's (mtime, size) or None when it
+        is missing, its contents ({} if unreadable) and None, "missing" or
+        "corrupt"."""
+        version = self._stat()
+        with self._lock:
+            if self._data is None or version != self._version:
+                data, error = {}, None
+                if version is None:
+                    error = "missing"
+                else:
+                    try:
+                        data = json.loads(self.path.read_text())
+                    except (FileNotFoundError, json.JSONDecodeError):
+                        error = "corrupt"
+                self._version, self._data, self._error = version, data, error
+                self._html = {}
+            return self._version, self._data, self._error
+
+    def data(self):
+        """{staff: {month: "Yes"/"No"}} as currently on disk."""
+        return self.load()[1]
+
+    def html(self, months=MONTHS):
+        """`render_matrix` of the current data, rendered once per version."""
+        version, data, _ = self.load()
+        key = (version, tuple(months))
+        with self._lock:
+            html = self._html.get(key)
+        if html is None:
+            html = render_matrix(data, months)
+            with self._lock:
+                if self._version == version:
+                    self._html[key] = html
+        return html
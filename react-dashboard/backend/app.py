@@ -1,10 +1,13 @@
 import os
 import json
+import logging
+import threading
 import pandas as pd
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import sys
 
@@ -14,14 +17,31 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 from unittest.mock import MagicMock
 mock_st = MagicMock()
 mock_st.cache_data = lambda f=None, **kwargs: f if f else lambda x: x
+mock_st.cache_resource = mock_st.cache_data
 sys.modules["streamlit"] = mock_st
 
-from data_loader import load_data
+from data_loader import load_data, summary_frames, CORE_FILES
+from summaries import SUMMARIES
+from date_index import StaffIndex
+from data_files import (
+    SnapshotInProgress, check_snapshot, data_version, dates_as_text, detail_name, read_table, snapshot_dir,
+    with_detail,
+)
+from persistence import GitCliBackend, WriteBehindStore
+from prebills import PrebillsMatrix
 from sync_data import sync_from_github
+import metrics
+from dataset_cache import DatasetCache
+from deltas import RowHistory, version_id
 
 app = Flask(__name__)
 CORS(app)
 
+# Per-route latency / payload metrics, exposed on /api/metrics to logged-in
+# users and to scrapers sending METRICS_TOKEN as a bearer token
+metrics_registry = metrics.MetricsRegistry()
+metrics.init_app(app, metrics_registry, scrape_token=os.environ.get("METRICS_TOKEN"))
+
 # Configuration
 app.config['JWT_SECRET_KEY'] = 'your-secret-key-change-in-production'
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=8)
@@ -31,6 +51,77 @@ jwt = JWTManager(app)
 BASE_DIR = Path(__file__).parent.parent.parent
 DATA_PATH = BASE_DIR / "data"
 
+REVSHARE_FILES = [
+    "RevShareNewLogic.csv",
+    "vwTimeEntriesType1.csv",
+    "vwTimeEntriesType2.csv",
+    "vwTimeEntriesType3.csv",
+]
+REVSHARE_DETAIL_FILES = [detail_name(name) for name in REVSHARE_FILES[1:]]
+
+# ============================================================================
+# Dataset cache
+# ============================================================================
+
+# Single-flight cache: one thread reparses a changed dataset while the
+# others keep serving the previous version. Versions are data snapshot ids
+# (see data_files), and each load reads from the snapshot its version
+# names.
+datasets = DatasetCache(metrics_registry)
+
+# Row hashes per data version, for /api/data/<dataset>?since=<version>
+row_history = RowHistory()
+
+# Names under /api/data/<dataset>, in the order the loaders return frames
+CORE_DATASETS = ["revenue", "billable-hours", "matters", "flat-matters"]
+REVSHARE_DATASETS = ["revshare", "te-type1", "te-type2", "te-type3"]
+# Pre-aggregated summaries (summaries.py), e.g. /api/data/hours-by-staff-weekly
+SUMMARY_DATASETS = {
+    "hours-by-staff-daily": "HoursByStaffDaily",
+    "hours-by-staff-weekly": "HoursByStaffWeekly",
+    "hours-by-staff-monthly": "HoursByStaffMonthly",
+    "matters-by-staff-weekly": "MattersByStaffWeekly",
+}
+
+def _tracked(names, version, loader):
+    """Wrap `loader` so each frame's row hashes are kept for this version."""
+    def load():
+        frames = loader()
+        vid = version_id(version)
+        for name, df in zip(names, frames):
+            if df is not None:
+                row_history.record(name, vid, df)
+        return frames
+    return load
+
+def get_core_data_versioned():
+    """(version, `load_data()` result) — the version may lag during a reload."""
+    root = snapshot_dir(DATA_PATH)
+    version = data_version(CORE_FILES, root)
+    return datasets.get_versioned("core", version, _tracked(CORE_DATASETS, version, lambda: load_data(root)))
+
+def get_core_data():
+    """Cached `load_data()` result: revenue, billable_hours, matters, flat_matters, mtime_key."""
+    return get_core_data_versioned()[1]
+
+# ============================================================================
+# Settings persistence
+# ============================================================================
+
+# Saves within the debounce window are committed and pushed as one batch.
+# DATA_GIT_REMOTE may be any git remote, e.g. a local bare repo for testing.
+settings_store = WriteBehindStore(
+    GitCliBackend(
+        BASE_DIR,
+        remote=os.environ.get("DATA_GIT_REMOTE", "origin"),
+        branch=os.environ.get("DATA_GIT_BRANCH", "main"),
+    ),
+    source="React",
+)
+
+# prebills.json, reread only after it changes (saves below, Streamlit, sync)
+prebills_matrix = PrebillsMatrix(DATA_PATH / "prebills.json")
+
 # ============================================================================
 # Auth Routes
 # ============================================================================
@@ -86,14 +177,10 @@ def verify():
 @jwt_required()
 def get_all_data():
     try:
-        revenue, billable_hours, matters, flat_matters, mtime_key = load_data()
+        revenue, billable_hours, matters, flat_matters, mtime_key = get_core_data()
         
-        # Add prebills status to the data as well
-        try:
-            with open(DATA_PATH / "prebills.json", 'r') as f:
-                prebills = json.load(f)
-        except:
-            prebills = {}
+        # Add prebills status to the data as well ({} if unreadable)
+        prebills = prebills_matrix.data()
 
         return jsonify({
             'revenue': json.loads(revenue.to_json(orient='records')),
@@ -110,8 +197,8 @@ def get_all_data():
 def sync_data_route():
     try:
         results = sync_from_github()
-        # After syncing, we might want to clear any caches if needed
-        # But data_loader uses streamlit cache which is mocked/not persistent here
+        # Changed content changes the dataset version, so the next request
+        # triggers a single reload while others keep serving the old data
         return jsonify({
             'message': 'Sync completed',
             'results': results
@@ -119,190 +206,390 @@ def sync_data_route():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/data/revenue', methods=['GET'])
-@jwt_required()
-def get_revenue():
+# Additional data loaders for RevShare (restored from previous session)
+def load_revshare_data(root=DATA_PATH):
+    check_snapshot(root)
     try:
-        revenue, _, _, _, _ = load_data()
-        return jsonify(json.loads(revenue.to_json(orient='records'))), 200
+        # Parquet when exported, else CSV; dates stay strings as in the CSV.
+        # TimeEntryName (top matters chart) comes from the detail exports.
+        revshare, te_type1, te_type2, te_type3 = (
+            dates_as_text(with_detail(read_table(name, root), name, root)) for name in REVSHARE_FILES
+        )
+        return revshare, te_type1, te_type2, te_type3
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        print(f"Error loading revshare data: {e}")
+        return None, None, None, None
 
-@app.route('/api/data/billable-hours', methods=['GET'])
-@jwt_required()
-def get_billable_hours():
+def get_revshare_data_versioned():
+    """(version, `load_revshare_data()` result); failed loads are not cached."""
+    root = snapshot_dir(DATA_PATH)
+    version = data_version(REVSHARE_FILES + REVSHARE_DETAIL_FILES, root)
+    version, data = datasets.get_versioned(
+        "revshare", version, _tracked(REVSHARE_DATASETS, version, lambda: load_revshare_data(root))
+    )
+    if data[0] is None:
+        datasets.invalidate("revshare")
+    return version, data
+
+def get_revshare_data():
+    return get_revshare_data_versioned()[1]
+
+def load_summary_data(root=DATA_PATH):
+    frames = summary_frames(get_core_data, root)
+    return tuple(frames[name] for name in SUMMARY_DATASETS.values())
+
+def get_summary_data_versioned():
+    """(version, summary frames in SUMMARY_DATASETS order)."""
+    root = snapshot_dir(DATA_PATH)
+    version = data_version(CORE_FILES + list(SUMMARIES), root)
+    return datasets.get_versioned(
+        "summaries", version, _tracked(list(SUMMARY_DATASETS), version, lambda: load_summary_data(root))
+    )
+
+@app.errorhandler(SnapshotInProgress)
+def snapshot_in_progress(e):
+    # Nothing cached yet and the exporter is mid-run: ask the client to retry
+    return jsonify({'error': str(e)}), 503, {'Retry-After': '30'}
+
+def load_users():
+    with open(DATA_PATH / "users.json", 'r') as f:
+        return json.load(f)
+
+def is_admin_code(staff_code):
+    # RAW, DLB, and admin can see everything.
+    return staff_code in ['RAW', 'DLB', 'admin']
+
+def staff_column(df):
+    """Column that says which staff a row belongs to, or None."""
+    for col in ('Staff', 'StaffAbbreviation'):
+        if col in df.columns:
+            return col
+    return None
+
+# Per-staff row positions of each dataset at the version last served:
+# {dataset: (version id, StaffIndex)}; batch workers share it
+staff_indexes = {}
+staff_indexes_lock = threading.Lock()
+
+def staff_rows(dataset, vid, df, code):
+    """filter_by_staff(df, code) through a per-staff index of `df`, built
+    once per dataset version instead of comparing the column per request."""
+    if df is None:
+        return df
+    with staff_indexes_lock:
+        cached = staff_indexes.get(dataset)
+        if cached is None or cached[0] != vid or cached[1].frame is not df:
+            cached = staff_indexes[dataset] = (vid, StaffIndex(df, staff_column(df)))
+    return cached[1].rows(code)
+
+def filter_by_staff(df, code):
+    """Rows of `df` belonging to staff `code` ('Staff' or 'StaffAbbreviation')."""
+    if df is None: return df
+    col = staff_column(df)
+    if col is not None:
+        return df[df[col] == code]
+    return df # If no matching column, return as is (or empty? Safe to return as is if no sensitive data?)
+              # Ideally we should return empty if we can't verify ownership.
+              # But the CSVs likely have one of those.
+
+def records(df):
+    return json.loads(df.to_json(orient='records'))
+
+class RequestContext:
+    """Resolves the current user and dataset versions at most once per
+    request, so several views (e.g. in /api/batch) share them."""
+
+    _UNSET = object()
+
+    def __init__(self, email=None):
+        self.email = email if email is not None else get_jwt_identity()
+        self._user = self._UNSET
+        self._core = None
+        self._revshare = None
+        self._summaries = None
+
+    @property
+    def user(self):
+        if self._user is self._UNSET:
+            self._user = load_users().get(self.email)
+        return self._user
+
+    @property
+    def core(self):
+        """(version, load_data() frames)."""
+        if self._core is None:
+            self._core = get_core_data_versioned()
+        return self._core
+
+    @property
+    def revshare(self):
+        """(version, load_revshare_data() frames)."""
+        if self._revshare is None:
+            self._revshare = get_revshare_data_versioned()
+        return self._revshare
+
+    @property
+    def summaries(self):
+        """(version, summary frames)."""
+        if self._summaries is None:
+            self._summaries = get_summary_data_versioned()
+        return self._summaries
+
+# ----------------------------------------------------------------------------
+# Views: (ctx, **params) -> (body, status[, headers]). Shared by the
+# individual routes and /api/batch.
+# ----------------------------------------------------------------------------
+
+def dataset_view(ctx, dataset, since=None):
+    """Rows of one dataset. With since=<version> only the rows added and the
+    row hashes removed since that version are returned (or everything, with
+    full=true, when the server no longer has that baseline)."""
+    if dataset in CORE_DATASETS:
+        version, frames = ctx.core
+        df = frames[CORE_DATASETS.index(dataset)]
+        scope = None
+    elif dataset in SUMMARY_DATASETS:
+        version, frames = ctx.summaries
+        df = frames[list(SUMMARY_DATASETS).index(dataset)]
+        scope = None
+    elif dataset in REVSHARE_DATASETS[1:]:
+        # Time entries follow the same permissions as /api/data/revshare
+        user = ctx.user
+        if not user:
+            return {'error': 'User not found'}, 404
+        version, frames = ctx.revshare
+        df = frames[REVSHARE_DATASETS.index(dataset)]
+        if df is None:
+            return {'error': 'Could not load revshare data'}, 500
+        staff_code = user.get('staff_code')
+        # Non-admins only ever see (and get deltas of) their own rows
+        scope = None if is_admin_code(staff_code) or not staff_code else staff_code
+    else:
+        return {'error': f'Unknown dataset: {dataset}'}, 404
+
+    vid = version_id(version)
+    if scope is not None:
+        df = staff_rows(dataset, vid, df, scope)
+        # Baseline for this staff member's later ?since= requests
+        row_history.ensure(dataset, vid, df, scope)
+    if since is None:
+        body = records(df)
+    else:
+        body = row_history.payload(dataset, vid, df, since=since, scope=scope)
+        body['rows'] = records(body['rows'])
+    return body, 200, {'X-Data-Version': vid}
+
+def revshare_view(ctx):
+    """Get all revenue share related data, filtered by user permissions."""
+    user = ctx.user
+    if not user:
+        return {'error': 'User not found'}, 404
+
+    staff_code = user.get('staff_code')
+
+    version, (revshare, te1, te2, te3) = ctx.revshare
+    if revshare is None:
+        return {'error': 'Could not load revshare data'}, 500
+
+    # Permission Logic:
+    # RAW, DLB, and admin can see everything.
+    # Others can only see their own staff code.
+    is_admin = is_admin_code(staff_code)
+
+    if not is_admin and staff_code:
+        vid = version_id(version)
+        revshare, te1, te2, te3 = (
+            staff_rows(name, vid, df, staff_code)
+            for name, df in zip(REVSHARE_DATASETS, (revshare, te1, te2, te3))
+        )
+
+    return {
+        'revshare': records(revshare),
+        'te_type1': records(te1),
+        'te_type2': records(te2),
+        'te_type3': records(te3),
+        'user_role': {
+            'is_admin': is_admin,
+            'staff_code': staff_code
+        }
+    }, 200
+
+def flat_matter_notifications_view(ctx):
+    user = ctx.user
+    if not user:
+        return {'error': 'User not found'}, 404
+
+    staff_code = user.get('staff_code')
+    is_admin = is_admin_code(staff_code)
+
+    _, (_, billable_hours, _, flat_matters, _) = ctx.core
+
+    # --- Logic from test_logic.py ---
+    ESTIMATED_RATE = 250.0 
+
+    # 1. Group hours by Matter
+    matter_hours = billable_hours.groupby('MatterName')['BillableHoursAmount'].sum().reset_index()
+    matter_hours.rename(columns={'BillableHoursAmount': 'TotalHours'}, inplace=True)
+
+    # 2. Merge with Flat Matters
+    if flat_matters is None or flat_matters.empty:
+         return {'notifications': []}, 200
+
+    merged = pd.merge(flat_matters, matter_hours, on='MatterName', how='left')
+
+    # 3. Calculate Burn
+    merged['TotalHours'] = merged['TotalHours'].fillna(0)
+    merged['BurnedAmount'] = merged['TotalHours'] * ESTIMATED_RATE
+
+    # 4. Filter > 0.8
+    merged = merged[merged['LastInvoiceAmount'] > 0] 
+    merged['PercentUsed'] = merged['BurnedAmount'] / merged['LastInvoiceAmount']
+
+    at_risk = merged[merged['PercentUsed'] >= 0.8].copy()
+
+    # 5. Filter by User Permission
+    # If not admin, we want to show matters relevant to this user.
+    # Since flat_matters doesn't have a staff column, we check if the user has logged hours on it?
+    # Or if the billable_hours has entries for this staff on this matter.
+
+    if not is_admin and staff_code:
+        # Get list of matters this staff has worked on
+        staff_matters = billable_hours[billable_hours['StaffAbbreviation'] == staff_code]['MatterName'].unique()
+        at_risk = at_risk[at_risk['MatterName'].isin(staff_matters)]
+
+    # Format for JSON
+    notifications = []
+    for _, row in at_risk.iterrows():
+        notifications.append({
+            'id': str(row.get('MatterID', row['MatterName'])), # Use Name as ID fallback
+            'matter_name': row['MatterName'],
+            'percent_used': round(row['PercentUsed'] * 100, 1),
+            'burned_amount': row['BurnedAmount'],
+            'budget': row['LastInvoiceAmount']
+        })
+
+    return {'notifications': notifications}, 200
+
+def settings_view(ctx):
+    with open(DATA_PATH / "settings.json", 'r') as f:
+        return json.load(f), 200
+
+def prebills_view(ctx):
+    _, prebills, error = prebills_matrix.load()
+    if error:
+        return {'error': f'prebills.json is {error}'}, 500
+    return prebills, 200
+
+def respond(view, *args, **kwargs):
+    """Run a view for the current request and turn it into a Flask response."""
     try:
-        _, billable_hours, _, _, _ = load_data()
-        return jsonify(json.loads(billable_hours.to_json(orient='records'))), 200
+        body, status, *headers = view(RequestContext(), *args, **kwargs)
+        response = jsonify(body)
+        for name, value in (headers[0] if headers else {}).items():
+            response.headers[name] = value
+        return response, status
+    except SnapshotInProgress:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/data/matters', methods=['GET'])
+@app.route('/api/data/<dataset>', methods=['GET'])
 @jwt_required()
-def get_matters():
-    try:
-        _, _, matters, _, _ = load_data()
-        return jsonify(json.loads(matters.to_json(orient='records'))), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-# Additional data loaders for RevShare (restored from previous session)
-def load_revshare_data():
-    try:
-        revshare = pd.read_csv(DATA_PATH / "RevShareNewLogic.csv")
-        te_type1 = pd.read_csv(DATA_PATH / "vwTimeEntriesType1.csv")
-        te_type2 = pd.read_csv(DATA_PATH / "vwTimeEntriesType2.csv")
-        te_type3 = pd.read_csv(DATA_PATH / "vwTimeEntriesType3.csv")
-        return revshare, te_type1, te_type2, te_type3
-    except Exception as e:
-        print(f"Error loading revshare data: {e}")
-        return None, None, None, None
+def get_dataset(dataset):
+    return respond(dataset_view, dataset, since=request.args.get('since'))
 
 @app.route('/api/data/revshare', methods=['GET'])
 @jwt_required()
 def get_revshare():
     """Get all revenue share related data, filtered by user permissions."""
-    try:
-        current_user_email = get_jwt_identity()
-        
-        # Load user to get staff code
-        with open(DATA_PATH / "users.json", 'r') as f:
-            users = json.load(f)
-        
-        user = users.get(current_user_email)
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-            
-        staff_code = user.get('staff_code')
-        
-        revshare, te1, te2, te3 = load_revshare_data()
-        if revshare is None:
-            return jsonify({'error': 'Could not load revshare data'}), 500
-            
-        # Permission Logic:
-        # RAW, DLB, and admin can see everything.
-        # Others can only see their own staff code.
-        is_admin = staff_code in ['RAW', 'DLB', 'admin']
-        
-        if not is_admin and staff_code:
-            # Filter RevShare (matches 'Staff' column)
-            if 'Staff' in revshare.columns:
-                revshare = revshare[revshare['Staff'] == staff_code]
-            
-            # Filter Time Entries (matches 'Staff' OR 'StaffAbbreviation')
-            # Check which column exists in the time entry dataframes
-            for df in [te1, te2, te3]:
-                if df is not None:
-                    # Depending on exact CSV column name
-                    if 'Staff' in df.columns:
-                        mask = df['Staff'] == staff_code
-                        # Apply mask in place? No, need to reassign.
-                        # Since we are iterating a list, we need to assign back.
-                        pass # Logic moved below to be cleaner
-        
-        # Apply filtering clearly
-        if not is_admin and staff_code:
-            # RevShare
-            if 'Staff' in revshare.columns:
-                revshare = revshare[revshare['Staff'] == staff_code]
-            
-            # Helper to filter TE
-            def filter_te(df, code):
-                if df is None: return df
-                if 'Staff' in df.columns:
-                    return df[df['Staff'] == code]
-                elif 'StaffAbbreviation' in df.columns:
-                    return df[df['StaffAbbreviation'] == code]
-                return df # If no matching column, return as is (or empty? Safe to return as is if no sensitive data?)
-                          # Ideally we should return empty if we can't verify ownership.
-                          # But the CSVs likely have one of those.
-                
-            te1 = filter_te(te1, staff_code)
-            te2 = filter_te(te2, staff_code)
-            te3 = filter_te(te3, staff_code)
-
-        return jsonify({
-            'revshare': json.loads(revshare.to_json(orient='records')),
-            'te_type1': json.loads(te1.to_json(orient='records')),
-            'te_type2': json.loads(te2.to_json(orient='records')),
-            'te_type3': json.loads(te3.to_json(orient='records')),
-            'user_role': {
-                'is_admin': is_admin,
-                'staff_code': staff_code
-            }
-        }), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
+    return respond(revshare_view)
 
 @app.route('/api/notifications/flat-matters', methods=['GET'])
 @jwt_required()
 def get_flat_matter_notifications():
-    try:
-        current_user_email = get_jwt_identity()
-        
-        # Load user to get staff code/role
-        with open(DATA_PATH / "users.json", 'r') as f:
-            users = json.load(f)
-        
-        user = users.get(current_user_email)
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-            
-        staff_code = user.get('staff_code')
-        is_admin = staff_code in ['RAW', 'DLB', 'admin']
+    return respond(flat_matter_notifications_view)
 
-        _, billable_hours, _, flat_matters, _ = load_data()
-        
-        # --- Logic from test_logic.py ---
-        ESTIMATED_RATE = 250.0 
-        
-        # 1. Group hours by Matter
-        matter_hours = billable_hours.groupby('MatterName')['BillableHoursAmount'].sum().reset_index()
-        matter_hours.rename(columns={'BillableHoursAmount': 'TotalHours'}, inplace=True)
-        
-        # 2. Merge with Flat Matters
-        if flat_matters is None or flat_matters.empty:
-             return jsonify({'notifications': []}), 200
+# ============================================================================
+# Batch Route
+# ============================================================================
 
-        merged = pd.merge(flat_matters, matter_hours, on='MatterName', how='left')
-        
-        # 3. Calculate Burn
-        merged['TotalHours'] = merged['TotalHours'].fillna(0)
-        merged['BurnedAmount'] = merged['TotalHours'] * ESTIMATED_RATE
-        
-        # 4. Filter > 0.8
-        merged = merged[merged['LastInvoiceAmount'] > 0] 
-        merged['PercentUsed'] = merged['BurnedAmount'] / merged['LastInvoiceAmount']
-        
-        at_risk = merged[merged['PercentUsed'] >= 0.8].copy()
-        
-        # 5. Filter by User Permission
-        # If not admin, we want to show matters relevant to this user.
-        # Since flat_matters doesn't have a staff column, we check if the user has logged hours on it?
-        # Or if the billable_hours has entries for this staff on this matter.
-        
-        if not is_admin and staff_code:
-            # Get list of matters this staff has worked on
-            staff_matters = billable_hours[billable_hours['StaffAbbreviation'] == staff_code]['MatterName'].unique()
-            at_risk = at_risk[at_risk['MatterName'].isin(staff_matters)]
-            
-        # Format for JSON
-        notifications = []
-        for _, row in at_risk.iterrows():
-            notifications.append({
-                'id': str(row.get('MatterID', row['MatterName'])), # Use Name as ID fallback
-                'matter_name': row['MatterName'],
-                'percent_used': round(row['PercentUsed'] * 100, 1),
-                'burned_amount': row['BurnedAmount'],
-                'budget': row['LastInvoiceAmount']
-            })
-            
-        return jsonify({'notifications': notifications}), 200
+# op -> (view, required params, optional params)
+BATCH_OPS = {
+    'data': (dataset_view, {'dataset'}, {'since'}),
+    'revshare': (revshare_view, set(), set()),
+    'notifications': (flat_matter_notifications_view, set(), set()),
+    'settings': (settings_view, set(), set()),
+    'prebills': (prebills_view, set(), set()),
+}
+BATCH_MAX_REQUESTS = 20
+BATCH_WORKERS = 4
+
+def _run_batch_item(ctx, item):
+    op = item.get('op')
+    if op not in BATCH_OPS:
+        return {'error': f'Unknown op: {op}'}, 400
+    view, required, optional = BATCH_OPS[op]
+    missing = sorted(required - item.keys())
+    if missing:
+        return {'error': f'Missing field(s) for op {op}: {", ".join(missing)}'}, 400
+    params = {k: v for k, v in item.items() if k in required | optional}
+    try:
+        body, status, *_ = view(ctx, **params)
+        return body, status
+    except SnapshotInProgress as e:
+        # Retryable, as on the single-item routes
+        return {'error': str(e)}, 503
+    except Exception as e:
+        return {'error': str(e)}, 500
+
+@app.route('/api/batch', methods=['POST'])
+@jwt_required()
+def batch():
+    """Run several read requests in one round trip.
+
+    Body: {"requests": [{"id": "rev", "op": "data", "dataset": "revenue"},
+                        {"op": "revshare"}, {"op": "settings"}, ...]}
+    The JWT, user record and dataset versions are resolved once and shared;
+    independent sub-requests then run concurrently.
+    """
+    items = (request.get_json(silent=True) or {}).get('requests', [])
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Expected a non-empty "requests" list'}), 400
+    if len(items) > BATCH_MAX_REQUESTS:
+        return jsonify({'error': f'At most {BATCH_MAX_REQUESTS} requests per batch'}), 400
 
+    try:
+        ctx = RequestContext()
+        # Resolve shared state up front so worker threads only read it
+        ops = {item.get('op') for item in items}
+        if ops & {'data', 'revshare', 'notifications'}:
+            ctx.user
+        if 'notifications' in ops or any(item.get('dataset') in CORE_DATASETS for item in items):
+            ctx.core
+        if 'revshare' in ops or any(item.get('dataset') in REVSHARE_DATASETS for item in items):
+            ctx.revshare
+        if any(item.get('dataset') in SUMMARY_DATASETS for item in items):
+            ctx.summaries
+
+        with ThreadPoolExecutor(max_workers=min(BATCH_WORKERS, len(items))) as pool:
+            results = list(pool.map(lambda item: _run_batch_item(ctx, item), items))
+    except SnapshotInProgress:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+    return jsonify({
+        'results': [
+            {'id': item.get('id', i), 'status': status, 'body': body}
+            for i, (item, (body, status)) in enumerate(zip(items, results))
+        ],
+        'versions': {
+            'core': version_id(ctx._core[0]) if ctx._core else None,
+            'revshare': version_id(ctx._revshare[0]) if ctx._revshare else None,
+            'summaries': version_id(ctx._summaries[0]) if ctx._summaries else None,
+        },
+    }), 200
+
 # ============================================================================
 # Settings Routes
 # ============================================================================
@@ -310,108 +597,32 @@ def get_flat_matter_notifications():
 @app.route('/api/settings', methods=['GET'])
 @jwt_required()
 def get_settings():
-    try:
-        with open(DATA_PATH / "settings.json", 'r') as f:
-            settings = json.load(f)
-        return jsonify(settings), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return respond(settings_view)
 
 @app.route('/api/settings', methods=['PUT'])
 @jwt_required()
 def save_settings():
     data = request.get_json()
     try:
-        # Save to local file
-        with open(DATA_PATH / "settings.json", 'w') as f:
-            json.dump(data, f, indent=4)
-        
-        # Push to GitHub
-        import subprocess
-        try:
-            # Add the settings file
-            subprocess.run(
-                ['git', 'add', 'data/settings.json'],
-                cwd=BASE_DIR,
-                check=True,
-                capture_output=True
-            )
-            
-            # Commit the changes
-            commit_msg = f"Auto-update settings.json from React ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})"
-            subprocess.run(
-                ['git', 'commit', '-m', commit_msg],
-                cwd=BASE_DIR,
-                check=True,
-                capture_output=True
-            )
-            
-            # Push to GitHub
-            subprocess.run(
-                ['git', 'push', 'origin', 'main'],
-                cwd=BASE_DIR,
-                check=True,
-                capture_output=True
-            )
-            
-            return jsonify({'message': 'Settings saved and pushed to GitHub successfully'}), 200
-        except subprocess.CalledProcessError as e:
-            # If git operations fail, still return success since local save worked
-            return jsonify({'message': 'Settings saved locally (GitHub push failed)'}), 200
+        # Written locally now; committed and pushed in the next batch
+        settings_store.save(DATA_PATH / "settings.json", data, repo_path="data/settings.json")
+        return jsonify({'message': 'Settings saved (GitHub sync queued)'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/prebills', methods=['GET'])
 @jwt_required()
 def get_prebills():
-    try:
-        with open(DATA_PATH / "prebills.json", 'r') as f:
-            prebills = json.load(f)
-        return jsonify(prebills), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return respond(prebills_view)
 
 @app.route('/api/prebills', methods=['PUT'])
 @jwt_required()
 def save_prebills():
     data = request.get_json()
     try:
-        # Save to local file
-        with open(DATA_PATH / "prebills.json", 'w') as f:
-            json.dump(data, f, indent=4)
-        
-        # Push to GitHub
-        import subprocess
-        try:
-            # Add the prebills file
-            subprocess.run(
-                ['git', 'add', 'data/prebills.json'],
-                cwd=BASE_DIR,
-                check=True,
-                capture_output=True
-            )
-            
-            # Commit the changes
-            commit_msg = f"Auto-update prebills.json from React ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})"
-            subprocess.run(
-                ['git', 'commit', '-m', commit_msg],
-                cwd=BASE_DIR,
-                check=True,
-                capture_output=True
-            )
-            
-            # Push to GitHub
-            subprocess.run(
-                ['git', 'push', 'origin', 'main'],
-                cwd=BASE_DIR,
-                check=True,
-                capture_output=True
-            )
-            
-            return jsonify({'message': 'Prebills saved and pushed to GitHub successfully'}), 200
-        except subprocess.CalledProcessError as e:
-            # If git operations fail, still return success since local save worked
-            return jsonify({'message': 'Prebills saved locally (GitHub push failed)'}), 200
+        # Written locally now; committed and pushed in the next batch
+        settings_store.save(DATA_PATH / "prebills.json", data, repo_path="data/prebills.json")
+        return jsonify({'message': 'Prebills saved (GitHub sync queued)'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -420,6 +631,9 @@ def health():
     return jsonify({'status': 'healthy'}), 200
 
 if __name__ == '__main__':
+    # Request and dataset-load logs (metrics.py) as one JSON object per line;
+    # under gunicorn, gunicorn.conf.py sets this up
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     # Sync data on startup in production/local if needed
     try:
         print("Auto-syncing data on startup...")
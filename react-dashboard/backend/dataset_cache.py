@@ -0,0 +1,95 @@
+import threading
+
+
+class _Flight:
+    """A dataset rebuild in progress; followers wait on `done`."""
+
+    def __init__(self, version):
+        self.version = version
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class DatasetCache:
+    """Versioned dataset cache with single-flight reloads.
+
+    Only one thread parses a given (dataset, version). While it does,
+    other callers get the previously cached version if there is one
+    (`serve_stale`), otherwise they block until the rebuild finishes and
+    share its result. At most two copies of a dataset are alive at once.
+    """
+
+    def __init__(self, registry=None, serve_stale=True):
+        self._registry = registry
+        self._serve_stale = serve_stale
+        self._lock = threading.Lock()
+        self._entries = {}   # name -> (version, value)
+        self._flights = {}   # name -> _Flight
+
+    def _record(self, name, result):
+        if self._registry is not None:
+            self._registry.record_cache(name, result)
+
+    def get(self, name, version, loader):
+        """Return `loader()` for `version`, reusing cached or in-flight results."""
+        return self.get_versioned(name, version, loader)[1]
+
+    def get_versioned(self, name, version, loader):
+        """Like `get`, but returns (version, value) so callers can tell when
+        they were served the previous version during a rebuild."""
+        while True:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None and entry[0] == version:
+                    self._record(name, "hit")
+                    return entry
+
+                # One rebuild per dataset at a time. If the running one is for
+                # an older version, wait for it rather than parsing in parallel.
+                flight = self._flights.get(name)
+                if flight is None:
+                    flight = self._flights[name] = _Flight(version)
+                    break
+
+                if self._serve_stale and entry is not None:
+                    self._record(name, "stale")
+                    return entry
+
+            self._record(name, "wait")
+            flight.done.wait()
+            if flight.version == version:
+                if flight.error is not None:
+                    raise flight.error
+                return version, flight.value
+            # Finished another version; go round again for ours
+
+        self._record(name, "miss")
+        try:
+            value = self._load(name, loader)
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            flight.value = value
+            with self._lock:
+                self._entries[name] = (version, value)
+            return version, value
+        finally:
+            with self._lock:
+                self._flights.pop(name, None)
+            flight.done.set()
+
+    def _load(self, name, loader):
+        if self._registry is None:
+            return loader()
+        with self._registry.time_load(name):
+            return loader()
+
+    def invalidate(self, name=None):
+        """Drop one cached dataset (or all of them)."""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
@@ -0,0 +1,91 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def version_id(version):
+    """Short, stable id for a dataset version key (e.g. a tuple of mtimes)."""
+    return hashlib.sha1(repr(version).encode()).hexdigest()[:12]
+
+
+def row_hashes(df):
+    """One uint64 per row; identical rows get distinct hashes by occurrence."""
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy(dtype="uint64").copy()
+    occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+    dup = occurrence > 0
+    if dup.any():
+        hashes[dup] ^= pd.util.hash_array(occurrence[dup].astype("uint64"))
+    return hashes
+
+
+def _hex(hashes):
+    return [format(int(h), "016x") for h in hashes]
+
+
+class RowHistory:
+    """Row hashes of each dataset for the last `max_versions` data versions.
+
+    A `scope` (e.g. a staff code) keeps separate baselines for a subset of
+    a dataset's rows, recorded from that subset only.
+    """
+
+    def __init__(self, max_versions=5):
+        self.max_versions = max_versions
+        self._lock = threading.Lock()
+        self._versions = {}   # (dataset, scope) -> OrderedDict(version id -> hashes)
+
+    def record(self, dataset, vid, df, scope=None):
+        """Remember the row hashes of `df` as version `vid` of `dataset`."""
+        hashes = row_hashes(df)
+        with self._lock:
+            history = self._versions.setdefault((dataset, scope), OrderedDict())
+            history[vid] = hashes
+            history.move_to_end(vid)
+            while len(history) > self.max_versions:
+                history.popitem(last=False)
+        return hashes
+
+    def get(self, dataset, vid, scope=None):
+        with self._lock:
+            return self._versions.get((dataset, scope), {}).get(vid)
+
+    def ensure(self, dataset, vid, df, scope=None):
+        """Row hashes of `df` as version `vid`, recorded unless already kept."""
+        hashes = self.get(dataset, vid, scope)
+        if hashes is None or len(hashes) != len(df):
+            hashes = self.record(dataset, vid, df, scope)
+        return hashes
+
+    def payload(self, dataset, vid, df, since=None, scope=None):
+        """Delta of `df` against version `since`, or the full rows if that
+        baseline is no longer kept. Every row carries its hash in `_row`.
+
+        With a `scope`, `df` holds only that scope's rows and the delta is
+        taken against that scope's baseline, so neither the rows nor the
+        `removed` hashes mention rows outside it.
+        """
+        hashes = self.ensure(dataset, vid, df, scope)
+        base = self.get(dataset, since, scope) if since else None
+
+        if base is None:
+            mask = np.ones(len(df), dtype=bool)
+            removed = []
+        else:
+            mask = ~np.isin(hashes, base)
+            removed = _hex(np.setdiff1d(base, hashes))
+
+        rows = df[mask].copy()
+        rows["_row"] = _hex(hashes[mask])
+        # full=True: replace the local copy with `rows`; otherwise add `rows`
+        # and drop the `removed` hashes (a changed row is one of each)
+        return {
+            "dataset": dataset,
+            "version": vid,
+            "since": since,
+            "full": base is None,
+            "rows": rows,
+            "removed": removed,
+        }
@@ -0,0 +1,11 @@
+# Read by gunicorn from the working directory (see Dockerfile). Sends the
+# app's request and dataset-load logs (the "rlg" loggers, metrics.py) to
+# stderr as one JSON object per line, next to gunicorn's own logs.
+from gunicorn.glogging import CONFIG_DEFAULTS
+
+logconfig_dict = {
+    **CONFIG_DEFAULTS,
+    "formatters": {**CONFIG_DEFAULTS["formatters"], "message": {"format": "%(message)s"}},
+    "handlers": {**CONFIG_DEFAULTS["handlers"], "rlg": {"class": "logging.StreamHandler", "formatter": "message"}},
+    "loggers": {**CONFIG_DEFAULTS["loggers"], "rlg": {"handlers": ["rlg"], "level": "INFO", "propagate": False}},
+}
@@ -0,0 +1,165 @@
+import hmac
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+from flask_jwt_extended import verify_jwt_in_request
+
+logger = logging.getLogger("rlg.metrics")
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1_024, 10_240, 102_400, 512_000, 1_048_576, 4_194_304, 16_777_216, 67_108_864)
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """Thread-safe in-process store for request, payload and dataset metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}      # (method, route) -> Histogram
+        self._size = {}         # (method, route) -> Histogram
+        self._requests = {}     # (method, route, status) -> count
+        self._cache = {}        # (dataset, result) -> count
+        self._load = {}         # dataset -> Histogram
+
+    def observe_request(self, method, route, status, seconds, nbytes):
+        key = (method, route)
+        with self._lock:
+            self._latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self._size.setdefault(key, Histogram(SIZE_BUCKETS)).observe(nbytes)
+            counter = (method, route, status)
+            self._requests[counter] = self._requests.get(counter, 0) + 1
+
+    def record_cache(self, dataset, result):
+        """Count a cache lookup; result is hit, miss, stale or wait."""
+        key = (dataset, result)
+        with self._lock:
+            self._cache[key] = self._cache.get(key, 0) + 1
+
+    def observe_load(self, dataset, seconds):
+        with self._lock:
+            self._load.setdefault(dataset, Histogram(LATENCY_BUCKETS)).observe(seconds)
+        logger.info(json.dumps({
+            "event": "dataset_load",
+            "dataset": dataset,
+            "duration_ms": round(seconds * 1000, 2),
+        }))
+
+    @contextmanager
+    def time_load(self, dataset):
+        """Time a dataset parse (e.g. `load_data`) and record it."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_load(dataset, time.perf_counter() - start)
+
+    def render_prometheus(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            self._render_histograms(
+                lines, "rlg_http_request_duration_seconds",
+                "Request latency per route.", self._latency,
+                lambda k: {"method": k[0], "route": k[1]},
+            )
+            self._render_histograms(
+                lines, "rlg_http_response_size_bytes",
+                "Response body size per route.", self._size,
+                lambda k: {"method": k[0], "route": k[1]},
+            )
+            lines.append("# HELP rlg_http_requests_total Requests served per route and status.")
+            lines.append("# TYPE rlg_http_requests_total counter")
+            for (method, route, status), value in sorted(self._requests.items()):
+                lines.append(f"rlg_http_requests_total{_labels(method=method, route=route, status=status)} {value}")
+            lines.append("# HELP rlg_dataset_cache_requests_total Dataset cache lookups by result.")
+            lines.append("# TYPE rlg_dataset_cache_requests_total counter")
+            for (dataset, result), value in sorted(self._cache.items()):
+                lines.append(f"rlg_dataset_cache_requests_total{_labels(dataset=dataset, result=result)} {value}")
+            self._render_histograms(
+                lines, "rlg_dataset_load_seconds",
+                "Time spent parsing datasets from disk.", self._load,
+                lambda k: {"dataset": k},
+            )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histograms(lines, name, help_text, histograms, labels_for):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for key in sorted(histograms):
+            hist = histograms[key]
+            labels = labels_for(key)
+            for bound, count in zip(hist.buckets, hist.counts):
+                lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {count}")
+            lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {hist.count}")
+            lines.append(f"{name}_sum{_labels(**labels)} {hist.sum}")
+            lines.append(f"{name}_count{_labels(**labels)} {hist.count}")
+
+
+def init_app(app, registry, scrape_token=None):
+    """Attach timing middleware and the /api/metrics route to a Flask app.
+
+    /api/metrics needs a login JWT, or `Authorization: Bearer <scrape_token>`
+    when a scrape token is configured (for Prometheus).
+    """
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = getattr(g, "_metrics_start", None)
+        if start is None:
+            return response
+        seconds = time.perf_counter() - start
+        # Label by URL rule, not raw path, to keep cardinality bounded
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        nbytes = response.calculate_content_length() or 0
+        registry.observe_request(request.method, route, response.status_code, seconds, nbytes)
+        logger.info(json.dumps({
+            "event": "request",
+            "method": request.method,
+            "route": route,
+            "status": response.status_code,
+            "duration_ms": round(seconds * 1000, 2),
+            "bytes": nbytes,
+        }))
+        return response
+
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics():
+        given = request.headers.get("Authorization", "")
+        if not (scrape_token and hmac.compare_digest(given, f"Bearer {scrape_token}")):
+            verify_jwt_in_request()
+        return Response(registry.render_prometheus(), mimetype="text/plain; version=0.0.4")
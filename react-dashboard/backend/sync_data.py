@@ -1,7 +1,16 @@
 import os
+import sys
+import json
 import requests
 from pathlib import Path
 
+# data_files lives at the repository root
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+from data_files import (
+    CURRENT_FILE, MANIFEST_FILE, SNAPSHOTS_DIR, base_name, current_version, discard_snapshot, is_snapshot_file,
+    publish_snapshot, read_manifest, stage_snapshot,
+)
+
 # Repository details
 REPO = "dhernandez-coding/gdp-dashboard"
 BRANCH = "main"
@@ -14,42 +23,150 @@ DATA_FILES = [
     "vwTimeEntriesType1.csv",
     "vwTimeEntriesType2.csv",
     "vwTimeEntriesType3.csv",
+    "vwTimeEntriesType1Detail.csv",
+    "vwTimeEntriesType2Detail.csv",
+    "vwTimeEntriesType3Detail.csv",
+    "HoursByStaffDaily.csv",
+    "HoursByStaffWeekly.csv",
+    "HoursByStaffMonthly.csv",
+    "MattersByStaffWeekly.csv",
     "StaffGoalsSettings.csv",
     "users.json"
 ]
+# Only present once the exporter writes them (vTimeEntries.csv is no
+# longer exported); a 404 is not a failure. With a remote manifest, so is
+# a 404 for any file it does not list.
+OPTIONAL_FILES = {
+    "vTimeEntries.csv",
+    "vwTimeEntriesType1Detail.csv",
+    "vwTimeEntriesType2Detail.csv",
+    "vwTimeEntriesType3Detail.csv",
+    "HoursByStaffDaily.csv",
+    "HoursByStaffWeekly.csv",
+    "HoursByStaffMonthly.csv",
+    "MattersByStaffWeekly.csv",
+}
+
+def _write_file(path, content):
+    """Replace `path` in one step so loaders never see a partial download."""
+    with open(f"{path}.part", "wb") as f:
+        f.write(content)
+    os.replace(f"{path}.part", path)
+
+def _unchanged(data_dir, filename, remote_entry, local_entry):
+    """Same hash in both manifests and the local copy is still that file."""
+    path = data_dir / filename
+    return (
+        remote_entry is not None and local_entry is not None
+        and remote_entry.get("sha256") == local_entry.get("sha256")
+        and path.exists() and path.stat().st_size == local_entry.get("bytes")
+    )
+
+def sync_from_github(data_dir=None):
+    """Download the data files that changed since the last sync from GitHub
+    into `data_dir` (the repository's data folder by default).
 
-def sync_from_github():
-    """Download the latest data files from GitHub."""
+    The files are staged next to the current local data snapshot and
+    published as a new snapshot only once all of them have landed (see
+    data_files), so readers switch to the new set in one step and a failed
+    download leaves them on the previous one. When the remote repository
+    has snapshots, its `current` version is fetched and nothing happens if
+    it is already the local one.
+
+    The export manifest is fetched first: files whose hash matches the
+    local manifest are kept as they are, and nothing is downloaded while
+    the exporter is still writing (manifest status "in_progress").
+    """
     token = os.environ.get("GITHUB_TOKEN")
     base_url = f"https://raw.githubusercontent.com/{REPO}/{BRANCH}/data"
-    
+
     headers = {}
     if token:
         headers["Authorization"] = f"token {token}"
-    
+
     # Path to the data folder relative to this script
-    data_dir = Path(__file__).parent.parent.parent / "data"
+    data_dir = Path(data_dir) if data_dir else Path(__file__).parent.parent.parent / "data"
     data_dir.mkdir(parents=True, exist_ok=True)
-    
+
     results = []
-    
+
+    response = requests.get(f"{base_url}/{CURRENT_FILE}", headers=headers)
+    remote_version = response.text.strip() if response.status_code == 200 else None
+    if remote_version and remote_version == current_version(data_dir):
+        return [{"file": CURRENT_FILE, "status": "unchanged"}]
+    files_url = f"{base_url}/{SNAPSHOTS_DIR}/{remote_version}" if remote_version else base_url
+
+    response = requests.get(f"{files_url}/{MANIFEST_FILE}", headers=headers)
+    remote_manifest = response.json() if response.status_code == 200 else None
+    if remote_manifest and remote_manifest.get("status") == "in_progress":
+        return [{"file": MANIFEST_FILE, "status": "skipped", "error": "Export in progress"}]
+    remote_files = (remote_manifest or {}).get("files", {})
+    local_files = (read_manifest(data_dir) or {}).get("files", {})
+
+    # With a manifest, fetch whichever copies it lists for each dataset
+    # (e.g. vMatters.csv.gz instead of vMatters.csv); without one, just the
+    # plain CSV. A listed Parquet copy goes last so it is never older than
+    # the CSV (loaders read the newest copy).
+    names = []
     for filename in DATA_FILES:
-        url = f"{base_url}/{filename}"
+        if not filename.endswith(".csv"):
+            names.append(filename)
+            continue
+        parquet_name = base_name(filename) + ".parquet"
+        listed = sorted(
+            name for name in remote_files
+            if base_name(name) == base_name(filename) and name != parquet_name
+        )
+        names.extend(listed or [filename])
+        if parquet_name in remote_files:
+            names.append(parquet_name)
+
+    staged = stage_snapshot(data_dir)
+    synced_files = dict(remote_files)
+    complete = True
+    for filename in names:
+        # Users and other non-dataset files live outside the snapshots
+        target_dir, url = (staged, files_url) if is_snapshot_file(filename) else (data_dir, base_url)
+        if target_dir == staged and _unchanged(staged, filename, remote_files.get(filename), local_files.get(filename)):
+            results.append({"file": filename, "status": "unchanged"})
+            continue
+
         print(f"Downloading {filename}...")
-        
-        response = requests.get(url, headers=headers)
-        
+        response = requests.get(f"{url}/{filename}", headers=headers)
+
         if response.status_code == 200:
-            with open(data_dir / filename, "wb") as f:
-                f.write(response.content)
+            _write_file(target_dir / filename, response.content)
             results.append({"file": filename, "status": "success"})
+        elif response.status_code == 404 and (
+            filename in OPTIONAL_FILES or filename.endswith(".parquet")
+            or (remote_manifest is not None and filename not in remote_files)
+        ):
+            results.append({"file": filename, "status": "skipped"})
+            synced_files.pop(filename, None)
+            if (staged / filename).exists():
+                (staged / filename).unlink()
         else:
             results.append({
-                "file": filename, 
-                "status": "failed", 
+                "file": filename,
+                "status": "failed",
                 "error": f"HTTP {response.status_code}"
             })
-            
+            complete = complete and target_dir != staged
+
+    if not complete:
+        # Keep readers on the last complete set
+        discard_snapshot(staged)
+        return results
+
+    # Copies the remote no longer has (e.g. after a change of compression),
+    # and the local manifest when the remote has none to replace it
+    for path in staged.iterdir():
+        if path.name not in names and (path.name != MANIFEST_FILE or remote_manifest is None):
+            path.unlink()
+    if remote_manifest is not None:
+        _write_file(staged / MANIFEST_FILE, json.dumps({**remote_manifest, "files": synced_files}, indent=4).encode())
+    publish_snapshot(staged, data_dir)
+
     return results
 
 if __name__ == "__main__":
@@ -0,0 +1,149 @@
+import contextlib
+from unittest import mock
+
+import pandas as pd
+
+import app as backend
+from dataset_cache import DatasetCache
+from deltas import RowHistory, row_hashes
+
+USERS = {
+    "admin@example.com": {"staff_code": "RAW"},
+    "ab@example.com": {"staff_code": "AB"},
+}
+
+
+def time_entries(hours):
+    return pd.DataFrame({"Staff": ["AB", "CD", "AB"], "Hours": hours})
+
+
+@contextlib.contextmanager
+def serving(data):
+    """Test client over fresh caches, serving data["frames"] (revshare
+    frames) as version data["version"]."""
+    data.setdefault("calls", 0)
+
+    def revshare():
+        data["calls"] += 1
+        version, frames = data["version"], data["frames"]
+        return backend.datasets.get_versioned(
+            "revshare", version, backend._tracked(backend.REVSHARE_DATASETS, version, lambda: frames)
+        )
+
+    with mock.patch.object(backend, "datasets", DatasetCache()), \
+            mock.patch.object(backend, "row_history", RowHistory()), \
+            mock.patch.object(backend, "staff_indexes", {}), \
+            mock.patch.object(backend, "load_users", lambda: USERS), \
+            mock.patch.object(backend, "get_revshare_data_versioned", revshare):
+        yield backend.app.test_client()
+
+
+def auth(email):
+    with backend.app.app_context():
+        return {"Authorization": f"Bearer {backend.create_access_token(identity=email)}"}
+
+
+def test_dataset_since_round_trip():
+    old = time_entries([1.0, 2.0, 3.0])
+    data = {"version": ("v1",), "frames": (pd.DataFrame({"Revenue": [1]}), old, None, None)}
+    with serving(data) as client:
+        admin, ab = auth("admin@example.com"), auth("ab@example.com")
+
+        response = client.get("/api/data/te-type1", headers=admin)
+        assert response.status_code == 200 and len(response.get_json()) == 3
+        v1 = response.headers["X-Data-Version"]
+        response = client.get("/api/data/te-type1", headers=ab)
+        assert [row["Hours"] for row in response.get_json()] == [1.0, 3.0]
+        assert response.headers["X-Data-Version"] == v1
+
+        # Both the AB row and the CD row change
+        new = time_entries([1.0, 2.5, 3.5])
+        data.update(version=("v2",), frames=(data["frames"][0], new, None, None))
+
+        body = client.get(f"/api/data/te-type1?since={v1}", headers=admin).get_json()
+        assert not body["full"] and body["since"] == v1
+        assert sorted(row["Hours"] for row in body["rows"]) == [2.5, 3.5]
+        assert len(body["removed"]) == 2
+
+        # A non-admin's delta only mentions their own rows
+        body = client.get(f"/api/data/te-type1?since={v1}", headers=ab).get_json()
+        assert not body["full"]
+        assert [row["Hours"] for row in body["rows"]] == [3.5]
+        assert body["removed"] == [format(int(row_hashes(old.iloc[[2]])[0]), "016x")]
+        assert body["rows"][0]["_row"] == format(int(row_hashes(new.iloc[[2]])[0]), "016x")
+
+        # Unknown baseline: the full (filtered) rows instead
+        body = client.get("/api/data/te-type1?since=unknown", headers=ab).get_json()
+        assert body["full"] and body["removed"] == []
+        assert [row["Hours"] for row in body["rows"]] == [1.0, 3.5]
+
+
+def revshare_frames():
+    return (pd.DataFrame({"Staff": ["AB", "CD"], "Revenue": [10, 20]}),
+            time_entries([1.0, 2.0, 3.0]), time_entries([4.0, 5.0, 6.0]), time_entries([7.0, 8.0, 9.0]))
+
+
+def test_batch_items_keep_their_own_status():
+    with serving({"version": ("v1",), "frames": revshare_frames()}) as client:
+        response = client.post("/api/batch", headers=auth("ab@example.com"), json={"requests": [
+            {"id": "te", "op": "data", "dataset": "te-type1", "ignored": "x"},
+            {"op": "drop-tables"},
+            {"op": "data", "dataset": "no-such-dataset"},
+            {"id": "rev", "op": "revshare"},
+        ]})
+        assert response.status_code == 200
+        results = response.get_json()["results"]
+        assert [(r["id"], r["status"]) for r in results] == [("te", 200), (1, 400), (2, 404), ("rev", 200)]
+        assert [row["Hours"] for row in results[0]["body"]] == [1.0, 3.0]
+        assert results[1]["body"] == {"error": "Unknown op: drop-tables"}
+        assert [row["Revenue"] for row in results[3]["body"]["revshare"]] == [10]
+
+
+def test_batch_item_errors():
+    def exporting(ctx):
+        raise backend.SnapshotInProgress("Data export in progress; try again shortly")
+
+    with serving({"version": ("v1",), "frames": revshare_frames()}) as client, \
+            mock.patch.dict(backend.BATCH_OPS, {"prebills": (exporting, set(), set())}):
+        response = client.post("/api/batch", headers=auth("ab@example.com"), json={"requests": [
+            {"op": "data"},
+            {"op": "prebills"},
+            {"op": "data", "dataset": "te-type1"},
+        ]})
+        results = response.get_json()["results"]
+        assert [r["status"] for r in results] == [400, 503, 200]
+        assert results[0]["body"] == {"error": "Missing field(s) for op data: dataset"}
+        assert "in progress" in results[1]["body"]["error"]
+
+
+def test_batch_limits():
+    with serving({"version": ("v1",), "frames": revshare_frames()}) as client:
+        headers = auth("admin@example.com")
+        too_many = [{"op": "prebills"}] * (backend.BATCH_MAX_REQUESTS + 1)
+        response = client.post("/api/batch", headers=headers, json={"requests": too_many})
+        assert response.status_code == 400 and "At most" in response.get_json()["error"]
+        assert client.post("/api/batch", headers=headers, json={"requests": []}).status_code == 400
+        assert client.post("/api/batch", json={"requests": [{"op": "prebills"}]}).status_code == 401
+
+
+def test_batch_shares_one_request_context():
+    data = {"version": ("v1",), "frames": revshare_frames()}
+    with serving(data) as client:
+        items = [{"op": "data", "dataset": name} for name in backend.REVSHARE_DATASETS[1:]] + [{"op": "revshare"}]
+        response = client.post("/api/batch", headers=auth("admin@example.com"), json={"requests": items})
+        body = response.get_json()
+        # The revshare frames and their version are resolved once for all four items
+        assert data["calls"] == 1
+        assert [r["status"] for r in body["results"]] == [200] * 4
+        assert body["versions"]["revshare"] == backend.version_id(("v1",))
+        assert body["versions"]["core"] is None
+        assert body["results"][0]["body"] == body["results"][3]["body"]["te_type1"]
+
+
+if __name__ == "__main__":
+    test_dataset_since_round_trip()
+    test_batch_items_keep_their_own_status()
+    test_batch_item_errors()
+    test_batch_limits()
+    test_batch_shares_one_request_context()
+    print("app OK")
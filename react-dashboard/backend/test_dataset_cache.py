@@ -0,0 +1,99 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dataset_cache import DatasetCache
+from metrics import MetricsRegistry
+
+THREADS = 8
+
+
+def gated_loader(value, calls, release):
+    """Loader that counts its calls and blocks until `release` is set."""
+    def load():
+        calls.append(value)
+        release.wait(5)
+        return value
+    return load
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_concurrent_getters_load_once():
+    cache, calls, release = DatasetCache(), [], threading.Event()
+    loader = gated_loader("v1 data", calls, release)
+    with ThreadPoolExecutor(THREADS) as pool:
+        futures = [pool.submit(cache.get_versioned, "core", "v1", loader) for _ in range(THREADS)]
+        wait_for(lambda: calls)
+        time.sleep(0.05)
+        release.set()
+        results = [future.result(5) for future in futures]
+    assert calls == ["v1 data"]
+    assert results == [("v1", "v1 data")] * THREADS
+
+
+def test_stale_served_during_rebuild():
+    registry = MetricsRegistry()
+    cache, calls, release = DatasetCache(registry), [], threading.Event()
+    cache.get("core", "v1", lambda: "v1 data")
+
+    with ThreadPoolExecutor(1) as pool:
+        leader = pool.submit(cache.get_versioned, "core", "v2", gated_loader("v2 data", calls, release))
+        wait_for(lambda: calls)
+        # Rebuild in flight: everyone else keeps the previous version
+        for _ in range(3):
+            assert cache.get_versioned("core", "v2", lambda: "unused") == ("v1", "v1 data")
+        release.set()
+        assert leader.result(5) == ("v2", "v2 data")
+    assert cache.get_versioned("core", "v2", lambda: "unused") == ("v2", "v2 data")
+    assert calls == ["v2 data"]
+    assert 'rlg_dataset_cache_requests_total{dataset="core",result="stale"} 3' in registry.render_prometheus()
+
+
+def test_waiters_for_another_version_go_round_again():
+    cache, calls, release = DatasetCache(serve_stale=False), [], threading.Event()
+    with ThreadPoolExecutor(2) as pool:
+        older = pool.submit(cache.get_versioned, "core", "v1", gated_loader("v1 data", calls, release))
+        wait_for(lambda: calls)
+        newer = pool.submit(cache.get_versioned, "core", "v2", lambda: calls.append("v2 data") or "v2 data")
+        time.sleep(0.05)
+        # v2 waits for the v1 rebuild rather than parsing in parallel
+        assert calls == ["v1 data"]
+        release.set()
+        assert older.result(5) == ("v1", "v1 data")
+        assert newer.result(5) == ("v2", "v2 data")
+    assert calls == ["v1 data", "v2 data"]
+
+
+def test_loader_error_reaches_every_waiter():
+    cache, calls, release = DatasetCache(), [], threading.Event()
+
+    def failing():
+        calls.append("boom")
+        release.wait(5)
+        raise OSError("snapshot unreadable")
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        futures = [pool.submit(cache.get_versioned, "core", "v1", failing) for _ in range(THREADS)]
+        wait_for(lambda: calls)
+        time.sleep(0.05)
+        release.set()
+        errors = [future.exception(5) for future in futures]
+    assert calls == ["boom"]
+    assert all(isinstance(error, OSError) for error in errors)
+
+    # Nothing cached and no flight left behind: the next call loads again
+    assert cache.get_versioned("core", "v1", lambda: "v1 data") == ("v1", "v1 data")
+
+
+if __name__ == "__main__":
+    test_concurrent_getters_load_once()
+    test_stale_served_during_rebuild()
+    test_waiters_for_another_version_go_round_again()
+    test_loader_error_reaches_every_waiter()
+    print("dataset cache OK")
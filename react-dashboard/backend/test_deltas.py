@@ -0,0 +1,48 @@
+import pandas as pd
+
+from deltas import RowHistory, row_hashes
+
+
+def frame(hours):
+    return pd.DataFrame({"Staff": ["AB", "CD", "AB"], "Hours": hours})
+
+
+def test_payload_round_trip():
+    history = RowHistory(max_versions=2)
+    old, new = frame([1.0, 2.0, 3.0]), frame([1.5, 2.0, 3.0])
+    history.record("te", "v1", old)
+
+    full = history.payload("te", "v1", old)
+    assert full["full"] and full["removed"] == [] and len(full["rows"]) == 3
+    assert full["rows"]["_row"].nunique() == 3
+
+    delta = history.payload("te", "v2", new, since="v1")
+    assert not delta["full"]
+    assert delta["rows"]["Hours"].tolist() == [1.5]
+    assert delta["removed"] == [format(int(row_hashes(old.iloc[[0]])[0]), "016x")]
+
+    # Baselines the history no longer keeps fall back to the full rows
+    assert history.payload("te", "v2", new, since="v0")["full"]
+    history.record("te", "v3", new)
+    assert history.get("te", "v1") is None
+    assert history.payload("te", "v3", new, since="v1")["full"]
+
+
+def test_scoped_baselines():
+    history = RowHistory()
+    old, new = frame([1.0, 2.0, 3.0]), frame([1.0, 2.5, 3.5])
+    history.record("te", "v1", old)
+    history.ensure("te", "v1", old[old["Staff"] == "AB"], scope="AB")
+
+    # Only the AB rows are compared, so the changed CD row is not mentioned
+    delta = history.payload("te", "v2", new[new["Staff"] == "AB"], since="v1", scope="AB")
+    assert delta["rows"]["Hours"].tolist() == [3.5]
+    assert delta["removed"] == [format(int(row_hashes(old.iloc[[2]])[0]), "016x")]
+    # Scopes never see each other's baselines
+    assert history.payload("te", "v2", new[new["Staff"] == "CD"], since="v1", scope="CD")["full"]
+
+
+if __name__ == "__main__":
+    test_payload_round_trip()
+    test_scoped_baselines()
+    print("deltas OK")
@@ -0,0 +1,66 @@
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+import metrics
+from metrics import Histogram, MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = Histogram((0.1, 1.0, 10.0))
+    for value in (0.05, 0.1, 0.5, 2.0, 50.0):
+        hist.observe(value)
+    # Upper bounds are inclusive; 50.0 only counts towards +Inf
+    assert hist.counts == [2, 3, 4]
+    assert hist.count == 5 and hist.sum == 52.65
+
+
+def test_render_prometheus():
+    registry = MetricsRegistry()
+    registry.observe_request("GET", "/api/data/<dataset>", 200, 0.02, 2_000)
+    registry.observe_request("GET", "/api/data/<dataset>", 200, 0.3, 500)
+    registry.observe_request("GET", "/api/data/<dataset>", 404, 0.001, 20)
+    registry.record_cache("core", "hit")
+    registry.record_cache("core", "hit")
+    registry.observe_load('we"ird', 1.5)
+    lines = registry.render_prometheus().splitlines()
+
+    route = 'method="GET",route="/api/data/<dataset>"'
+    assert "# TYPE rlg_http_request_duration_seconds histogram" in lines
+    assert f'rlg_http_request_duration_seconds_bucket{{{route},le="0.005"}} 1' in lines
+    assert f'rlg_http_request_duration_seconds_bucket{{{route},le="0.025"}} 2' in lines
+    assert f'rlg_http_request_duration_seconds_bucket{{{route},le="0.25"}} 2' in lines
+    assert f'rlg_http_request_duration_seconds_bucket{{{route},le="0.5"}} 3' in lines
+    assert f'rlg_http_request_duration_seconds_bucket{{{route},le="+Inf"}} 3' in lines
+    assert f"rlg_http_request_duration_seconds_count{{{route}}} 3" in lines
+    assert f'rlg_http_response_size_bytes_bucket{{{route},le="1024"}} 2' in lines
+    assert f'rlg_http_response_size_bytes_bucket{{{route},le="10240"}} 3' in lines
+    assert f"rlg_http_response_size_bytes_sum{{{route}}} 2520.0" in lines
+    assert f'rlg_http_requests_total{{{route},status="200"}} 2' in lines
+    assert f'rlg_http_requests_total{{{route},status="404"}} 1' in lines
+    assert 'rlg_dataset_cache_requests_total{dataset="core",result="hit"} 2' in lines
+    assert 'rlg_dataset_load_seconds_bucket{dataset="we\\"ird",le="1.0"} 0' in lines
+    assert 'rlg_dataset_load_seconds_bucket{dataset="we\\"ird",le="2.5"} 1' in lines
+
+
+def test_metrics_route_requires_auth():
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "test-secret-key-of-at-least-32-bytes"
+    metrics.init_app(app, MetricsRegistry(), scrape_token="scrape-me")
+    JWTManager(app)
+    client = app.test_client()
+    with app.app_context():
+        token = create_access_token(identity="admin@example.com")
+
+    assert client.get("/api/metrics").status_code == 401
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer wrong"}).status_code in (401, 422)
+    for bearer in (token, "scrape-me"):
+        response = client.get("/api/metrics", headers={"Authorization": f"Bearer {bearer}"})
+        assert response.status_code == 200
+        assert "# TYPE rlg_http_requests_total counter" in response.get_data(as_text=True)
+
+
+if __name__ == "__main__":
+    test_histogram_buckets_are_cumulative()
+    test_render_prometheus()
+    test_metrics_route_requires_auth()
+    print("metrics OK")
@@ -0,0 +1,109 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import sync_data
+from data_files import current_version, snapshot_dir
+
+BASE_URL = f"https://raw.githubusercontent.com/{sync_data.REPO}/{sync_data.BRANCH}/data"
+
+
+class Response:
+    def __init__(self, status_code, content=b""):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode()
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def remote(files, statuses=None):
+    """Stand-in for requests.get serving `files` ({name: bytes}) from the
+    flat remote data folder; `statuses` overrides the reply per name."""
+    requested = []
+
+    def get(url, headers=None):
+        assert url.startswith(BASE_URL + "/")
+        name = url[len(BASE_URL) + 1:]
+        requested.append(name)
+        if name in (statuses or {}):
+            return Response(statuses[name])
+        return Response(200, files[name]) if name in files else Response(404)
+
+    return get, requested
+
+
+def remote_files():
+    """Every file the remote has today: no vTimeEntries.csv, no summaries."""
+    files = {
+        name: f"{name}\n1\n".encode() for name in sync_data.DATA_FILES
+        if name not in sync_data.OPTIONAL_FILES and name != "users.json"
+    }
+    files["users.json"] = b"{}"
+    return files
+
+
+def test_sync_publishes_without_optional_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        get, requested = remote(remote_files())
+        with mock.patch.object(sync_data.requests, "get", get):
+            results = sync_data.sync_from_github(tmp)
+
+        status = {r["file"]: r["status"] for r in results}
+        assert status["vTimeEntries.csv"] == "skipped"
+        assert status["vMatters.csv"] == "success"
+        assert "failed" not in status.values()
+        assert current_version(tmp) is not None
+        assert (snapshot_dir(tmp) / "vMatters.csv").read_bytes() == b"vMatters.csv\n1\n"
+        assert (Path(tmp) / "users.json").read_bytes() == b"{}"
+        assert "current" in requested and "manifest.json" in requested
+        # No manifest to list Parquet copies: none are probed
+        assert not [name for name in requested if name.endswith(".parquet")]
+
+
+def test_failed_download_keeps_previous_snapshot():
+    with tempfile.TemporaryDirectory() as tmp:
+        get, _ = remote(remote_files())
+        with mock.patch.object(sync_data.requests, "get", get):
+            sync_data.sync_from_github(tmp)
+        before = current_version(tmp)
+
+        files = remote_files()
+        files["vMatters.csv"] = b"vMatters.csv\n2\n"
+        get, _ = remote(files, statuses={"vwFlatMatters.csv": 500})
+        with mock.patch.object(sync_data.requests, "get", get):
+            results = sync_data.sync_from_github(tmp)
+
+        assert {"file": "vwFlatMatters.csv", "status": "failed", "error": "HTTP 500"} in results
+        assert current_version(tmp) == before
+        assert (snapshot_dir(tmp) / "vMatters.csv").read_bytes() == b"vMatters.csv\n1\n"
+
+
+def test_manifest_lists_the_required_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        files = remote_files()
+        del files["StaffGoalsSettings.csv"]
+        files["vMatters.parquet"] = b"PAR1"
+        listed = {name: {"sha256": name, "bytes": len(body)} for name, body in files.items() if name != "users.json"}
+        files["manifest.json"] = json.dumps({"status": "complete", "files": listed}).encode()
+        get, requested = remote(files)
+        with mock.patch.object(sync_data.requests, "get", get):
+            results = sync_data.sync_from_github(tmp)
+
+        # Only the Parquet copy the manifest lists is fetched
+        assert [name for name in requested if name.endswith(".parquet")] == ["vMatters.parquet"]
+        assert requested.index("vMatters.parquet") > requested.index("vMatters.csv")
+        # Not in the manifest and not on the remote: skipped, not failed
+        assert {"file": "StaffGoalsSettings.csv", "status": "skipped"} in results
+        assert current_version(tmp) is not None
+        manifest = json.loads((snapshot_dir(tmp) / "manifest.json").read_text())
+        assert set(manifest["files"]) == set(listed)
+
+
+if __name__ == "__main__":
+    test_sync_publishes_without_optional_files()
+    test_failed_download_keeps_previous_snapshot()
+    test_manifest_lists_the_required_files()
+    print("sync OK")
@@ -64,6 +64,19 @@ export const getMatters = async () => {
     return response.data;
 };
 
+// Incremental fetch: pass the `version` returned by the previous call.
+// Rows carry their hash in `_row`; merge with applyDatasetDelta.
+export const getDatasetSince = async (dataset, since = '') => {
+    const response = await api.get(`/data/${dataset}`, { params: { since } });
+    return response.data;
+};
+
+export const applyDatasetDelta = (rows, delta) => {
+    if (delta.full) return delta.rows;
+    const removed = new Set(delta.removed);
+    return rows.filter((row) => !removed.has(row._row)).concat(delta.rows);
+};
+
 export const getRevShareData = async () => {
     const response = await api.get('/data/revshare');
     return response.data;
@@ -95,6 +108,14 @@ export const getFlatMatterNotifications = async () => {
     return response.data;
 };
 
+// Several reads in one round trip, e.g.
+// getBatch([{ id: 'revenue', op: 'data', dataset: 'revenue' }, { op: 'settings' }])
+// Returns { results: [{ id, status, body }], versions }.
+export const getBatch = async (requests) => {
+    const response = await api.post('/batch', { requests });
+    return response.data;
+};
+
 export const syncData = async () => {
     const response = await api.post('/data/sync');
     return response.data;
@@ -22,9 +22,10 @@ import datetime
 import numpy as np
 import json
 import pytz
-from data_loader import load_data
+from data_loader import LOCAL_TZ, dataset_metadata
+from data_files import SnapshotInProgress
 
-local_tz = pytz.timezone("America/Chicago")
+local_tz = pytz.timezone(LOCAL_TZ)
 
 
 # ----------------------------------------------------------------------------
@@ -73,8 +74,13 @@ else:
 
 # ----------------------------------------------------------------------------
 
-# ✅ Load Data
-revenue, billable_hours, matters, flat_matters, mtime_key = load_data()
+# ✅ Load Data (not while an export is still rewriting the files)
+#    The page only reads the cached metadata; the frames stay in the loader
+try:
+    metadata = dataset_metadata()
+except SnapshotInProgress:
+    st.info("A data export is in progress. Please refresh in a minute.")
+    st.stop()
 
 # ----------------------------------------------------------------------------
 # ✅ HEADER WITH COMPANY LOGO
@@ -99,17 +105,7 @@ allowed_tabs = st.session_state.get("allowed_tabs", [])
 
 # --- Show last data update timestamp ---
 try:
-    last_update = None
-    if "mtime_key" in locals() and mtime_key:
-        # If mtime_key is a tuple (multiple file modification times)
-        if isinstance(mtime_key, (tuple, list)):
-            mtime_key = max(mtime_key)  # use the most recent one
-
-        # Convert UNIX timestamp or datetime
-        if isinstance(mtime_key, (int, float)):
-            last_update = datetime.datetime.fromtimestamp(mtime_key, tz=local_tz)
-        else:
-            last_update = pd.to_datetime(mtime_key, errors="coerce")
+    last_update = metadata["last_update"]
 
     if last_update is not None and pd.notna(last_update):
         formatted_time = last_update.strftime("%b %d, %Y %I:%M %p")
@@ -152,7 +148,7 @@ if st.session_state.get("reload_triggered"):
 
 # Define all available tabs with their display names
 tab_options = {
-    "RLGDashboard": ("RLG Dashboard", lambda: RLGDashboard.run_rlg_dashboard(start_date, end_date, show_goals)),
+    "RLGDashboard": ("RLG Dashboard", lambda: RLGDashboard.run_rlg_dashboard(start_date, end_date)),
     "RevShare": ("Revenue Share", lambda: RevShare.run_revshare(start_date, end_date)),
     "Settings": ("Settings", lambda: Settings.run_settings()),
 }
@@ -165,36 +161,10 @@ if not visible_tabs:
     st.warning("⚠️ You don’t have access to any dashboards.")
     st.stop()
 
-def ensure_tz(df, col):
-    if col in df.columns:
-        df[col] = pd.to_datetime(df[col], errors="coerce")
-
-        # ✅ Remove any implicit UTC meaning — treat as local timestamps
-        df[col] = df[col].dt.tz_localize(None)
-
-        # ✅ Now tag as America/Chicago (no shifting)
-        df[col] = df[col].dt.tz_localize("America/Chicago")
-
-        # ✅ Don't floor here — keep actual times (important!)
-        # df[col] = df[col].dt.floor("D")   
-
-
-# ✅ Localize all relevant columns
-ensure_tz(revenue, "RevShareDate")
-ensure_tz(billable_hours, "BillableHoursDate")
-ensure_tz(matters, "MatterCreationDate")
-
-# ✅ Compute min/max
-min_date = min(
-    revenue["RevShareDate"].min(),
-    billable_hours["BillableHoursDate"].min(),
-    matters["MatterCreationDate"].min(),
-)
-max_date = max(
-    revenue["RevShareDate"].max(),
-    billable_hours["BillableHoursDate"].max(),
-    matters["MatterCreationDate"].max(),
-)
+# ✅ Compute min/max (from the metadata: tagged America/Chicago once per
+#    data version in the loader, not scanned and localized on every rerun)
+min_date = min(earliest for earliest, _ in metadata["dates"].values())
+max_date = max(latest for _, latest in metadata["dates"].values())
 
 # ✅ Adjust for inclusivity and timezone
 max_date = max_date.tz_convert(local_tz) + pd.Timedelta(days=1)
@@ -217,8 +187,6 @@ date_range = st.sidebar.date_input(
 )
 
 
-show_goals = st.sidebar.checkbox("Show Goal Lines", value=True)
-
 start_date = pd.Timestamp(date_range[0])
 end_date = pd.Timestamp(date_range[1])
 
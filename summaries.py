@@ -0,0 +1,118 @@
+"""Pre-aggregated summaries of the raw exports.
+
+Every summary is a sum or a count per (period, staff), so partial results
+from separate row chunks combine exactly. The exporter folds them over the
+chunks it streams and writes them next to the raw files; loaders compute
+the same frames from the raw rows when no up-to-date summary file exists.
+"""
+import pandas as pd
+
+ORIG_STAFF_COLUMNS = ["orig_staff1", "orig_staff2", "orig_staff3"]
+
+
+# Time buckets, finest first, with their average length in days
+BUCKET_DAYS = {"Date": 1, "Week": 7, "Month": 30.44, "Quarter": 91.31}
+
+
+def period_start(dates, period):
+    """Day, Monday of the week, or first of the month or quarter for each date."""
+    dates = pd.to_datetime(dates, errors="coerce").dt.normalize()
+    if period == "Week":
+        return dates - pd.to_timedelta(dates.dt.dayofweek, unit="D")
+    if period in ("Month", "Quarter"):
+        return dates.dt.to_period(period[0]).dt.to_timestamp()
+    return dates
+
+
+def choose_bucket(start, end, budget, finest="Date"):
+    """Finest bucket in BUCKET_DAYS, from `finest` up, that splits the days
+    start..end into at most `budget` points ("Quarter" past that), so a
+    series over any range stays about the same size."""
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+    buckets = list(BUCKET_DAYS)
+    for bucket in buckets[buckets.index(finest):]:
+        if days / BUCKET_DAYS[bucket] <= budget:
+            return bucket
+    return buckets[-1]
+
+
+def hours_by_staff(df, period):
+    """BillableHoursAmount per (period start, Staff) of vBillableHoursStaff rows."""
+    frame = pd.DataFrame({
+        period: period_start(df["BillableHoursDate"], period),
+        "Staff": df["StaffAbbreviation"],
+        "BillableHoursAmount": pd.to_numeric(df["BillableHoursAmount"], errors="coerce"),
+    })
+    return frame.groupby([period, "Staff"], as_index=False)["BillableHoursAmount"].sum()
+
+
+def matters_by_staff(df, period="Week"):
+    """New matters per (period start, originating Staff) of vMatters rows; a
+    matter counts once for each of its originating staff."""
+    frame = df[ORIG_STAFF_COLUMNS].copy()
+    frame[period] = period_start(df["MatterCreationDate"], period)
+    staff = frame.melt(id_vars=[period], value_vars=ORIG_STAFF_COLUMNS, value_name="Staff")
+    staff = staff[staff["Staff"].notna() & (staff["Staff"] != "")]
+    return staff.groupby([period, "Staff"]).size().rename("NewMatters").reset_index()
+
+
+def matter_origination(df):
+    """One row per originating staff of each vMatters row: MatterID,
+    MatterCreationDate, Week, Staff and Role (the orig_staff column)."""
+    frame = df[["MatterID"] + ORIG_STAFF_COLUMNS].copy()
+    frame["MatterCreationDate"] = pd.to_datetime(df["MatterCreationDate"], errors="coerce")
+    frame["Week"] = period_start(df["MatterCreationDate"], "Week")
+    staff = frame.melt(
+        id_vars=["MatterID", "MatterCreationDate", "Week"], value_vars=ORIG_STAFF_COLUMNS,
+        var_name="Role", value_name="Staff",
+    )
+    return staff[staff["Staff"].notna() & (staff["Staff"] != "")].reset_index(drop=True)
+
+
+# Summary name -> (source table, function of a chunk of source rows)
+SUMMARIES = {
+    "HoursByStaffDaily": ("vBillableHoursStaff", lambda df: hours_by_staff(df, "Date")),
+    "HoursByStaffWeekly": ("vBillableHoursStaff", lambda df: hours_by_staff(df, "Week")),
+    "HoursByStaffMonthly": ("vBillableHoursStaff", lambda df: hours_by_staff(df, "Month")),
+    "MattersByStaffWeekly": ("vMatters", lambda df: matters_by_staff(df, "Week")),
+}
+
+
+def summaries_for(source):
+    """Names of the summaries built from `source`."""
+    return [name for name, (table, _) in SUMMARIES.items() if table == source]
+
+
+def combine(parts):
+    """Merge partial summaries: sum the last column per remaining columns."""
+    frame = pd.concat(parts, ignore_index=True)
+    keys, value = list(frame.columns[:-1]), frame.columns[-1]
+    return frame.groupby(keys, as_index=False)[value].sum().sort_values(keys, ignore_index=True)
+
+
+class SummaryBuilder:
+    """Folds chunks of `source` rows into its summaries."""
+
+    # Partials kept per summary before they are combined into one
+    COMPACT_EVERY = 50
+
+    def __init__(self, source):
+        self.names = summaries_for(source)
+        self._parts = {name: [] for name in self.names}
+
+    def add(self, chunk):
+        for name in self.names:
+            parts = self._parts[name]
+            parts.append(SUMMARIES[name][1](chunk))
+            if len(parts) >= self.COMPACT_EVERY:
+                self._parts[name] = [combine(parts)]
+
+    def results(self):
+        return {name: combine(parts) for name, parts in self._parts.items()}
+
+
+def summarize(source, df):
+    """All summaries of `source` computed from its rows in one frame."""
+    builder = SummaryBuilder(source)
+    builder.add(df)
+    return builder.results()
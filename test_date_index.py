@@ -0,0 +1,45 @@
+import pandas as pd
+
+from date_index import DateIndex, StaffIndex
+
+
+def sample():
+    return pd.DataFrame({
+        "Date": pd.to_datetime(["2026-03-05", "2026-01-10", None, "2026-02-01", "2026-03-31", "2026-01-10"]),
+        "Staff": ["AB", "CD", "AB", "AB", "CD", "AB"],
+        "Hours": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    })
+
+
+def masked(df, start, end, staff=None):
+    rows = df[(df["Date"] >= start) & (df["Date"] <= end)]
+    if staff is not None:
+        rows = rows[rows["Staff"].isin([staff] if isinstance(staff, str) else staff)]
+    return rows.sort_values("Date", kind="stable").reset_index(drop=True)
+
+
+def test_between_matches_mask():
+    df = sample()
+    index = DateIndex(df, "Date", "Staff")
+    for start, end in [("2026-01-10", "2026-03-05"), ("2026-01-11", "2026-03-30"), ("2026-04-01", "2026-05-01")]:
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        for staff in [None, "AB", "CD", "ZZ", ["AB", "CD"], []]:
+            got = index.between(start, end, staff).reset_index(drop=True)
+            pd.testing.assert_frame_equal(got, masked(df, start, end, staff), check_index_type=False)
+
+    # Open bounds; rows without a date are never selected
+    assert index.between()["Hours"].tolist() == [2.0, 6.0, 4.0, 1.0, 5.0]
+
+
+def test_staff_index():
+    df = sample()
+    index = StaffIndex(df, "Staff")
+    pd.testing.assert_frame_equal(index.rows("CD"), df[df["Staff"] == "CD"])
+    assert index.rows("ZZ").empty
+    assert StaffIndex(df, "StaffAbbreviation").rows("AB") is df
+
+
+if __name__ == "__main__":
+    test_between_matches_mask()
+    test_staff_index()
+    print("date index OK")
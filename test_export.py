@@ -0,0 +1,351 @@
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import ExportSQLPython as exporter
+import data_files
+import summaries
+
+
+def make_source(rows=2500, path=":memory:"):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute(
+        "CREATE TABLE vTimeEntries (TimeEntryID INTEGER, Staff TEXT, TimeEntryName TEXT, "
+        "TimeEntryAmount REAL, TimeEntryDate TEXT, TimeEntryUpdatedDatetime TEXT)"
+    )
+    conn.executemany(
+        "INSERT INTO vTimeEntries VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (i, "AEZ" if i % 2 else "BPL", f"Entry {i}, with comma", i / 10,
+             f"2025-01-{i % 28 + 1:02d}", f"2025-02-{i % 28 + 1:02d} 10:00:00")
+            for i in range(rows)
+        ],
+    )
+    conn.execute("CREATE TABLE Empty (A INTEGER, B TEXT)")
+    conn.commit()
+    return conn
+
+
+def snapshot_file(tmp, name):
+    """Path of file `name` in the current snapshot under export path `tmp`."""
+    return data_files.snapshot_dir(tmp) / name
+
+
+def test_export_streams_in_chunks():
+    conn = make_source()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "vTimeEntries.csv"
+        stats = exporter.export_table(conn, "vTimeEntries", path, chunksize=1000,
+                                      watermark_column="TimeEntryUpdatedDatetime")
+        assert stats["rows"] == 2500
+        assert stats["max_updated"] == pd.Timestamp("2025-02-28 10:00:00")
+        df = pd.read_csv(path)
+        assert len(df) == 2500
+        assert df["TimeEntryName"].iloc[3] == "Entry 3, with comma"
+
+        empty = Path(tmp) / "Empty.csv"
+        assert exporter.export_table(conn, "Empty", empty)["rows"] == 0
+        assert list(pd.read_csv(empty).columns) == ["A", "B"]
+
+
+def test_parallel_export_isolates_failures():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "dw.sqlite"
+        make_source(path=str(db)).close()
+        tables = {"vTimeEntries": "vTimeEntries", "Missing": "NoSuchView", "Empty": "Empty"}
+        results = exporter.run_export(lambda: sqlite3.connect(db), tables, tmp, chunksize=500, workers=3,
+                                      backoff=0)
+
+        by_table = {r["table"]: r for r in results}
+        assert [r["table"] for r in results] == list(tables)
+        assert by_table["vTimeEntries"]["status"] == "success"
+        assert by_table["vTimeEntries"]["rows"] == 2500
+        assert by_table["Missing"]["status"] == "failed"
+        assert not (snapshot_file(tmp, "Missing.csv")).exists()
+        assert by_table["Empty"]["status"] == "success"
+        assert all(r["seconds"] >= 0 for r in results)
+
+
+def test_incremental_export_merges_by_key():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "dw.sqlite"
+        make_source(rows=100, path=str(db)).close()
+        connect = lambda: sqlite3.connect(db)
+        tables = {"vTimeEntries": "vTimeEntries"}
+
+        first = exporter.run_export(connect, tables, tmp, chunksize=30, incremental=True)
+        assert first[0]["mode"] == "full"
+        assert exporter.load_state(tmp)["vTimeEntries"]["watermark"] == "2025-02-28T10:00:00"
+
+        conn = sqlite3.connect(db)
+        conn.execute("UPDATE vTimeEntries SET TimeEntryAmount = 99, TimeEntryUpdatedDatetime = '2025-03-01 08:00:00' WHERE TimeEntryID = 5")
+        conn.execute("INSERT INTO vTimeEntries VALUES (100, 'AEZ', 'New', 1.5, '2025-03-01', '2025-03-01 09:00:00')")
+        conn.commit()
+        conn.close()
+
+        second = exporter.run_export(connect, tables, tmp, chunksize=30, incremental=True)
+        assert second[0]["mode"] == "incremental"
+        df = pd.read_csv(snapshot_file(tmp, "vTimeEntries.csv"))
+        assert len(df) == 101
+        assert df["TimeEntryID"].is_unique
+        assert df.loc[df["TimeEntryID"] == 5, "TimeEntryAmount"].item() == 99
+        assert exporter.load_state(tmp)["vTimeEntries"]["watermark"] == "2025-03-01T09:00:00"
+
+        # A stale full refresh forces a full export again
+        third = exporter.run_export(connect, tables, tmp, incremental=True, full_refresh_days=0)
+        assert third[0]["mode"] == "full"
+
+
+def test_parquet_written_typed_and_preferred():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "dw.sqlite"
+        make_source(rows=100, path=str(db)).close()
+        connect = lambda: sqlite3.connect(db)
+        tables = {"vTimeEntries": "vTimeEntries", "Empty": "Empty"}
+        exporter.run_export(connect, tables, tmp, chunksize=30, incremental=True, parquet=True)
+
+        df = pd.read_parquet(snapshot_file(tmp, "vTimeEntries.parquet"))
+        assert len(df) == 100
+        assert pd.api.types.is_integer_dtype(df["TimeEntryID"])
+        assert df["TimeEntryAmount"].dtype == "float64"
+        assert list(pd.read_parquet(snapshot_file(tmp, "Empty.parquet")).columns) == ["A", "B"]
+
+        # Incremental merges keep the Parquet copy typed and in step
+        conn = sqlite3.connect(db)
+        conn.execute("INSERT INTO vTimeEntries VALUES (100, 'AEZ', 'New', 1.5, '2025-03-01', '2025-03-01 09:00:00')")
+        conn.commit()
+        conn.close()
+        exporter.run_export(connect, tables, tmp, chunksize=30, incremental=True, parquet=True)
+        df = data_files.read_table("vTimeEntries", tmp)
+        assert len(df) == 101
+        assert pd.api.types.is_integer_dtype(df["TimeEntryID"])
+        assert data_files.resolve("vTimeEntries.csv", tmp).suffix == ".parquet"
+
+        # A CSV re-synced on its own wins over the now older Parquet copy
+        time.sleep(0.01)
+        (snapshot_file(tmp, "vTimeEntries.csv")).write_text('"TimeEntryID"\n"1"\n')
+        assert data_files.resolve("vTimeEntries", tmp).suffix == ".csv"
+        assert len(data_files.read_table("vTimeEntries", tmp)) == 1
+
+
+def test_manifest_tracks_content_and_progress():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "dw.sqlite"
+        make_source(rows=100, path=str(db)).close()
+        connect = lambda: sqlite3.connect(db)
+        tables = {"vTimeEntries": "vTimeEntries", "Missing": "NoSuchView"}
+
+        exporter.run_export(connect, tables, tmp, parquet=False, backoff=0)
+        manifest = data_files.read_manifest(tmp)
+        assert manifest["status"] == "complete"
+        entry = manifest["files"]["vTimeEntries.csv"]
+        assert entry["rows"] == 100
+        assert entry["bytes"] == (snapshot_file(tmp, "vTimeEntries.csv")).stat().st_size
+        assert "Missing.csv" not in manifest["files"]
+        version = data_files.data_version(["vTimeEntries.csv"], tmp)
+        assert version == (data_files.current_version(tmp),)
+
+        # Rewriting identical content keeps the version
+        time.sleep(0.01)
+        exporter.run_export(connect, tables, tmp, parquet=False, backoff=0, resume=False)
+        assert data_files.data_version(["vTimeEntries.csv"], tmp) == version
+        history = (Path(tmp) / exporter.HISTORY_FILE).read_text().splitlines()
+        assert len(history) == 4
+
+        # Mid-run, readers keep the previous version and refuse to parse
+        manifest["status"] = "in_progress"
+        exporter.write_manifest(data_files.snapshot_dir(tmp), manifest)
+        (snapshot_file(tmp, "vTimeEntries.csv")).write_text('"TimeEntryID"\n"1"\n')
+        assert data_files.data_version(["vTimeEntries.csv"], tmp) == version
+        try:
+            data_files.check_snapshot(tmp)
+            assert False, "expected SnapshotInProgress"
+        except data_files.SnapshotInProgress:
+            pass
+
+
+def test_projected_export_with_detail():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "dw.sqlite"
+        conn = make_source(rows=100, path=str(db))
+        conn.execute(
+            "CREATE VIEW vwTimeEntriesType1 AS SELECT TimeEntryID, TimeEntryName, TimeEntryDate, "
+            "1 AS TimeEntryQuarter, 2025 AS TimeEntryYear, TimeEntryAmount, 450.0 AS TimeEntryRate, "
+            "TimeEntryAmount * 450 AS TimeEntryGross, 0.0 AS TimeEntryBilledAmount, TimeEntryUpdatedDatetime, "
+            "Staff, 0.0 AS TotalBilledToDate FROM vTimeEntries"
+        )
+        conn.commit()
+        conn.close()
+        connect = lambda: sqlite3.connect(db)
+        tables = {"vwTimeEntriesType1": "vwTimeEntriesType1"}
+
+        exporter.run_export(connect, tables, tmp, incremental=True, parquet=False)
+        df = pd.read_csv(snapshot_file(tmp, "vwTimeEntriesType1.csv"))
+        assert list(df.columns) == exporter.TIME_ENTRY_COLUMNS
+        detail = pd.read_csv(snapshot_file(tmp, "vwTimeEntriesType1Detail.csv"))
+        assert list(detail.columns) == ["TimeEntryID", "TimeEntryName"]
+
+        conn = sqlite3.connect(db)
+        conn.execute("UPDATE vTimeEntries SET TimeEntryName = 'Renamed', TimeEntryUpdatedDatetime = '2025-03-01 08:00:00' WHERE TimeEntryID = 5")
+        conn.commit()
+        conn.close()
+        result = exporter.run_export(connect, tables, tmp, incremental=True, parquet=False)[0]
+        assert result["mode"] == "incremental"
+        assert set(result["files"]) == {"vwTimeEntriesType1.csv", "vwTimeEntriesType1Detail.csv"}
+
+        joined = data_files.with_detail(data_files.read_table("vwTimeEntriesType1", tmp), "vwTimeEntriesType1", tmp)
+        assert len(joined) == 100
+        assert joined.loc[joined["TimeEntryID"] == 5, "TimeEntryName"].item() == "Renamed"
+
+
+def test_summaries_folded_from_chunks():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "dw.sqlite"
+        conn = sqlite3.connect(db)
+        conn.execute("CREATE TABLE vBillableHoursStaff (BillableHoursAmount REAL, StaffAbbreviation TEXT, BillableHoursDate TEXT)")
+        conn.executemany(
+            "INSERT INTO vBillableHoursStaff VALUES (?, ?, ?)",
+            [(0.5, "AEZ" if i % 3 else "BPL", f"2025-01-{i % 31 + 1:02d}") for i in range(1000)],
+        )
+        conn.commit()
+        conn.close()
+        tables = {"vBillableHoursStaff": "vBillableHoursStaff"}
+        exporter.run_export(lambda: sqlite3.connect(db), tables, tmp, chunksize=70, parquet=False)
+
+        raw = pd.read_csv(snapshot_file(tmp, "vBillableHoursStaff.csv"))
+        expected = summaries.summarize("vBillableHoursStaff", raw)
+        for name in summaries.summaries_for("vBillableHoursStaff"):
+            exported = data_files.read_summary(name, tmp)
+            assert exported is not None
+            pd.testing.assert_frame_equal(exported, expected[name], check_dtype=False)
+        weekly = data_files.read_summary("HoursByStaffWeekly", tmp)
+        assert weekly["BillableHoursAmount"].sum() == 500
+
+        # A re-synced raw file makes the summaries stale
+        (snapshot_file(tmp, "vBillableHoursStaff.csv")).write_text(raw.head(10).to_csv(index=False))
+        assert data_files.read_summary("HoursByStaffWeekly", tmp) is None
+
+
+def test_compressed_export_read_transparently():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "dw.sqlite"
+        make_source(rows=100, path=str(db)).close()
+        connect = lambda: sqlite3.connect(db)
+        tables = {"vTimeEntries": "vTimeEntries"}
+
+        exporter.run_export(connect, tables, tmp, parquet=False)
+        plain = data_files.read_table("vTimeEntries", tmp)
+        for compression, suffix in [("gzip", ".gz"), ("zstd", ".zst")]:
+            result = exporter.run_export(connect, tables, tmp, incremental=True, parquet=False,
+                                         compression=compression)[0]
+            assert result["file"] == f"vTimeEntries.csv{suffix}"
+            assert data_files.resolve("vTimeEntries", tmp).name == result["file"]
+            # The other copies are gone, from disk and from the manifest
+            assert sorted(p.name for p in data_files.snapshot_dir(tmp).glob("vTimeEntries.csv*")) == [result["file"]]
+            assert list(data_files.read_manifest(tmp)["files"]) == [result["file"]]
+            pd.testing.assert_frame_equal(data_files.read_table("vTimeEntries", tmp), plain)
+
+        # Deterministic output: an identical rewrite keeps the hash
+        version = data_files.data_version(["vTimeEntries"], tmp)
+        exporter.run_export(connect, tables, tmp, parquet=False, compression="zstd")
+        assert data_files.data_version(["vTimeEntries"], tmp) == version
+
+
+def test_failed_tables_retried_then_resumed():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "dw.sqlite"
+        make_source(rows=100, path=str(db)).close()
+        calls = []
+
+        def flaky_connect():
+            # Every other connection attempt fails, as on a lock timeout
+            calls.append(1)
+            if len(calls) % 2:
+                raise RuntimeError("[HY000] Lock request time out period exceeded. (1222)")
+            return sqlite3.connect(db)
+
+        tables = {"vTimeEntries": "vTimeEntries", "Later": "Later"}
+        first = exporter.run_export(flaky_connect, tables, tmp, parquet=False, retries=3, backoff=0)
+        assert first[0]["status"] == "success" and first[0]["attempts"] == 2
+        assert first[1]["status"] == "failed" and first[1]["attempts"] == 4
+        assert data_files.read_manifest(tmp)["failed"] == ["Later"]
+        exported = (snapshot_file(tmp, "vTimeEntries.csv")).stat().st_mtime_ns
+
+        # The re-run only exports what failed, then forgets the checkpoint
+        conn = sqlite3.connect(db)
+        conn.execute("CREATE TABLE Later (A INTEGER)")
+        conn.commit()
+        conn.close()
+        second = exporter.run_export(lambda: sqlite3.connect(db), tables, tmp, parquet=False, backoff=0)
+        assert [r["status"] for r in second] == ["skipped", "success"]
+        assert (snapshot_file(tmp, "vTimeEntries.csv")).stat().st_mtime_ns == exported
+        assert not (Path(tmp) / exporter.CHECKPOINT_FILE).exists()
+        assert set(data_files.read_manifest(tmp)["files"]) == {"vTimeEntries.csv", "Later.csv"}
+
+        third = exporter.run_export(lambda: sqlite3.connect(db), tables, tmp, parquet=False)
+        assert [r["status"] for r in third] == ["success", "success"]
+
+
+def test_snapshots_published_atomically():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "dw.sqlite"
+        make_source(rows=100, path=str(db)).close()
+        connect = lambda: sqlite3.connect(db)
+        tables = {"vTimeEntries": "vTimeEntries"}
+        # A flat data directory from before snapshots is carried over
+        pd.DataFrame({"A": [1]}).to_csv(Path(tmp) / "vMatters.csv", index=False)
+
+        exporter.run_export(connect, tables, tmp, parquet=False)
+        first = data_files.current_version(tmp)
+        first_dir = data_files.snapshot_dir(tmp)
+        assert first_dir == Path(tmp) / "snapshots" / first
+        assert sorted(p.name for p in first_dir.iterdir()) == ["manifest.json", "vMatters.csv", "vTimeEntries.csv"]
+        assert not (Path(tmp) / "vTimeEntries.csv").exists()
+        assert data_files.data_version(["vTimeEntries"], tmp) == (first,)
+
+        # New content is a new version; the previous snapshot stays intact
+        conn = connect()
+        conn.execute("DELETE FROM vTimeEntries WHERE TimeEntryID >= 50")
+        conn.commit()
+        conn.close()
+        exporter.run_export(connect, tables, tmp, parquet=False)
+        second = data_files.current_version(tmp)
+        assert second != first
+        assert len(data_files.read_table("vTimeEntries", tmp)) == 50
+        assert len(data_files.read_table("vTimeEntries", first_dir)) == 100
+
+        # Identical content keeps the version
+        exporter.run_export(connect, tables, tmp, parquet=False)
+        assert data_files.current_version(tmp) == second
+        # ...but the manifest describes the latest run, failures included
+        exporter.run_export(connect, {**tables, "Missing": "Missing"}, tmp, parquet=False, retries=0, resume=False)
+        assert data_files.current_version(tmp) == second
+        assert data_files.read_manifest(tmp)["failed"] == ["Missing"]
+        exporter.clear_checkpoint(tmp)
+
+        for rows in (40, 30, 20):
+            conn = connect()
+            conn.execute("DELETE FROM vTimeEntries WHERE TimeEntryID >= ?", (rows,))
+            conn.commit()
+            conn.close()
+            exporter.run_export(connect, tables, tmp, parquet=False)
+        published = [p for p in (Path(tmp) / "snapshots").iterdir()]
+        assert len(published) == data_files.KEEP_SNAPSHOTS
+        assert data_files.snapshot_dir(tmp) in published
+
+
+if __name__ == "__main__":
+    test_export_streams_in_chunks()
+    test_parallel_export_isolates_failures()
+    test_incremental_export_merges_by_key()
+    test_parquet_written_typed_and_preferred()
+    test_manifest_tracks_content_and_progress()
+    test_projected_export_with_detail()
+    test_summaries_folded_from_chunks()
+    test_compressed_export_read_transparently()
+    test_failed_tables_retried_then_resumed()
+    test_snapshots_published_atomically()
+    print("ok")
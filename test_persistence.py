@@ -0,0 +1,202 @@
+import json
+import subprocess
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+from persistence import GitCliBackend, GitHubBackend, WriteBehindStore
+
+
+def git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+def test_git_backend_batches_saves():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        remote = tmp / "remote.git"
+        work = tmp / "work"
+        git(tmp, "init", "-q", "--bare", "-b", "main", str(remote))
+        git(tmp, "init", "-q", "-b", "main", str(work))
+        git(work, "config", "user.email", "test@example.com")
+        git(work, "config", "user.name", "Test")
+        (work / "data").mkdir()
+        (work / "data" / "settings.json").write_text("{}")
+        git(work, "add", "-A")
+        git(work, "commit", "-q", "-m", "init")
+
+        store = WriteBehindStore(GitCliBackend(work, remote=str(remote)), debounce=60, source="test")
+        settings = work / "data" / "settings.json"
+        for goal in range(9):
+            store.save(settings, {"staff_weekly_goals": {"AEZ": goal}}, "data/settings.json")
+        store.save(work / "data" / "prebills.json", {"AEZ": {"Jan": "Yes"}}, "data/prebills.json")
+
+        # Local file is current immediately, nothing pushed yet
+        assert json.loads(settings.read_text())["staff_weekly_goals"]["AEZ"] == 8
+        assert store.pending == ["data/prebills.json", "data/settings.json"]
+
+        assert store.flush() is True
+        log = git(remote, "log", "--oneline", "main").splitlines()
+        assert len(log) == 2
+        assert "prebills.json, settings.json" in log[0]
+
+        # Unchanged content is neither rewritten nor queued
+        assert store.save(settings, {"staff_weekly_goals": {"AEZ": 8}}, "data/settings.json") is False
+        assert store.pending == []
+
+
+def test_git_backend_retries_failed_push():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        remote = tmp / "remote.git"
+        work = tmp / "work"
+        git(tmp, "init", "-q", "--bare", "-b", "main", str(remote))
+        git(tmp, "init", "-q", "-b", "main", str(work))
+        git(work, "config", "user.email", "test@example.com")
+        git(work, "config", "user.name", "Test")
+        (work / "data").mkdir()
+        (work / "data" / "settings.json").write_text("{}")
+        git(work, "add", "-A")
+        git(work, "commit", "-q", "-m", "init")
+        git(work, "push", "-q", str(remote), "HEAD:main")
+
+        store = WriteBehindStore(GitCliBackend(work, remote=str(remote)), debounce=60, max_delay=60, source="test")
+        settings = work / "data" / "settings.json"
+        store.save(settings, {"treshold_hours": 900}, "data/settings.json")
+
+        # Remote unreachable: committed locally, push fails, files stay queued
+        offline = tmp / "offline.git"
+        remote.rename(offline)
+        assert store.flush() is False
+        assert store.last_error is not None
+        assert store.pending == ["data/settings.json"]
+        assert len(git(work, "log", "--oneline").splitlines()) == 2
+
+        # Remote back: the retry has nothing new to commit but still pushes
+        offline.rename(remote)
+        assert store.flush() is True
+        assert store.last_error is None
+        log = git(remote, "log", "--oneline", "main").splitlines()
+        assert len(log) == 2 and "settings.json" in log[0]
+        assert git(remote, "rev-parse", "main") == git(work, "rev-parse", "HEAD")
+
+        # Nothing changed and nothing to push
+        assert GitCliBackend(work, remote=str(remote)).commit({"data/settings.json": settings}, "noop") is False
+
+
+def test_git_backend_rebases_when_remote_moved():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        remote = tmp / "remote.git"
+        work = tmp / "work"
+        git(tmp, "init", "-q", "--bare", "-b", "main", str(remote))
+        git(tmp, "init", "-q", "-b", "main", str(work))
+        git(work, "config", "user.email", "test@example.com")
+        git(work, "config", "user.name", "Test")
+        (work / "data").mkdir()
+        (work / "data" / "settings.json").write_text("{}")
+        git(work, "add", "-A")
+        git(work, "commit", "-q", "-m", "init")
+        git(work, "push", "-q", str(remote), "HEAD:main")
+
+        # Someone else pushes in the meantime (e.g. the data export)
+        other = tmp / "other"
+        git(tmp, "clone", "-q", str(remote), str(other))
+        git(other, "config", "user.email", "other@example.com")
+        git(other, "config", "user.name", "Other")
+        (other / "data" / "vMatters.csv").write_text("MatterID\n1\n")
+        git(other, "add", "-A")
+        git(other, "commit", "-q", "-m", "export")
+        git(other, "push", "-q", "origin", "HEAD:main")
+
+        store = WriteBehindStore(GitCliBackend(work, remote=str(remote)), debounce=60, source="test")
+        store.save(work / "data" / "settings.json", {"treshold_hours": 900}, "data/settings.json")
+        assert store.flush() is True
+        log = git(remote, "log", "--oneline", "main").splitlines()
+        assert len(log) == 3 and "settings.json" in log[0] and "export" in log[1]
+        assert (work / "data" / "vMatters.csv").exists()
+
+
+def test_store_stops_retrying_after_max_attempts():
+    class Failing:
+        calls = 0
+
+        def commit(self, files, message):
+            Failing.calls += 1
+            raise RuntimeError("remote rejected")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = WriteBehindStore(Failing(), debounce=60, max_delay=60, source="test", max_attempts=2)
+        store.save(Path(tmp) / "settings.json", {"a": 1}, "data/settings.json")
+        assert store.flush() is False
+        assert store._timer is not None
+        assert store.flush() is False
+        # Given up: still queued and reported, but no retry scheduled
+        assert store._timer is None
+        assert store.pending == ["data/settings.json"] and store.failures == 2
+        assert store.last_error == "remote rejected" and Failing.calls == 2
+        # No last attempt from the exit-time flush
+        store.backend = None
+
+
+def test_github_backend_against_stub():
+    calls = []
+
+    class Stub(BaseHTTPRequestHandler):
+        def _reply(self, body, status=200):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            calls.append(("GET", self.path))
+            if "/git/ref/heads/" in self.path:
+                self._reply({"object": {"sha": "head"}})
+            else:
+                self._reply({"tree": {"sha": "base-tree"}})
+
+        def do_POST(self):
+            length = int(self.headers["Content-Length"])
+            self.rfile.read(length)
+            calls.append(("POST", self.path))
+            kind = self.path.rsplit("/", 1)[-1]
+            self._reply({"sha": f"new-{kind}"}, 201)
+
+        def do_PATCH(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            calls.append(("PATCH", self.path))
+            self._reply({"object": {"sha": "new-commits"}})
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = GitHubBackend(None, "org/repo", api_url=f"http://127.0.0.1:{server.server_port}")
+            store = WriteBehindStore(backend, debounce=60, source="test")
+            store.save(Path(tmp) / "settings.json", {"a": 1}, "data/settings.json")
+            store.save(Path(tmp) / "prebills.json", {"b": 2}, "data/prebills.json")
+            assert store.flush() is True
+    finally:
+        server.shutdown()
+
+    # Two blobs, one tree, one commit, one ref update
+    posts = [path for method, path in calls if method == "POST"]
+    assert sum(p.endswith("/blobs") for p in posts) == 2
+    assert sum(p.endswith("/commits") for p in posts) == 1
+    assert [m for m, _ in calls].count("PATCH") == 1
+
+
+if __name__ == "__main__":
+    test_git_backend_batches_saves()
+    test_git_backend_retries_failed_push()
+    test_git_backend_rebases_when_remote_moved()
+    test_store_stops_retrying_after_max_attempts()
+    test_github_backend_against_stub()
+    print("ok")
@@ -0,0 +1,37 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from prebills import MONTHS, PrebillsMatrix, render_matrix
+
+
+def test_matrix_reloaded_only_when_file_changes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "prebills.json"
+        matrix = PrebillsMatrix(path)
+        assert matrix.load()[2] == "missing" and matrix.data() == {}
+
+        path.write_text(json.dumps({"AEZ": {"Jan": "Yes", "Feb": "No"}}))
+        html = matrix.html(MONTHS)
+        assert html == render_matrix({"AEZ": {"Jan": "Yes", "Feb": "No"}}, MONTHS)
+        assert html.count("matrix-yes'") == 1 and html.count("matrix-no'") == 11
+        # Same version: the same rendered string, no reread
+        assert matrix.html(MONTHS) is html
+        data = matrix.data()
+        assert matrix.data() is data
+
+        # A save (new mtime/size) is picked up on the next read
+        path.write_text(json.dumps({"AEZ": {"Jan": "Yes", "Feb": "Yes"}, "BPL": {}}))
+        os.utime(path, ns=(1, 1))
+        assert matrix.data() == {"AEZ": {"Jan": "Yes", "Feb": "Yes"}, "BPL": {}}
+        assert matrix.html(MONTHS).count("matrix-yes'") == 2
+        assert matrix.html(["Jan"]).count("<th>") == 2
+
+        path.write_text("{")
+        assert matrix.load()[2] == "corrupt" and matrix.data() == {}
+
+
+if __name__ == "__main__":
+    test_matrix_reloaded_only_when_file_changes()
+    print("prebills OK")
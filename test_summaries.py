@@ -0,0 +1,34 @@
+import pandas as pd
+
+from summaries import choose_bucket, period_start
+
+
+def test_choose_bucket_boundaries():
+    start = pd.Timestamp("2026-01-01")
+    # 60 days fit a budget of 60 daily points, 61 do not
+    assert choose_bucket(start, start + pd.Timedelta(days=59), 60) == "Date"
+    assert choose_bucket(start, start + pd.Timedelta(days=60), 60) == "Week"
+
+    # `finest` skips the finer buckets
+    assert choose_bucket(start, start + pd.Timedelta(days=10), 60, finest="Week") == "Week"
+    assert choose_bucket(start, start + pd.Timedelta(days=419), 60, finest="Week") == "Week"
+    assert choose_bucket(start, start + pd.Timedelta(days=420), 60, finest="Week") == "Month"
+    assert choose_bucket(start, start + pd.Timedelta(days=59), 60, finest="Month") == "Month"
+
+    # Past the budget in quarters too, Quarter is the coarsest there is
+    assert choose_bucket("2000-01-01", "2026-12-31", 60) == "Quarter"
+    assert choose_bucket("2000-01-01", "2026-12-31", 10, finest="Month") == "Quarter"
+
+
+def test_period_start_quarter():
+    dates = pd.Series([pd.Timestamp("2026-05-17"), pd.Timestamp("2026-01-01"), pd.Timestamp("2026-12-31 13:00")])
+    assert period_start(dates, "Quarter").tolist() == [
+        pd.Timestamp("2026-04-01"), pd.Timestamp("2026-01-01"), pd.Timestamp("2026-10-01"),
+    ]
+    assert period_start(dates, "Week").tolist()[0] == pd.Timestamp("2026-05-11")
+
+
+if __name__ == "__main__":
+    test_choose_bucket_boundaries()
+    test_period_start_quarter()
+    print("summaries OK")